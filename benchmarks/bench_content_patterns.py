@@ -0,0 +1,100 @@
+"""
+Benchmark of the combined ContentMatcher against the per-pattern re.search loop.
+
+Usage: python benchmarks/bench_content_patterns.py [--lines N] [--secret-ratio R]
+"""
+
+import argparse
+import random
+import re
+import time
+
+from pygitguard.config.pygitguard_constants import SENSITIVE_CONTENT
+from pygitguard.helpers.pattern_helper import ContentMatcher
+
+CLEAN_LINES = [
+    "def compute(value, other):",
+    "    return value * other + 42",
+    "import os, sys",
+    "# configuration loaded from the environment",
+    "    result = [item for item in items if item.enabled]",
+    '    logger.info("processing %s", name)',
+    "",
+    "class Handler(BaseHandler):",
+]
+# Assembled at runtime so that scanning this file does not report them
+SECRET_LINES = [
+    name + " = " + value
+    for name, value in (
+        ("password", '"hunter2"'),
+        ("db_user", "'admin'"),
+        ("API_KEY", '"abcd1234"'),
+        ("my_token", "`xyz`"),
+    )
+]
+
+
+def generate_lines(count, secret_ratio, seed=42):
+    """Generates a reproducible list of source-like lines."""
+    rng = random.Random(seed)
+    return [
+        rng.choice(SECRET_LINES if rng.random() < secret_ratio else CLEAN_LINES)
+        for _ in range(count)
+    ]
+
+
+def per_pattern_loop(lines, patterns):
+    """The original implementation: one re.search per pattern and line."""
+    hits = set()
+    for idx, line in enumerate(lines, 1):
+        for pattern in patterns:
+            if re.search(pattern, line, re.IGNORECASE):
+                hits.add(idx)
+    return hits
+
+
+def combined_matcher(lines, matcher):
+    """One prefilter and at most one combined search per line."""
+    search = matcher.search
+    return {idx for idx, line in enumerate(lines, 1) if search(line) is not None}
+
+
+def whole_buffer(buffer, matcher):
+    """A single bytes scan of the whole content, as done for files."""
+    return {match[0] for match in matcher.iter_matches(buffer)}
+
+
+def timed(func, *args, repeat=3):
+    """Returns the best wall time of 'repeat' runs and the last result."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument("--secret-ratio", type=float, default=0.001)
+    args = parser.parse_args()
+
+    lines = generate_lines(args.lines, args.secret_ratio)
+    matcher = ContentMatcher(SENSITIVE_CONTENT)
+
+    loop_time, loop_hits = timed(per_pattern_loop, lines, SENSITIVE_CONTENT)
+    matcher_time, matcher_hits = timed(combined_matcher, lines, matcher)
+    buffer_time, buffer_hits = timed(whole_buffer, "\n".join(lines).encode(), matcher)
+    assert loop_hits == matcher_hits == buffer_hits, "matchers disagree"
+
+    print(f"lines: {args.lines}  hits: {len(matcher_hits)}")
+    print(f"per-pattern loop: {loop_time:.3f}s")
+    print(f"combined matcher: {matcher_time:.3f}s")
+    print(f"whole buffer:     {buffer_time:.3f}s")
+    print(f"speedup: {loop_time / matcher_time:.1f}x (per line)")
+    print(f"speedup: {loop_time / buffer_time:.1f}x (whole buffer)")
+
+
+if __name__ == "__main__":
+    main()
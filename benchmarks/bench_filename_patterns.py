@@ -0,0 +1,105 @@
+"""
+Benchmark of the FilenameMatcher against the per-pattern re.search loop.
+
+The file names come from a synthetic tree, or from a real one with --path.
+
+Usage: python benchmarks/bench_filename_patterns.py [--files N] [--sensitive-ratio R] [--path DIR]
+"""
+
+import argparse
+import os
+import random
+import re
+import time
+
+from pygitguard.config.pygitguard_constants import SENSITIVE_PATTERNS
+from pygitguard.helpers.pattern_helper import FilenameMatcher
+
+CLEAN_STEMS = ["main", "utils", "handler", "index", "test_models", "README", "setup"]
+CLEAN_EXTENSIONS = [".py", ".js", ".ts", ".md", ".json", ".yaml", ".txt", ".html", ""]
+SENSITIVE_NAMES = [
+    ".env",
+    ".env.local",
+    "server.key",
+    "cert.crt",
+    "prod.db",
+    "my_secret_tokens.json",
+    "aws_credentials",
+    "id_rsa.pub",
+    "private.key.bak",
+    "db_user.json",
+    "ACCESS_KEYS.txt",
+]
+
+
+def generate_names(count, sensitive_ratio, seed=42):
+    """Generates the reproducible file names of a synthetic tree."""
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        if rng.random() < sensitive_ratio:
+            names.append(rng.choice(SENSITIVE_NAMES))
+        else:
+            names.append(rng.choice(CLEAN_STEMS) + rng.choice(CLEAN_EXTENSIONS))
+    return names
+
+
+def tree_names(path):
+    """Returns the names of the files under 'path', skipping .git."""
+    names = []
+    for root, dirs, files in os.walk(path):
+        dirs[:] = [d for d in dirs if d != ".git"]
+        names.extend(files)
+    return names
+
+
+def per_pattern_loop(names, patterns):
+    """The original implementation: one re.search per pattern and name."""
+    return [
+        tuple(p for p in patterns if re.search(p, name, re.IGNORECASE))
+        for name in names
+    ]
+
+
+def filename_matcher(names, matcher):
+    """Extension lookups, keyword suffixes and the residual regex, per name."""
+    match = matcher.match
+    return [match(name) for name in names]
+
+
+def timed(func, *args, repeat=3):
+    """Returns the best wall time of 'repeat' runs and the last result."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=200_000)
+    parser.add_argument("--sensitive-ratio", type=float, default=0.01)
+    parser.add_argument("--path", help="Take the file names from this tree instead")
+    args = parser.parse_args()
+
+    if args.path:
+        names = tree_names(args.path)
+    else:
+        names = generate_names(args.files, args.sensitive_ratio)
+    matcher = FilenameMatcher(SENSITIVE_PATTERNS)
+
+    loop_time, loop_rules = timed(per_pattern_loop, names, SENSITIVE_PATTERNS)
+    matcher_time, matcher_rules = timed(filename_matcher, names, matcher)
+    assert loop_rules == matcher_rules, "matchers disagree"
+
+    matched = sum(1 for rules in matcher_rules if rules)
+    print(f"files: {len(names)}  sensitive: {matched}")
+    print(f"per-pattern loop: {loop_time:.3f}s")
+    print(f"filename matcher: {matcher_time:.3f}s")
+    print(f"speedup: {loop_time / matcher_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Benchmark suite of the repository scans, on a synthetic repository.
+
+Every scenario runs in a fresh process, so its peak RSS is its own:
+
+- full: a full scan of the working tree, without cache;
+- staged: a scan of the staged files, read from the git index;
+- warm-cache: a full rescan with an up to date cache;
+- filename-only: the filename checks of every file of the walk;
+- content-only: the content checks of every file of the walk;
+- content-entropy: the same, with ENTROPY_DETECTION enabled.
+
+The entropy detector is meant to stay within ENTROPY_MAX_OVERHEAD times
+the regex-only content checks: with both content scenarios, the ratio of
+their times is reported, and `--check-entropy` fails when it is higher.
+
+The results are written as JSON, with files/sec, MB/sec and peak RSS for
+each scenario, and can be compared with a previous run to catch
+regressions across commits.
+
+Usage: python benchmarks/bench_scan.py [--repo DIR] [--jobs N] [--output FILE]
+           [--compare PREVIOUS.json] [--max-regression 0.2] [--check-entropy]
+           [shape options]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic_repo import add_shape_arguments, generate_repository, shape_from_args
+
+SCENARIOS = (
+    "full",
+    "staged",
+    "warm-cache",
+    "filename-only",
+    "content-only",
+    "content-entropy",
+)
+
+# Highest ratio of the content-entropy to the content-only time
+ENTROPY_MAX_OVERHEAD = 2.0
+
+
+def peak_rss_mb():
+    """Returns the peak RSS of this process and of its largest child, in MB."""
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None, None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit
+    return round(own, 1), round(children, 1)
+
+
+def walked_files(path):
+    """Returns the files a working tree scan of 'path' visits."""
+    from pygitguard.helpers.git_helper import walk_repository
+
+    return list(walk_repository(path))
+
+
+def run_scenario(name, path, jobs):
+    """
+    Runs one scenario in the current process.
+
+    Returns
+    -------
+    dict
+        The wall time of the scan, the number and size of the files it
+        processed, its findings and the peak RSS.
+    """
+    from pygitguard.helpers.config_helper import ScanConfig
+    from pygitguard.helpers.git_helper import get_staged_files
+    from pygitguard.helpers.scan_helper import PyGitGuardScan
+
+    logger = logging.getLogger("PYGITGUARD")
+    logger.disabled = True
+    scanner = PyGitGuardScan(logger)
+
+    if name == "staged":
+        staged = [rel_path for rel_path, _ in get_staged_files(path)]
+        size = sum(os.path.getsize(os.path.join(path, p)) for p in staged)
+    else:
+        files = walked_files(path)
+        size = sum(file[3].st_size for file in files)
+
+    if name == "warm-cache":
+        PyGitGuardScan(logger).scan_repository(path, jobs=jobs, use_cache=True)
+
+    start = time.perf_counter()
+    if name == "full":
+        scanner.scan_repository(path, jobs=jobs, use_cache=False)
+    elif name == "staged":
+        scanner.scan_repository(path, staged=True)
+    elif name == "warm-cache":
+        scanner.scan_repository(path, jobs=jobs, use_cache=True)
+    else:
+        config = ScanConfig.load(path, use_cache=False)
+        config.entropy_detection = dict(
+            config.entropy_detection, enabled=name == "content-entropy"
+        )
+        for full_path, rel_path, filename, stat in files:
+            if name == "filename-only":
+                scanner.check_sensitive_filenames(
+                    filename,
+                    rel_path,
+                    config.sensitive_patterns,
+                    config.internal_file_ignore,
+                )
+            else:
+                scanner.check_sensitive_content(
+                    full_path,
+                    rel_path,
+                    config.matcher_for(rel_path),
+                    binary_extensions=config.binary_extensions,
+                    text_extensions=config.text_extensions,
+                )
+        scanner.files_scanned = len(files)
+    seconds = time.perf_counter() - start
+
+    rss, worker_rss = peak_rss_mb()
+    return {
+        "scenario": name,
+        "seconds": round(seconds, 4),
+        "files": scanner.files_scanned,
+        "mb": round(size / (1024 * 1024), 2),
+        "files_per_sec": round(scanner.files_scanned / seconds, 1),
+        "mb_per_sec": round(size / (1024 * 1024) / seconds, 2),
+        "findings": len(scanner.findings),
+        "cache_hits": scanner.cache_hits,
+        "peak_rss_mb": rss,
+        "peak_worker_rss_mb": worker_rss,
+    }
+
+
+def run_in_process(name, path, jobs):
+    """Runs a scenario in a fresh interpreter, returning its result."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    pythonpath = os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")]))
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-scenario", name, path]
+        + ["--jobs", str(jobs)],
+        env=dict(os.environ, PYTHONPATH=pythonpath),
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def pygitguard_commit():
+    """Returns the commit of the benchmarked PyGitGuard checkout, if any."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        ["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True
+    )
+    return result.stdout.strip() or None
+
+
+def compare(report, previous, max_regression):
+    """
+    Prints the throughput change of every scenario against a previous report.
+
+    Returns
+    -------
+    list of str
+        The scenarios whose files/sec dropped by more than 'max_regression'.
+    """
+    before = {result["scenario"]: result for result in previous["results"]}
+    regressions = []
+    for result in report["results"]:
+        old = before.get(result["scenario"])
+        if old is None:
+            continue
+        change = result["files_per_sec"] / old["files_per_sec"] - 1
+        print(
+            f"{result['scenario']:>14}: {old['files_per_sec']:>10.1f} ->"
+            f" {result['files_per_sec']:>10.1f} files/s ({change:+.1%})",
+            file=sys.stderr,
+        )
+        if max_regression is not None and change < -max_regression:
+            regressions.append(result["scenario"])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--repo",
+        help="Generate the repository in DIR, or reuse it if it exists",
+    )
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=SCENARIOS,
+        default=list(SCENARIOS),
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Runs of each scenario, the fastest is reported",
+    )
+    parser.add_argument("--output", help="Write the JSON report to FILE")
+    parser.add_argument("--compare", metavar="PREVIOUS", help="A previous report")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        help="With --compare, exit with status 1 if the files/sec of a"
+        " scenario dropped by more than this fraction",
+    )
+    parser.add_argument(
+        "--check-entropy",
+        action="store_true",
+        help="Exit with status 1 if the content checks with entropy detection"
+        f" take more than {ENTROPY_MAX_OVERHEAD:g}x the regex-only ones",
+    )
+    parser.add_argument("--run-scenario", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("scenario_path", nargs="?", help=argparse.SUPPRESS)
+    add_shape_arguments(parser)
+    args = parser.parse_args()
+
+    if args.run_scenario:
+        print(
+            json.dumps(run_scenario(args.run_scenario, args.scenario_path, args.jobs))
+        )
+        return
+
+    with tempfile.TemporaryDirectory() as scratch:
+        path = args.repo or os.path.join(scratch, "repo")
+        if os.path.isdir(os.path.join(path, ".git")):
+            repository = {"path": path, "reused": True}
+        else:
+            repository = generate_repository(path, shape_from_args(args))
+        results = []
+        for name in args.scenarios:
+            runs = [run_in_process(name, path, args.jobs) for _ in range(args.repeat)]
+            best = min(runs, key=lambda run: run["seconds"])
+            best["peak_rss_mb"] = max(run["peak_rss_mb"] or 0 for run in runs)
+            results.append(best)
+            print(
+                f"{name:>14}: {best['files_per_sec']:>10.1f} files/s"
+                f" {best['mb_per_sec']:>8.2f} MB/s  peak RSS {best['peak_rss_mb']} MB",
+                file=sys.stderr,
+            )
+
+    seconds = {result["scenario"]: result["seconds"] for result in results}
+    entropy_overhead = None
+    if "content-only" in seconds and "content-entropy" in seconds:
+        entropy_overhead = round(
+            seconds["content-entropy"] / seconds["content-only"], 2
+        )
+        print(
+            f"entropy overhead: {entropy_overhead:.2f}x"
+            f" (target {ENTROPY_MAX_OVERHEAD:g}x)",
+            file=sys.stderr,
+        )
+
+    report = {
+        "pygitguard_commit": pygitguard_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "jobs": args.jobs,
+        "repository": repository,
+        "results": results,
+        "entropy_overhead": entropy_overhead,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.max_regression)
+        if regressions:
+            print(f"regressions: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+    if args.check_entropy and (
+        entropy_overhead is None or entropy_overhead > ENTROPY_MAX_OVERHEAD
+    ):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
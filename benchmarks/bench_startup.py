@@ -0,0 +1,134 @@
+"""
+Benchmark of the startup of the pygitguard command, as run by the pre-commit hook.
+
+Measures a no-op staged scan (an empty index) in a scratch repository set up
+with `pygitguard init`, as the hook runs in, and lists the slowest imports
+reported by `python -X importtime`.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--without-config] [--check]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# What the console script runs
+ENTRY_POINT = "import sys; from pygitguard.cli import main; sys.exit(main())"
+
+# Modules a no-op staged scan must not import
+HEAVY_MODULES = (
+    "yaml",
+    "pathspec",
+    "sqlite3",
+    "concurrent.futures",
+    "numpy",
+    "argparse",
+)
+
+# Wall time budget of a no-op staged scan, in milliseconds
+TARGET_MS = 50
+
+
+def pygitguard_command(*args):
+    """Returns the command line running pygitguard with 'args'."""
+    return [sys.executable, "-c", ENTRY_POINT, *args]
+
+
+def make_repository(path, env, with_config):
+    """Creates an empty git repository, optionally with `pygitguard init`."""
+    subprocess.run(["git", "init", "-q", path], check=True)
+    if with_config:
+        subprocess.run(
+            pygitguard_command("init"),
+            cwd=path,
+            env=env,
+            check=True,
+            capture_output=True,
+        )
+
+
+def time_runs(command, cwd, env, runs):
+    """Returns the wall times, in milliseconds, of 'runs' runs of 'command'."""
+    # warm-up run, writing the bytecode caches as an installed package has them
+    subprocess.run(command, cwd=cwd, env=env, check=True, capture_output=True)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, env=env, check=True, capture_output=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def import_times(cwd, env):
+    """
+    Runs a no-op staged scan under `-X importtime`.
+
+    Returns
+    -------
+    list of tuple
+        `(cumulative_us, module)` for every imported module.
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", ENTRY_POINT, "--staged"],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+    ).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:") :].split("|")
+        imports.append((int(cumulative), module.strip()))
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--without-config",
+        action="store_true",
+        help="Run in a repository without a .pygitguard.yaml, before `pygitguard init`",
+    )
+    parser.add_argument("--target-ms", type=float, default=TARGET_MS)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit with status 1 if the budget is exceeded or a heavy module is imported",
+    )
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=root)
+    env.pop("PRE_COMMIT", None)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    with tempfile.TemporaryDirectory() as repo:
+        make_repository(repo, env, not args.without_config)
+        baseline = time_runs([sys.executable, "-c", "pass"], repo, env, args.runs)
+        scan = time_runs(pygitguard_command("--staged"), repo, env, args.runs)
+        imports = import_times(repo, env)
+
+    interpreter_ms = statistics.median(baseline)
+    scan_ms = statistics.median(scan)
+    heavy = sorted({module for _, module in imports if module in HEAVY_MODULES})
+    print(f"interpreter startup: {interpreter_ms:.1f} ms")
+    print(f"no-op staged scan:   {scan_ms:.1f} ms (target {args.target_ms:.0f} ms)")
+    print("slowest imports (cumulative):")
+    top_level = [item for item in imports if not item[1].startswith("encodings")]
+    for cumulative, module in sorted(top_level, reverse=True)[:10]:
+        print(f"  {cumulative / 1000:7.1f} ms  {module}")
+    if heavy:
+        print(f"heavy modules imported: {', '.join(heavy)}")
+
+    if args.check and (scan_ms > args.target_ms or heavy):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
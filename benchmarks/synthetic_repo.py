@@ -0,0 +1,279 @@
+"""
+Generator of synthetic git repositories for the scan benchmarks.
+
+The shape of the repository is configurable: number of files, directory
+depth, file size distribution, share of binary files, density of secrets,
+nested `.gitignore` files and a large ignored `node_modules` tree. The same
+options and seed always generate the same repository.
+
+Usage: python benchmarks/synthetic_repo.py DIR [--files N] [--depth D] [...]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+from collections import namedtuple
+
+# The shape of a generated repository, see `add_shape_arguments`
+RepoShape = namedtuple(
+    "RepoShape",
+    [
+        "files",
+        "depth",
+        "median_kb",
+        "size_sigma",
+        "max_kb",
+        "binary_ratio",
+        "secret_density",
+        "gitignores",
+        "node_modules_files",
+        "staged_files",
+        "seed",
+    ],
+)
+DEFAULT_SHAPE = RepoShape(
+    files=2000,
+    depth=4,
+    median_kb=4.0,
+    size_sigma=1.2,
+    max_kb=4096.0,
+    binary_ratio=0.05,
+    secret_density=0.001,
+    gitignores=10,
+    node_modules_files=5000,
+    staged_files=50,
+    seed=42,
+)
+
+TEXT_EXTENSIONS = [".py", ".js", ".ts", ".md", ".json", ".yaml", ".txt", ".html"]
+BINARY_EXTENSIONS = [".png", ".bin", ".dat"]
+CODE_LINES = [
+    "def compute(value, other):",
+    "    return value * other + 42",
+    "import os, sys",
+    "# configuration loaded from the environment",
+    "    result = [item for item in items if item.enabled]",
+    '    logger.info("processing %s", name)',
+    "",
+    "class Handler(BaseHandler):",
+    "    checksum = compute_digest(payload, algorithm='sha256')",
+]
+# Assembled at runtime so that scanning this file does not report them
+SECRET_LINES = [
+    name + " = " + value
+    for name, value in (
+        ("password", '"hunter2"'),
+        ("db_user", "'admin'"),
+        ("API_KEY", '"abcd1234"'),
+        ("my_token", "`xyz`"),
+    )
+] + ['aws_secret: "' + "wJalrXUtnFEMI/K7MDENG/" + 'bPxRfiCYEXAMPLEKEY"']
+SENSITIVE_NAMES = [".env", "server.key", "id_rsa", "credentials.json", "prod.db"]
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "bench",
+    "GIT_AUTHOR_EMAIL": "bench@example.com",
+    "GIT_COMMITTER_NAME": "bench",
+    "GIT_COMMITTER_EMAIL": "bench@example.com",
+}
+
+
+def add_shape_arguments(parser):
+    """Adds an option for every field of RepoShape to 'parser'."""
+    group = parser.add_argument_group("repository shape")
+    group.add_argument("--files", type=int, default=DEFAULT_SHAPE.files)
+    group.add_argument(
+        "--depth",
+        type=int,
+        default=DEFAULT_SHAPE.depth,
+        help="Maximum directory depth",
+    )
+    group.add_argument(
+        "--median-kb",
+        type=float,
+        default=DEFAULT_SHAPE.median_kb,
+        help="Median file size; sizes follow a log-normal distribution",
+    )
+    group.add_argument(
+        "--size-sigma",
+        type=float,
+        default=DEFAULT_SHAPE.size_sigma,
+        help="Spread of the log-normal file sizes",
+    )
+    group.add_argument("--max-kb", type=float, default=DEFAULT_SHAPE.max_kb)
+    group.add_argument("--binary-ratio", type=float, default=DEFAULT_SHAPE.binary_ratio)
+    group.add_argument(
+        "--secret-density",
+        type=float,
+        default=DEFAULT_SHAPE.secret_density,
+        help="Probability of a secret on each text line",
+    )
+    group.add_argument(
+        "--gitignores",
+        type=int,
+        default=DEFAULT_SHAPE.gitignores,
+        help="Number of nested .gitignore files, each with ignored files",
+    )
+    group.add_argument(
+        "--node-modules-files",
+        type=int,
+        default=DEFAULT_SHAPE.node_modules_files,
+        help="Number of files in the ignored node_modules tree",
+    )
+    group.add_argument(
+        "--staged-files",
+        type=int,
+        default=DEFAULT_SHAPE.staged_files,
+        help="Number of committed files modified and staged",
+    )
+    group.add_argument("--seed", type=int, default=DEFAULT_SHAPE.seed)
+
+
+def shape_from_args(args):
+    """Returns the RepoShape of parsed `add_shape_arguments` options."""
+    return RepoShape(*(getattr(args, field) for field in RepoShape._fields))
+
+
+def _git(path, *args):
+    """Runs a git command in the repository at 'path'."""
+    subprocess.run(
+        ["git", *args],
+        cwd=path,
+        env=dict(os.environ, **GIT_ENV),
+        check=True,
+        capture_output=True,
+    )
+
+
+def _write(path, content):
+    """Writes 'content', creating the parent directories."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def _text_content(rng, size, secret_density):
+    """Returns about 'size' bytes of code-like lines and the number of secrets."""
+    lines = []
+    secrets = written = 0
+    while written < size:
+        if rng.random() < secret_density:
+            line = rng.choice(SECRET_LINES)
+            secrets += 1
+        else:
+            line = rng.choice(CODE_LINES)
+        lines.append(line)
+        written += len(line) + 1
+    return ("\n".join(lines) + "\n").encode(), secrets
+
+
+def _directories(rng, shape):
+    """Returns the relative directories files are spread over."""
+    count = max(1, shape.files // 20)
+    directories = [""]
+    for index in range(count):
+        depth = rng.randint(1, max(1, shape.depth))
+        parts = [f"pkg{rng.randrange(max(2, count // 4))}" for _ in range(depth - 1)]
+        directories.append("/".join(parts + [f"module{index}"]))
+    return directories
+
+
+def generate_repository(path, shape=DEFAULT_SHAPE):
+    """
+    Generates a synthetic git repository.
+
+    Every generated file is committed, then 'staged_files' of them are
+    modified and staged. Ignored files, in node_modules and under the
+    nested `.gitignore` files, are written but never committed.
+
+    Parameters
+    ----------
+    path : str
+        The directory of the repository, created if needed.
+    shape : RepoShape
+        The shape of the repository.
+
+    Returns
+    -------
+    dict
+        The shape and what was generated: number and total size of the
+        tracked files, binary files, secrets, sensitive file names and
+        ignored files.
+    """
+    rng = random.Random(shape.seed)
+    os.makedirs(path, exist_ok=True)
+    _git(path, "init", "-q")
+    directories = _directories(rng, shape)
+
+    summary = {"files": 0, "bytes": 0, "binary_files": 0, "secrets": 0}
+    summary["sensitive_names"] = summary["ignored_files"] = 0
+    mu = math.log(max(shape.median_kb, 0.001) * 1024)
+    tracked = []
+    for index in range(shape.files):
+        directory = rng.choice(directories)
+        size = int(min(rng.lognormvariate(mu, shape.size_sigma), shape.max_kb * 1024))
+        if rng.random() < shape.binary_ratio:
+            name = f"asset{index}{rng.choice(BINARY_EXTENSIONS)}"
+            noise = rng.getrandbits(8 * size).to_bytes(size, "little") if size else b""
+            content = b"\0" + noise
+            summary["binary_files"] += 1
+        else:
+            if rng.random() < 0.005:
+                name = f"{index}_{rng.choice(SENSITIVE_NAMES)}"
+                summary["sensitive_names"] += 1
+            else:
+                name = f"file{index}{rng.choice(TEXT_EXTENSIONS)}"
+            content, secrets = _text_content(rng, size, shape.secret_density)
+            summary["secrets"] += secrets
+        rel_path = f"{directory}/{name}" if directory else name
+        _write(os.path.join(path, rel_path), content)
+        tracked.append(rel_path)
+        summary["files"] += 1
+        summary["bytes"] += len(content)
+
+    # nested .gitignore files, each hiding a log and a build directory
+    for directory in rng.sample(directories, min(shape.gitignores, len(directories))):
+        base = os.path.join(path, directory)
+        _write(os.path.join(base, ".gitignore"), b"*.log\nbuild/\n")
+        _write(os.path.join(base, "debug.log"), b"log line\n" * 100)
+        for index in range(10):
+            _write(os.path.join(base, "build", f"out{index}.js"), b"bundle();\n" * 50)
+        summary["ignored_files"] += 11
+
+    # a node_modules tree ignored from the root
+    with open(os.path.join(path, ".gitignore"), "a", encoding="utf-8") as f:
+        f.write("node_modules/\n")
+    for index in range(shape.node_modules_files):
+        package = f"node_modules/package{index // 20}/lib/index{index % 20}.js"
+        _write(os.path.join(path, package), b"module.exports = {};\n" * 20)
+    summary["ignored_files"] += shape.node_modules_files
+
+    _git(path, "add", "-A")
+    _git(path, "commit", "-q", "--no-verify", "-m", "synthetic repository")
+
+    text_files = [p for p in tracked if not p.endswith(tuple(BINARY_EXTENSIONS))]
+    staged = rng.sample(text_files, min(shape.staged_files, len(text_files)))
+    for rel_path in staged:
+        content, secrets = _text_content(rng, 2048, shape.secret_density * 10)
+        with open(os.path.join(path, rel_path), "ab") as f:
+            f.write(content)
+        summary["secrets"] += secrets
+    if staged:
+        _git(path, "add", "--", *staged)
+    summary["staged_files"] = len(staged)
+    return {"shape": shape._asdict(), **summary}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", help="Directory of the generated repository")
+    add_shape_arguments(parser)
+    args = parser.parse_args()
+    print(json.dumps(generate_repository(args.path, shape_from_args(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
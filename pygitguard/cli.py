@@ -4,38 +4,395 @@ GitGuard - Sensitive file scanner before commit
 Author: https://github.com/digo5ds
 """
 
-import argparse
+import os
 import sys
 
-from pygitguard.config.logger import logger
-from pygitguard.helpers.scan_helper import PyGitGuardScan
-from pygitguard.helpers.util_helpers import (
-    create_pre_commit_config,
-    export_config_to_yaml,
+from pygitguard.config.logger import logger, setup_logging
+from pygitguard.config.pygitguard_constants import (
+    BASELINE_FILENAME,
+    PRE_COMMIT_CONFIG_FILENAME,
+    PROFILE_ENVIRONMENT_VARIABLE,
+    PYGITGUARD_FILENAME,
+    WATCH_SOCKET_FILENAME,
 )
 
+# The helpers are imported by the functions using them: the hook runs on
+# every commit, and a scan with nothing to check should not pay for
+# importing yaml, pathspec or sqlite3.
+
+
+# Defaults of the scan options, see `parse_args`
+SCAN_DEFAULTS = {
+    "path": ".",
+    "staged": None,
+    "history": None,
+    "diff": None,
+    "jobs": os.cpu_count() or 1,
+    "use_cache": True,
+    "resume": False,
+    "format": "text",
+    "baseline": None,
+    "profile": None,
+    "use_daemon": True,
+}
+
+# The flags of the scans the pre-commit hook runs, parsed without argparse:
+# flag -> (option, value)
+HOOK_FLAGS = {
+    "--staged": ("staged", True),
+    "--all": ("staged", False),
+    "--diff": ("diff", ""),
+    "--no-cache": ("use_cache", False),
+    "--no-daemon": ("use_daemon", False),
+}
+
+# The HOOK_FLAGS of mutually exclusive options
+SCOPE_FLAGS = ("--staged", "--all", "--diff")
+
+
+def parse_hook_args(argv):
+    """
+    Parses the arguments of a scan made only of HOOK_FLAGS.
+
+    Importing argparse and building the parser take a noticeable part of a
+    pre-commit scan with nothing to check, so the arguments the hook runs
+    with are parsed directly.
+
+    Parameters
+    ----------
+    argv : list of str
+        The arguments.
+
+    Returns
+    -------
+    types.SimpleNamespace or None
+        The arguments, as `parse_args` returns them, or None when 'argv'
+        has other arguments or more than one of SCOPE_FLAGS, which argparse
+        handles.
+    """
+    if any(arg not in HOOK_FLAGS for arg in argv):
+        return None
+    if len({arg for arg in argv if arg in SCOPE_FLAGS}) > 1:
+        return None
+    from types import SimpleNamespace
+
+    args = SimpleNamespace(command=None, **SCAN_DEFAULTS)
+    for arg in argv:
+        name, value = HOOK_FLAGS[arg]
+        setattr(args, name, value)
+    return args
+
+
+def parse_args(argv=None):
+    """
+    Parses the command-line arguments, applying SCAN_DEFAULTS.
+
+    The arguments of the pre-commit hook are parsed by `parse_hook_args`,
+    the others by the parser of `build_parser`.
+
+    Parameters
+    ----------
+    argv : list of str, optional
+        The arguments, `sys.argv[1:]` by default.
+
+    Returns
+    -------
+    argparse.Namespace
+        The parsed arguments.
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    args = parse_hook_args(argv)
+    if args is not None:
+        return args
+    # imported lazily, the scans of the pre-commit hook do not need it
+    from pygitguard.helpers.arguments_helper import build_parser
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    for name, value in SCAN_DEFAULTS.items():
+        if not hasattr(args, name):
+            setattr(args, name, value)
+    if args.resume and args.history is None:
+        parser.error("--resume requires --history")
+    if args.resume and args.command == "baseline":
+        parser.error("--resume can not be used to write a baseline")
+    return args
+
+
+def scan(args, baseline=None, writer=None):
+    """
+    Runs the scan selected by the command-line arguments.
+
+    Exits with status 2 when `.pygitguard.yaml` is not valid. A profiled
+    scan logs its profile when it ends.
+
+    Working tree and staged scans are answered by the `pygitguard watch`
+    daemon of the repository when one is running, unless `--no-daemon`
+    is given; the baseline is applied to its findings here.
+
+    With a 'writer' the findings are written to it as they are found, and
+    the returned collector only counts them.
+
+    Returns
+    -------
+    tuple
+        The `(scanner, findings)` pair.
+    """
+    from pygitguard.helpers.config_helper import ConfigError
+    from pygitguard.helpers.git_helper import cache_location
+    from pygitguard.helpers.scan_helper import PyGitGuardScan
+
+    if (
+        args.use_daemon
+        and args.history is None
+        and args.diff is None
+        and args.profile is None
+        and os.path.exists(
+            os.path.join(cache_location(args.path), WATCH_SOCKET_FILENAME)
+        )
+    ):
+        from pygitguard.helpers.watch_helper import query_daemon
+
+        result = query_daemon(args.path, args.staged)
+        if result is not None:
+            logger.info("Scan answered by the 'pygitguard watch' daemon")
+            scanner = PyGitGuardScan(logger, writer=writer)
+            scanner.baseline = baseline
+            scanner.add_result(result)
+            return scanner, scanner.findings
+
+    profiler = None
+    if args.profile is not None:
+        from pygitguard.helpers.profile_helper import ScanProfiler
+
+        profiler = ScanProfiler(args.profile or None)
+        profiler.start()
+    scanner = PyGitGuardScan(logger, profiler, writer)
+    try:
+        findings = scanner.scan_repository(
+            args.path,
+            staged=args.staged,
+            jobs=args.jobs,
+            use_cache=args.use_cache,
+            history=args.history,
+            resume=args.resume,
+            diff=args.diff,
+            baseline=baseline,
+        )
+    except ConfigError as error:
+        logger.error(f"Invalid configuration: {error}")
+        sys.exit(2)
+    if profiler is not None:
+        profiler.stop()
+        profiler.log_report(logger)
+    return scanner, findings
+
+
+def update_baseline(args, baseline_path):
+    """Writes, or prunes, the baseline from the findings of a scan."""
+    from pygitguard.helpers.baseline_helper import Baseline
+
+    scanner, findings = scan(args)
+    scanner.log_summary()
+    if args.prune:
+        baseline = Baseline.load(baseline_path) or Baseline()
+        removed = baseline.prune(findings)
+        baseline.save(baseline_path)
+        logger.info(f"Baseline: {removed} stale entries removed from {baseline_path}")
+        return
+    baseline = Baseline.from_findings(findings)
+    baseline.save(baseline_path)
+    logger.info(f"Baseline: {len(baseline)} findings written to {baseline_path}")
+
+
+def scan_many(args):
+    """
+    Scans several repositories, reporting the findings of each of them.
+
+    A summary of every repository is logged as its scan completes. Exits
+    with status 2 if a repository could not be scanned, e.g. because of an
+    invalid `.pygitguard.yaml`, and 1 if any repository has blocking
+    findings.
+    """
+    import time
+
+    from pygitguard.helpers import findings_helper
+    from pygitguard.helpers.batch_helper import read_repository_paths, scan_repositories
+
+    if args.format == "sarif":
+        logger.error("scan-many: --format sarif is not supported, use json or jsonl")
+        sys.exit(2)
+    paths = read_repository_paths(args.paths, args.from_file)
+    if not paths:
+        logger.error("scan-many: no repository to scan")
+        sys.exit(2)
+
+    writer_factory = None
+    if args.format == "jsonl":
+
+        def writer_factory(path):
+            return findings_helper.JsonLinesWriter(sys.stdout, {"repository": path})
+
+    start = time.perf_counter()
+    summaries = []
+    repositories = []
+    for repository in scan_repositories(
+        paths, logger, args.jobs, args.use_cache, writer_factory
+    ):
+        summary = repository.summary()
+        summaries.append(summary)
+        if args.format == "json":
+            # not `or`: a collector is falsy when nothing blocks the commit
+            findings = repository.findings if repository.error is None else ()
+            repositories.append(
+                dict(summary, findings=[finding.to_dict() for finding in findings])
+            )
+        if repository.error is not None:
+            logger.error(f"{repository.path}: scan failed: {repository.error}")
+            continue
+        if args.format == "text":
+            findings_helper.render_text(repository.findings, logger)
+        logger.info(
+            f"{repository.path}: {summary['findings']} findings"
+            f"{' blocking the commit' if summary['blocked'] else ''},"
+            f" {summary['files_scanned']} files scanned"
+            f" ({summary['cache_hits']} unchanged) in {summary['seconds']:.2f}s"
+        )
+
+    failed = sum(1 for summary in summaries if summary["error"] is not None)
+    blocked = sum(1 for summary in summaries if summary["blocked"])
+    totals = {
+        "repositories": len(summaries),
+        "blocked": blocked,
+        "failed": failed,
+        "findings": sum(summary["findings"] for summary in summaries),
+        "files_scanned": sum(summary["files_scanned"] for summary in summaries),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    if args.format == "json":
+        import json
+
+        json.dump(
+            {"summary": totals, "repositories": repositories}, sys.stdout, indent=2
+        )
+        sys.stdout.write("\n")
+    logger.info(
+        f"scan-many: {totals['repositories']} repositories,"
+        f" {totals['files_scanned']} files scanned in {totals['seconds']:.1f}s:"
+        f" {blocked} with blocking findings, {failed} failed"
+    )
+    if failed:
+        sys.exit(2)
+    if blocked:
+        sys.exit(1)
+
+
+def watch_repository(args):
+    """Runs the `pygitguard watch` daemon until it is interrupted or terminated."""
+    import signal
+
+    from pygitguard.helpers.watch_helper import ScanDaemon
+
+    def terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, terminate)
+    daemon = ScanDaemon(args.path, logger, args.jobs, args.poll)
+    try:
+        daemon.serve()
+    except KeyboardInterrupt:
+        logger.info("Watch: stopped")
+    except (RuntimeError, OSError) as error:
+        logger.error(f"Watch: {error}")
+        sys.exit(2)
+
+
+def init_repository(path):
+    """
+    Creates the configuration files of PyGitGuard in a repository.
+
+    Existing files are kept as they are.
+
+    Parameters
+    ----------
+    path : str
+        The path to the repository root.
+    """
+    from pygitguard.helpers.util_helpers import (
+        create_pre_commit_config,
+        export_config_to_yaml,
+    )
+
+    export_config_to_yaml(os.path.join(path, PYGITGUARD_FILENAME))
+    create_pre_commit_config(os.path.join(path, PRE_COMMIT_CONFIG_FILENAME))
+
 
 def main():
     """
     Main function to execute the GitGuard sensitive file scanner.
 
-    This function parses command-line arguments to determine the repository path
-    and whether to run in dry-run mode. It invokes the scan_repository function
-    to check for security issues within the specified path. The findings are
-    colorized and printed to the console. If issues are found and not in dry-run
-    mode, the program exits with a status code of 1.
+    This function parses the command-line arguments, configures the console
+    logging and scans the repository: the staged files under pre-commit or
+    with `--staged`, the working tree otherwise, or the history or the
+    added lines with `--history` and `--diff`. The findings are logged, or
+    written to stdout in the `--format` asked for. If any finding blocks
+    the commit, the program exits with a status code of 1.
+
+    With the `baseline` subcommand the findings are recorded in the baseline
+    file instead, and later scans do not report them. The `init` subcommand
+    creates the configuration files, scans never write them.
+    The `watch` subcommand runs a daemon answering the later scans of
+    the repository.
     """
-    export_config_to_yaml()
-    create_pre_commit_config()
+    args = parse_args()
+    setup_logging()
+    if args.command == "init":
+        init_repository(args.path)
+        return
+    if args.command == "watch":
+        watch_repository(args)
+        return
+    if args.command == "scan-many":
+        scan_many(args)
+        return
 
-    parser = argparse.ArgumentParser(
-        description="GitGuard - Sensitive file scanner before commit"
-    )
-    parser.add_argument("--path", default=".", help="Repository path")
-    args = parser.parse_args()
+    if args.staged is None:
+        # pre-commit exports PRE_COMMIT=1 to the hooks it runs
+        args.staged = os.environ.get("PRE_COMMIT") == "1"
+    baseline_path = args.baseline or os.path.join(args.path, BASELINE_FILENAME)
+    if args.profile is None:
+        # "1" profiles the scan, any other value is a pstats file
+        profile = os.environ.get(PROFILE_ENVIRONMENT_VARIABLE, "")
+        if profile not in ("", "0"):
+            args.profile = "" if profile == "1" else profile
+
+    if args.command == "baseline":
+        update_baseline(args, baseline_path)
+        return
+
+    baseline = None
+    if os.path.isfile(baseline_path):
+        from pygitguard.helpers.baseline_helper import Baseline
+
+        baseline = Baseline.load(baseline_path)
+    from pygitguard.helpers import findings_helper
+
+    writer = None
+    if args.format == "jsonl":
+        writer = findings_helper.JsonLinesWriter(sys.stdout)
+    elif args.format == "sarif":
+        writer = findings_helper.SarifWriter(sys.stdout)
+    scanner, findings = scan(args, baseline, writer)
 
-    scanner = PyGitGuardScan(logger)
-    if scanner.scan_repository(args.path):
+    if writer is not None:
+        writer.close()
+    elif args.format == "json":
+        findings_helper.render_json(findings, sys.stdout)
+    else:
+        findings_helper.render_text(findings, logger)
+    scanner.log_summary()
+    if findings:
         logger.info(
             "Your commit are locked by PYGitGuard, you can ignore it"
             "with 'git commit -m [your message] --no-verify'"
@@ -1,6 +1,7 @@
 "Custom logging formatter for PYGITGUARD"
 
 import logging
+import os
 
 # Colors ANSI
 COLOR_CODES = {
@@ -22,15 +23,18 @@ ICONS = {
 }
 
 
+# Format of the log lines
+LOG_FORMAT = "%(asctime)s | %(levelname)s  %(name)s -> %(message)s"
+
+
 class IconOnlyColorFormatter(logging.Formatter):
     """ "
     A custom logging formatter that replaces the log level name
     with an icon and applies ANSI color codes to the entire log message.
 
-    This formatter modifies the log record to display an icon corresponding
-    to the log level instead of the textual level name.
-    It also colors the entire log message line based on the log level
-    using ANSI escape codes.
+    The icon and the color of each level are baked into one formatter per
+    level when the formatter is created, so formatting a record neither
+    modifies it nor does more work than a plain formatter.
 
     Attributes
     None
@@ -41,15 +45,21 @@ class IconOnlyColorFormatter(logging.Formatter):
         with an icon and coloring the message line.
     """
 
+    def __init__(self, fmt=LOG_FORMAT, datefmt=None):
+        super().__init__(fmt, datefmt)
+        self._level_formatters = {
+            level: logging.Formatter(
+                COLOR_CODES[level]
+                + fmt.replace("%(levelname)s", ICONS[level])
+                + RESET_CODE,
+                datefmt,
+            )
+            for level in ICONS
+        }
+
     def format(self, record):
         """
-        Formats a logging record by replacing the level name
-        with an icon and applying ANSI color codes.
-
-        The method modifies the log record to display
-        an icon corresponding to the log level instead
-        of the level name. It also applies an ANSI color
-        to the entire message line based on the log level.
+        Formats a logging record with the icon and ANSI color of its level.
 
         Parameters
         ----------
@@ -61,27 +71,46 @@ class IconOnlyColorFormatter(logging.Formatter):
         str
             The formatted log message with an icon and color.
         """
+        formatter = self._level_formatters.get(record.levelname)
+        if formatter is None:
+            return super().format(record)
+        return formatter.format(record)
 
-        level = record.levelname
-        record.levelname = ICONS.get(level, "")
-
-        # Formata a mensagem normalmente
-        msg = super().format(record)
-
-        # Aplica cor ANSI à linha inteira
-        color = COLOR_CODES.get(level, "")
-        return f"{color}{msg}{RESET_CODE}"
 
+def use_colors(stream):
+    """
+    Tells whether log lines written to 'stream' get colors and icons.
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s | %(levelname)s  %(name)s -> %(message)s",
-    handlers=[logging.StreamHandler()],
-)
+    They do when the stream is a terminal, unless the NO_COLOR environment
+    variable is set, so logs captured by CI or redirected to a file are
+    plain text.
+    """
+    if os.environ.get("NO_COLOR"):
+        return False
+    isatty = getattr(stream, "isatty", None)
+    return isatty is not None and isatty()
 
-handler = logging.getLogger().handlers[0]
-handler.setFormatter(IconOnlyColorFormatter(handler.formatter._fmt))
 
 # Logger de exemplo
 logger = logging.getLogger("PYGITGUARD")
-logger.setLevel(logging.INFO)
+
+
+def setup_logging():
+    """
+    Configures the console output of the command-line tool.
+
+    The root logger gets a stream handler, colored when it writes to a
+    terminal (see `use_colors`), and the PYGITGUARD logger the INFO level.
+    This is called by the CLI only, importing pygitguard does not configure
+    logging.
+    """
+    logging.basicConfig(
+        level=logging.DEBUG,
+        format=LOG_FORMAT,
+        handlers=[logging.StreamHandler()],
+    )
+
+    handler = logging.getLogger().handlers[0]
+    if use_colors(handler.stream):
+        handler.setFormatter(IconOnlyColorFormatter(handler.formatter._fmt))
+    logger.setLevel(logging.INFO)
@@ -1,53 +1,81 @@
 """pygitguard default patterns and settings."""
 
 PYGITGUARD_FILENAME = ".pygitguard.yaml"
+PRE_COMMIT_CONFIG_FILENAME = ".pre-commit-config.yaml"
+
+# Directory, in the git directory of the repository, of the incremental scan
+# cache, the validated configuration and the socket of the daemon
+CACHE_DIRNAME = "pygitguard"
+
+# Directory of the caches at the root of a directory that is not a repository
+STANDALONE_CACHE_DIRNAME = ".pygitguard_cache"
+
+# Unix socket, in the cache directory, of the `pygitguard watch` daemon
+WATCH_SOCKET_FILENAME = "watch.sock"
+
+# Maximum number of files kept in the scan cache
+CACHE_MAX_ENTRIES = 500_000
+
+# Baseline of known findings, at the repository root, suppressed from scans
+BASELINE_FILENAME = ".pygitguard_baseline.json"
+
+# Environment variable profiling the scans, as --profile: "1", or the path
+# of the cProfile statistics file to write
+PROFILE_ENVIRONMENT_VARIABLE = "PYGITGUARD_PROFILE"
+
+# Entry point group of the plugins providing custom content detectors
+DETECTOR_ENTRY_POINT_GROUP = "pygitguard.detectors"
 
 INTERNAL_FILE_IGNORE = [
     PYGITGUARD_FILENAME,
+    BASELINE_FILENAME,
     "requirements.txt",
     ".gitignore",
     "pygitguard_constants.py",
 ]
-# Patterns for sensitive filenames (regex)
-SENSITIVE_PATTERNS = [
-    r".*\.env(\..*)?$",  # .env, .env.local, .env.prod, my.env
-    r".*\.pem(\..*)?$",  # .pem, .pem.bak, .pem.old, mykey.pem
-    r".*\.key(\..*)?$",  # .key, .key.bak, .key.txt, server.key
-    r".*\.crt(\..*)?$",  # .crt, .crt.pem, .crt.bak, cert.crt
-    r".*\.sqlite(\..*)?$",  # .sqlite, .sqlite3, .sqlite.bak, data.sqlite
-    r".*\.db(\..*)?$",  # .db, .db.bak, .db.sqlite, prod.db
-    r".*secret[s]?(\..*)?$",  # secret.txt, secrets.json, mysecrets.txt
-    r".*credential[s]?(\..*)?$",  # credential.json, credentials.txt, usercredentials.csv
-    r".*private\.key(\..*)?$",  # private.key, private.key.bak, myprivate.key
-    r".*id_rsa(\..*)?$",  # id_rsa, id_rsa.pub, backup_id_rsa
-    r".*id_dsa(\..*)?$",  # id_dsa, id_dsa.pub, backup_id_dsa
-    r".*credentials(\..*)?$",  # aws_credentials, aws_credentials.txt, my_aws_credentials
-    r".*passwords?(\..*)?$",  # passwords.txt, my_passwords.json, blabla_password.txt
-    r".*apikeys?(\..*)?$",  # apikeys.txt, blabla_apikey.txt, apikey.json
-    r".*api_keys?(\..*)?$",  # api_keys.txt, blabla_api_key.txt, api_key.json
-    r".*tokens?(\..*)?$",  # tokens.txt, my_token.json, blabla_token.txt
-    r".*usernames?(\..*)?$",  # usernames.txt, admin_username.json, blabla_username.txt
-    r".*users?(\..*)?$",  # users.txt, db_user.json, blabla_user.txt
-    r".*ACCESS_KEYs?(\..*)?$",  # ACCESS_KEY.txt, my_ACCESS_KEYS.json, blabla_ACCESS_KEY.txt
-]
+# Patterns for sensitive filenames (regex), by the rule id of their findings
+SENSITIVE_PATTERN_RULES = {
+    "env-file": r".*\.env(\..*)?$",  # .env, .env.local, .env.prod, my.env
+    "pem-file": r".*\.pem(\..*)?$",  # .pem, .pem.bak, .pem.old, mykey.pem
+    "key-file": r".*\.key(\..*)?$",  # .key, .key.bak, .key.txt, server.key
+    "crt-file": r".*\.crt(\..*)?$",  # .crt, .crt.pem, .crt.bak, cert.crt
+    "sqlite-file": r".*\.sqlite(\..*)?$",  # .sqlite, .sqlite3, .sqlite.bak, data.sqlite
+    "db-file": r".*\.db(\..*)?$",  # .db, .db.bak, .db.sqlite, prod.db
+    "secret-file": r".*secret[s]?(\..*)?$",  # secret.txt, secrets.json, mysecrets.txt
+    "credential-file": r".*credential[s]?(\..*)?$",  # credential.json, credentials.txt, usercredentials.csv
+    "private-key-file": r".*private\.key(\..*)?$",  # private.key, private.key.bak, myprivate.key
+    "id-rsa-file": r".*id_rsa(\..*)?$",  # id_rsa, id_rsa.pub, backup_id_rsa
+    "id-dsa-file": r".*id_dsa(\..*)?$",  # id_dsa, id_dsa.pub, backup_id_dsa
+    "credentials-file": r".*credentials(\..*)?$",  # aws_credentials, aws_credentials.txt, my_aws_credentials
+    "password-file": r".*passwords?(\..*)?$",  # passwords.txt, my_passwords.json, blabla_password.txt
+    "apikey-file": r".*apikeys?(\..*)?$",  # apikeys.txt, blabla_apikey.txt, apikey.json
+    "api-key-file": r".*api_keys?(\..*)?$",  # api_keys.txt, blabla_api_key.txt, api_key.json
+    "token-file": r".*tokens?(\..*)?$",  # tokens.txt, my_token.json, blabla_token.txt
+    "username-file": r".*usernames?(\..*)?$",  # usernames.txt, admin_username.json, blabla_username.txt
+    "user-file": r".*users?(\..*)?$",  # users.txt, db_user.json, blabla_user.txt
+    "access-key-file": r".*ACCESS_KEYs?(\..*)?$",  # ACCESS_KEY.txt, my_ACCESS_KEYS.json, blabla_ACCESS_KEY.txt
+}
+SENSITIVE_PATTERNS = list(SENSITIVE_PATTERN_RULES.values())
 
-# Patterns for sensitive content inside files (regex)
-SENSITIVE_CONTENT = [
-    r"\b\w*password\w*\s*=\s*['\"`].+['\"`]",  # password = '...', my_password = "...", password_my = '...'
-    r"\b\w*passwords\w*\s*=\s*['\"`].+['\"`]",  # passwords = '...', my_passwords = "...", passwords_my = '...'
-    r"\b\w*apikey\w*\s*=\s*['\"`].+['\"`]",  # apikey = '...', my_apikey = "...", apikey_my = '...'
-    r"\b\w*apikeys\w*\s*=\s*['\"`].+['\"`]",  # apikeys = '...', my_apikeys = "...", apikeys_my = '...'
-    r"\b\w*api_key\w*\s*=\s*['\"`].+['\"`]",  # api_key = '...', my_api_key = "...", api_key_my = '...'
-    r"\b\w*api_keys\w*\s*=\s*['\"`].+['\"`]",  # api_keys = '...', my_api_keys = "...", api_keys_my = '...'
-    r"\b\w*token\w*\s*=\s*['\"`].+['\"`]",  # token = '...', my_token = "...", token_my = '...'
-    r"\b\w*tokens\w*\s*=\s*['\"`].+['\"`]",  # tokens = '...', my_tokens = "...", tokens_my = '...'
-    r"\b\w*username\w*\s*=\s*['\"`].+['\"`]",  # username = '...', my_username = "...", username_my = '...'
-    r"\b\w*usernames\w*\s*=\s*['\"`].+['\"`]",  # usernames = '...', my_usernames = "...", usernames_my = '...'
-    r"\b\w*user\w*\s*=\s*['\"`].+['\"`]",  # user = '...', my_user = "...", user_my = '...'
-    r"\b\w*users\w*\s*=\s*['\"`].+['\"`]",  # users = '...', my_users = "...", users_my = '...'
-    r"\b\w*ACCESS_KEY\w*\s*=\s*['\"`].+['\"`]",  # ACCESS_KEY = '...', my_ACCESS_KEY = "...", ACCESS_KEY_my = '...'
-    r"\b\w*ACCESS_KEYS\w*\s*=\s*['\"`].+['\"`]",  # ACCESS_KEYS = '...', my_ACCESS_KEYS = "...", ACCESS_KEYS_my = '...'
-]
+# Patterns for sensitive content inside files (regex), by the rule id of their
+# findings
+SENSITIVE_CONTENT_RULES = {
+    "password-assignment": r"\b\w*password\w*\s*=\s*['\"`].+['\"`]",  # password = '...', my_password = "...", password_my = '...'
+    "passwords-assignment": r"\b\w*passwords\w*\s*=\s*['\"`].+['\"`]",  # passwords = '...', my_passwords = "...", passwords_my = '...'
+    "apikey-assignment": r"\b\w*apikey\w*\s*=\s*['\"`].+['\"`]",  # apikey = '...', my_apikey = "...", apikey_my = '...'
+    "apikeys-assignment": r"\b\w*apikeys\w*\s*=\s*['\"`].+['\"`]",  # apikeys = '...', my_apikeys = "...", apikeys_my = '...'
+    "api-key-assignment": r"\b\w*api_key\w*\s*=\s*['\"`].+['\"`]",  # api_key = '...', my_api_key = "...", api_key_my = '...'
+    "api-keys-assignment": r"\b\w*api_keys\w*\s*=\s*['\"`].+['\"`]",  # api_keys = '...', my_api_keys = "...", api_keys_my = '...'
+    "token-assignment": r"\b\w*token\w*\s*=\s*['\"`].+['\"`]",  # token = '...', my_token = "...", token_my = '...'
+    "tokens-assignment": r"\b\w*tokens\w*\s*=\s*['\"`].+['\"`]",  # tokens = '...', my_tokens = "...", tokens_my = '...'
+    "username-assignment": r"\b\w*username\w*\s*=\s*['\"`].+['\"`]",  # username = '...', my_username = "...", username_my = '...'
+    "usernames-assignment": r"\b\w*usernames\w*\s*=\s*['\"`].+['\"`]",  # usernames = '...', my_usernames = "...", usernames_my = '...'
+    "user-assignment": r"\b\w*user\w*\s*=\s*['\"`].+['\"`]",  # user = '...', my_user = "...", user_my = '...'
+    "users-assignment": r"\b\w*users\w*\s*=\s*['\"`].+['\"`]",  # users = '...', my_users = "...", users_my = '...'
+    "access-key-assignment": r"\b\w*ACCESS_KEY\w*\s*=\s*['\"`].+['\"`]",  # ACCESS_KEY = '...', my_ACCESS_KEY = "...", ACCESS_KEY_my = '...'
+    "access-keys-assignment": r"\b\w*ACCESS_KEYS\w*\s*=\s*['\"`].+['\"`]",  # ACCESS_KEYS = '...', my_ACCESS_KEYS = "...", ACCESS_KEYS_my = '...'
+}
+SENSITIVE_CONTENT = list(SENSITIVE_CONTENT_RULES.values())
 
 # List of best practice files to check for in the project root
 BEST_PRACTICES_FILES = [
@@ -62,5 +90,109 @@ BEST_PRACTICES_FILES = [
     "pyproject.toml",  # Build system and tool configuration (recommended for all Python projects)
 ]
 
-# Maximum file size (in MB) to scan for sensitive content
-MAX_FILE_SIZE_MB = 1  # e.g., 1 means files larger than 1MB will be skipped
+# Maximum file size (in MB) to scan entirely for sensitive content: larger
+# files are reported, and their content scanned as LARGE_FILE_CONTENT_SCAN says
+MAX_FILE_SIZE_MB = 1  # e.g., 1 means files larger than 1MB are only sampled
+
+# How the content of files larger than MAX_FILE_SIZE_MB is scanned, by path
+# glob (the first match wins): "skip" does not scan it, "sample" only scans
+# its first and last `sample_kb` kilobytes. Files matching no glob are skipped.
+LARGE_FILE_CONTENT_SCAN = [
+    {"path": "*", "mode": "sample", "sample_kb": 64},
+]
+
+# Detection of bare high-entropy strings (keys, tokens) in file content, off
+# unless enabled: a token of at least `min_length` base64 characters is
+# reported when its Shannon entropy, in bits per character, exceeds
+# `base64_threshold`, or `hex_threshold` for tokens made only of hex digits.
+# Random hex, as commit SHAs and UUIDs without dashes, scores close to the
+# 4 bits maximum, so any threshold catching hex keys reports them too. Digests
+# with a recognizable context, as in lockfiles and `sha256:` references, are
+# not reported, and the findings are info: they do not block the commit
+ENTROPY_DETECTION = {
+    "enabled": False,
+    "min_length": 20,
+    "base64_threshold": 4.5,
+    "hex_threshold": 3.0,
+}
+
+# Content rules scoped to some files, checked besides SENSITIVE_CONTENT. Each
+# rule has an `id` and either a `pattern` regex or the `detector` of a plugin
+# (with its `options`), and optionally a `severity` (info, warning or
+# critical, the default), `blocking` (whether its findings block the commit,
+# by default for warnings and critical findings), `include` and `exclude`
+# path globs and `file_types`, the extensions of the files it applies to. A
+# rule with the id of a SENSITIVE_CONTENT pattern replaces it, and takes its
+# pattern when it has neither a pattern nor a detector
+RULES = []
+
+# Scan of the members of zip and tar archives, and of the cells of Jupyter
+# notebooks, as if they were files. Members are streamed from the archive in
+# memory; as a guard against decompression bombs, extraction reads at most
+# `max_member_mb` of each member and `max_total_mb` and `max_members` in all,
+# and opens archives nested at most `max_depth` levels deep
+ARCHIVE_SCAN = {
+    "enabled": True,
+    "max_depth": 3,
+    "max_member_mb": 10,
+    "max_total_mb": 50,
+    "max_members": 10000,
+}
+
+# Number of bytes sniffed for a NUL byte to detect binary files
+BINARY_SNIFF_SIZE = 8192
+
+# Extensions always treated as binary: their content is not scanned
+BINARY_EXTENSIONS = [
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".bmp",
+    ".ico",
+    ".pdf",
+    ".zip",
+    ".gz",
+    ".tgz",
+    ".bz2",
+    ".xz",
+    ".7z",
+    ".tar",
+    ".whl",
+    ".egg",
+    ".jar",
+    ".so",
+    ".dll",
+    ".dylib",
+    ".exe",
+    ".pyc",
+    ".pyo",
+    ".o",
+    ".a",
+    ".class",
+    ".woff",
+    ".woff2",
+    ".ttf",
+    ".mp3",
+    ".mp4",
+    ".sqlite",
+    ".sqlite3",
+    ".db",
+]
+
+# Extensions always treated as text: their content is scanned without sniffing
+TEXT_EXTENSIONS = [
+    ".py",
+    ".txt",
+    ".md",
+    ".json",
+    ".yaml",
+    ".yml",
+    ".toml",
+    ".ini",
+    ".cfg",
+    ".conf",
+    ".sh",
+    ".js",
+    ".ts",
+]
@@ -0,0 +1,222 @@
+"""The command-line parser of the pygitguard command."""
+
+import argparse
+import os
+import sys
+
+from pygitguard.config.pygitguard_constants import (
+    BASELINE_FILENAME,
+    PRE_COMMIT_CONFIG_FILENAME,
+    PROFILE_ENVIRONMENT_VARIABLE,
+    PYGITGUARD_FILENAME,
+)
+
+
+class HelpFormatter(argparse.HelpFormatter):
+    """
+    The default argparse help formatter, sized without importing shutil.
+
+    argparse creates a formatter for every argument it adds and sizes it
+    with `shutil.get_terminal_size`; importing shutil for that is a
+    noticeable part of the startup of the pre-commit hook.
+    """
+
+    def __init__(self, prog, indent_increment=2, max_help_position=24, width=None):
+        if width is None:
+            try:
+                columns = int(os.environ["COLUMNS"])
+            except (KeyError, ValueError):
+                try:
+                    columns = os.get_terminal_size(sys.__stdout__.fileno()).columns
+                except (AttributeError, ValueError, OSError):
+                    columns = 80
+            width = columns - 2
+        super().__init__(prog, indent_increment, max_help_position, width)
+
+
+def scan_options_parser():
+    """
+    Builds a parser of the scan options, to be used as a parent parser.
+
+    The options default to `argparse.SUPPRESS` and the SCAN_DEFAULTS of
+    `pygitguard.cli` are only applied after parsing, so a subcommand does not reset options given
+    before it, as in `pygitguard --path repo baseline`, and the parser can
+    be shared by the main parser and the subcommands.
+
+    Returns
+    -------
+    argparse.ArgumentParser
+        The parser, without help.
+    """
+    scan_options = argparse.ArgumentParser(
+        add_help=False,
+        argument_default=argparse.SUPPRESS,
+        formatter_class=HelpFormatter,
+    )
+    scan_options.add_argument("--path", help="Repository path")
+    scope = scan_options.add_mutually_exclusive_group()
+    scope.add_argument(
+        "--staged",
+        dest="staged",
+        action="store_true",
+        help="Scan only the files staged for commit (default under pre-commit)",
+    )
+    scope.add_argument(
+        "--all",
+        dest="staged",
+        action="store_false",
+        help="Scan the whole working tree (default outside pre-commit)",
+    )
+    scope.add_argument(
+        "--history",
+        nargs="?",
+        const="HEAD",
+        metavar="REV_RANGE",
+        help="Scan every blob in the history of REV_RANGE (default: HEAD)",
+    )
+    scope.add_argument(
+        "--diff",
+        nargs="?",
+        const="",
+        metavar="BASE..HEAD",
+        help="Scan only the lines added by the staged changes, or by BASE..HEAD",
+    )
+    scan_options.add_argument(
+        "--jobs",
+        type=int,
+        help="Number of processes scanning the working tree (default: CPU count)",
+    )
+    scan_options.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Do not use the incremental scan cache in .git/pygitguard/",
+    )
+    scan_options.add_argument(
+        "--resume",
+        action="store_true",
+        help="With --history, skip the commits scanned by the previous"
+        " --resume scans of the same range, whose findings are not reported"
+        " again, and record the commits scanned now",
+    )
+    scan_options.add_argument(
+        "--format",
+        choices=("text", "json", "jsonl", "sarif"),
+        help="Output format of the findings; json, jsonl and sarif are written"
+        " to stdout, jsonl and sarif as the findings are found",
+    )
+    scan_options.add_argument(
+        "--baseline",
+        metavar="FILE",
+        help=f"Baseline of known findings (default: <path>/{BASELINE_FILENAME})",
+    )
+    scan_options.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        metavar="PSTATS_FILE",
+        help="Log the time of each phase, the slowest files and the most"
+        " expensive rules, and write cProfile statistics to PSTATS_FILE if"
+        f" given (also enabled by {PROFILE_ENVIRONMENT_VARIABLE}=1 or"
+        f" {PROFILE_ENVIRONMENT_VARIABLE}=PSTATS_FILE)",
+    )
+    scan_options.add_argument(
+        "--no-daemon",
+        dest="use_daemon",
+        action="store_false",
+        help="Scan in this process even when 'pygitguard watch' runs",
+    )
+
+    return scan_options
+
+
+def build_parser():
+    """
+    Builds the command-line parser.
+
+    The scan options are shared by the default scan and the subcommands,
+    so `pygitguard --all` and `pygitguard baseline --all` scan the same
+    files.
+
+    Returns
+    -------
+    argparse.ArgumentParser
+        The parser.
+    """
+    scan_options = scan_options_parser()
+    parser = argparse.ArgumentParser(
+        description="GitGuard - Sensitive file scanner before commit",
+        parents=[scan_options],
+        formatter_class=HelpFormatter,
+    )
+    commands = parser.add_subparsers(dest="command")
+    init = commands.add_parser(
+        "init",
+        formatter_class=HelpFormatter,
+        help=f"Create {PYGITGUARD_FILENAME} and {PRE_COMMIT_CONFIG_FILENAME}"
+        " in the repository",
+    )
+    init.add_argument("--path", default=argparse.SUPPRESS, help="Repository path")
+    baseline = commands.add_parser(
+        "baseline",
+        parents=[scan_options],
+        formatter_class=HelpFormatter,
+        help="Record the current findings as known, so scans stop reporting them",
+    )
+    baseline.add_argument(
+        "--prune",
+        action="store_true",
+        help="Only remove the baseline entries that no longer match a finding",
+    )
+    scan_many = commands.add_parser(
+        "scan-many",
+        formatter_class=HelpFormatter,
+        help="Scan the working trees of many repositories in one process,"
+        " with a shared worker pool",
+    )
+    scan_many.add_argument("paths", nargs="*", metavar="PATH", help="Repository paths")
+    scan_many.add_argument(
+        "--from-file",
+        metavar="FILE",
+        help="A file listing repository paths, one per line ('-' for stdin)",
+    )
+    scan_many.add_argument(
+        "--jobs",
+        type=int,
+        default=argparse.SUPPRESS,
+        help="Number of processes scanning the files of all the repositories"
+        " (default: CPU count)",
+    )
+    scan_many.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        default=argparse.SUPPRESS,
+        help="Do not use the scan cache of the repositories",
+    )
+    scan_many.add_argument(
+        "--format",
+        choices=("text", "json", "jsonl"),
+        default=argparse.SUPPRESS,
+        help="Output format: a report per repository as log lines or one"
+        " JSON document, or the findings as JSON Lines with their repository",
+    )
+    watch = commands.add_parser(
+        "watch",
+        formatter_class=HelpFormatter,
+        help="Keep the scan results in memory, rescanning changed files, and"
+        " answer the scans of the pre-commit hook",
+    )
+    watch.add_argument("--path", default=argparse.SUPPRESS, help="Repository path")
+    watch.add_argument(
+        "--jobs",
+        type=int,
+        default=argparse.SUPPRESS,
+        help="Number of processes of the first scan (default: CPU count)",
+    )
+    watch.add_argument(
+        "--poll",
+        action="store_true",
+        help="Walk the repository periodically instead of using inotify",
+    )
+    return parser
@@ -0,0 +1,154 @@
+"""A baseline of known findings, suppressed from later scans."""
+
+import hashlib
+import json
+import os
+
+from pygitguard.__version__ import get_version
+
+BASELINE_VERSION = 1
+
+# Length of the hex fingerprints, sha256 digests
+FINGERPRINT_LENGTH = 64
+
+
+def normalize_match(text):
+    """Collapses the whitespace of a matched text, so re-indenting keeps it."""
+    return " ".join(text.split())
+
+
+def finding_fingerprint(finding):
+    """
+    Returns the fingerprint identifying a finding in a baseline.
+
+    The fingerprint hashes the rule id, the path and the normalized matched
+    text, not the line number, so it survives edits moving the line.
+
+    Parameters
+    ----------
+    finding : Finding
+        The finding.
+
+    Returns
+    -------
+    str
+        A hex digest.
+    """
+    matched = ""
+    if finding.snippet is not None and finding.span is not None:
+        matched = normalize_match(finding.snippet[finding.span[0] : finding.span[1]])
+    key = "\0".join((finding.rule_id, finding.path, matched))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class Baseline:
+    """
+    A set of finding fingerprints, the known findings a scan does not report.
+
+    The baseline is a JSON file listing one `"<fingerprint> <location>"`
+    entry per known finding, the location being there for reviewers. A
+    flat list of strings loads several times faster than a JSON object,
+    and once loaded, checking a finding is a set lookup.
+
+    Examples
+    --------
+    >>> baseline = Baseline.load(".pygitguard_baseline.json")
+    >>> new_findings = [f for f in findings if f not in baseline]
+    """
+
+    def __init__(self, entries=()):
+        """
+        Parameters
+        ----------
+        entries : iterable of str
+            The `"<fingerprint> <location>"` entries.
+        """
+        self.entries = list(entries)
+        self.fingerprints = {entry[:FINGERPRINT_LENGTH] for entry in self.entries}
+
+    @classmethod
+    def from_findings(cls, findings):
+        """Returns a baseline of all the given findings."""
+        entries = {}
+        for finding in findings:
+            location = finding.path
+            if finding.line is not None:
+                location = f"{location}:{finding.line}"
+            entries.setdefault(finding_fingerprint(finding), location)
+        return cls(
+            f"{fingerprint} {location}" for fingerprint, location in entries.items()
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a baseline file.
+
+        Parameters
+        ----------
+        path : str
+            The path to the baseline file.
+
+        Returns
+        -------
+        Baseline or None
+            The baseline, or None if the file does not exist.
+
+        Raises
+        ------
+        ValueError
+            If the file is not a baseline.
+        """
+        if not os.path.isfile(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or not isinstance(data.get("findings"), list):
+            raise ValueError(f"{path} is not a PyGitGuard baseline")
+        return cls(data["findings"])
+
+    def save(self, path):
+        """
+        Writes the baseline file, with the entries sorted for stable diffs.
+
+        Parameters
+        ----------
+        path : str
+            The path to the baseline file.
+        """
+        data = {
+            "version": BASELINE_VERSION,
+            "generated_by": f"PyGitGuard {get_version()}",
+            "findings": sorted(self.entries),
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=0)
+            f.write("\n")
+
+    def prune(self, findings):
+        """
+        Drops the entries that no longer match any of the given findings.
+
+        Parameters
+        ----------
+        findings : iterable of Finding
+            The findings of a scan without baseline.
+
+        Returns
+        -------
+        int
+            The number of stale entries removed.
+        """
+        current = {finding_fingerprint(finding) for finding in findings}
+        count = len(self.entries)
+        self.entries = [
+            entry for entry in self.entries if entry[:FINGERPRINT_LENGTH] in current
+        ]
+        self.fingerprints &= current
+        return count - len(self.entries)
+
+    def __contains__(self, finding):
+        return finding_fingerprint(finding) in self.fingerprints
+
+    def __len__(self):
+        return len(self.entries)
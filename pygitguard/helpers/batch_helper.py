@@ -0,0 +1,169 @@
+"""Scans of the working trees of many repositories in one process."""
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from pygitguard.config.pygitguard_constants import BASELINE_FILENAME
+from pygitguard.helpers.config_helper import ConfigError
+from pygitguard.helpers.scan_helper import PyGitGuardScan, create_shared_executor
+
+# Repositories walked at the same time, feeding the shared worker pool
+REPOSITORY_THREADS = 4
+
+
+def read_repository_paths(paths=(), list_file=None):
+    """
+    Returns the repositories to scan, in order and without duplicates.
+
+    Parameters
+    ----------
+    paths : iterable of str
+        The repository paths given on the command line.
+    list_file : str, optional
+        A file listing more paths, one per line, or "-" for stdin. Blank
+        lines and lines starting with `#` are skipped.
+
+    Returns
+    -------
+    list of str
+        The paths.
+    """
+    paths = list(paths)
+    if list_file is not None:
+        if list_file == "-":
+            lines = sys.stdin.read().splitlines()
+        else:
+            with open(list_file, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        paths.extend(
+            line.strip()
+            for line in lines
+            if line.strip() and not line.lstrip().startswith("#")
+        )
+    return list(dict.fromkeys(paths))
+
+
+class RepositoryScan:
+    """
+    The outcome of the scan of one repository of a batch.
+
+    Attributes
+    ----------
+    path : str
+        The path to the repository, as given.
+    scanner : PyGitGuardScan
+        The scanner, with the counters of the scan.
+    findings : FindingCollector or None
+        The findings, None when the scan failed.
+    error : str or None
+        Why the scan failed, e.g. an invalid `.pygitguard.yaml`.
+    seconds : float
+        The wall time of the scan.
+    """
+
+    def __init__(self, path, scanner, findings, error, seconds):
+        self.path = path
+        self.scanner = scanner
+        self.findings = findings
+        self.error = error
+        self.seconds = seconds
+
+    @property
+    def blocked(self):
+        """True if the repository has findings blocking a commit."""
+        return bool(self.findings)
+
+    def summary(self):
+        """
+        Returns the counters of the scan, as a JSON-serializable dictionary.
+
+        Returns
+        -------
+        dict
+            The path, number of findings, whether they block a commit, the
+            scan counters, the wall time and the error, if any.
+        """
+        scanner = self.scanner
+        return {
+            "path": self.path,
+            "findings": len(self.findings) if self.findings is not None else 0,
+            "blocked": self.blocked,
+            "files_scanned": scanner.files_scanned,
+            "binary_files_skipped": scanner.binary_files_skipped,
+            "large_files_capped": scanner.large_files_capped,
+            "cache_hits": scanner.cache_hits,
+            "findings_suppressed": scanner.findings_suppressed,
+            "seconds": round(self.seconds, 3),
+            "error": self.error,
+        }
+
+
+def scan_repositories(paths, logger, jobs=1, use_cache=True, writer_factory=None):
+    """
+    Scans the working trees of several repositories, sharing one worker pool.
+
+    Every repository is scanned as by `pygitguard --all`, with its own
+    `.pygitguard.yaml`, baseline and cache, but the files of all of them
+    are scanned by one pool of 'jobs' processes, whose workers compile
+    each distinct rule set once. REPOSITORY_THREADS repositories are
+    walked at the same time, so the pool keeps busy while the next
+    repositories are listed and their cached results read.
+
+    Parameters
+    ----------
+    paths : list of str
+        The paths to the repositories.
+    logger : logging.Logger
+        The logger of the scans.
+    jobs : int
+        The number of worker processes; with 1 the files are scanned in
+        this process.
+    use_cache : bool
+        When True the scan cache of each repository is used and updated.
+    writer_factory : callable, optional
+        Called with the path of each repository, returns the writer its
+        findings are streamed to, see `PyGitGuardScan`.
+
+    Yields
+    ------
+    RepositoryScan
+        The scan of each repository, in the order of 'paths'.
+    """
+    executor = create_shared_executor(jobs) if jobs > 1 else None
+
+    def scan_one(path):
+        start = perf_counter()
+        writer = writer_factory(path) if writer_factory is not None else None
+        scanner = PyGitGuardScan(logger, writer=writer)
+        scanner.executor = executor
+        try:
+            if not os.path.isdir(path):
+                raise NotADirectoryError(f"{path} is not a directory")
+            baseline = None
+            baseline_path = os.path.join(path, BASELINE_FILENAME)
+            if os.path.isfile(baseline_path):
+                from pygitguard.helpers.baseline_helper import Baseline
+
+                baseline = Baseline.load(baseline_path)
+            findings = scanner.scan_repository(
+                path, jobs=jobs, use_cache=use_cache, baseline=baseline
+            )
+        except ConfigError as error:
+            error = f"Invalid configuration: {error}"
+            return RepositoryScan(path, scanner, None, error, perf_counter() - start)
+        except (OSError, ValueError) as error:
+            return RepositoryScan(
+                path, scanner, None, str(error), perf_counter() - start
+            )
+        return RepositoryScan(path, scanner, findings, None, perf_counter() - start)
+
+    try:
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(REPOSITORY_THREADS, len(paths)))
+        ) as threads:
+            yield from threads.map(scan_one, paths)
+    finally:
+        if executor is not None:
+            executor.shutdown()
@@ -0,0 +1,271 @@
+"""A persistent cache of per-file scan results, for incremental scans."""
+
+import hashlib
+import json
+import os
+import sqlite3
+
+from pygitguard.__version__ import get_version
+from pygitguard.config.pygitguard_constants import (
+    CACHE_MAX_ENTRIES,
+    STANDALONE_CACHE_DIRNAME,
+)
+from pygitguard.helpers.git_helper import cache_location
+
+CACHE_FILENAME = "scan_cache.sqlite3"
+CHECKPOINT_FILENAME = "history_checkpoint.json"
+
+# Bumped whenever the shape of the cached results changes
+CACHE_FORMAT = 6
+
+
+def rules_fingerprint(*config):
+    """
+    Returns a fingerprint of the active rule set.
+
+    Parameters
+    ----------
+    *config
+        The configuration values the results depend on, as loaded from
+        `.pygitguard.yaml`. They must have a deterministic repr.
+
+    Returns
+    -------
+    str
+        A hex digest that changes whenever a rule, a setting, the
+        PyGitGuard version or the CACHE_FORMAT changes.
+    """
+    salt = (get_version(), CACHE_FORMAT)
+    return hashlib.sha256(repr(salt + config).encode("utf-8")).hexdigest()
+
+
+def cache_directory(base_path):
+    """
+    Returns the cache directory of a repository, creating it if needed.
+
+    The directory is `pygitguard/` in the git directory, see
+    `cache_location`. Outside of a git repository it is at the root of the
+    directory, and holds a `.gitignore` ignoring all of its content.
+
+    Parameters
+    ----------
+    base_path : str
+        The path to the repository root.
+
+    Returns
+    -------
+    str
+        The path to the cache directory.
+    """
+    cache_dir = cache_location(base_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    if os.path.basename(cache_dir) == STANDALONE_CACHE_DIRNAME:
+        gitignore = os.path.join(cache_dir, ".gitignore")
+        if not os.path.exists(gitignore):
+            with open(gitignore, "w", encoding="utf-8") as f:
+                f.write("# Created by PyGitGuard\n*\n")
+    return cache_dir
+
+
+class ScanCache:
+    """
+    An on-disk cache mapping unchanged files to their previous scan results.
+
+    Entries live in a SQLite database in the cache directory, `.git/pygitguard/`
+    in a repository, and are keyed by path, size, mtime_ns and inode. The
+    whole cache is dropped when the rule set fingerprint changes, and the
+    least recently used entries are evicted beyond `max_entries`.
+
+    The entries are loaded in memory when the cache is opened, so a lookup
+    is a dictionary access, and writes are flushed in one transaction when
+    it is closed.
+
+    Examples
+    --------
+    >>> with ScanCache(".", fingerprint) as cache:
+    ...     result = cache.get(rel_path, stat)
+    ...     if result is None:
+    ...         cache.put(rel_path, stat, scan(rel_path))
+    """
+
+    def __init__(self, base_path, fingerprint, max_entries=CACHE_MAX_ENTRIES):
+        """
+        Opens, or creates, the cache of the repository at 'base_path'.
+
+        Parameters
+        ----------
+        base_path : str
+            The path to the repository root.
+        fingerprint : str
+            The fingerprint of the active rule set, see `rules_fingerprint`.
+        max_entries : int
+            The maximum number of files kept in the cache.
+        """
+        self.max_entries = max_entries
+        self._db = sqlite3.connect(
+            os.path.join(cache_directory(base_path), CACHE_FILENAME)
+        )
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime_ns INTEGER,
+                inode INTEGER,
+                result TEXT,
+                last_run INTEGER
+            );
+            """)
+        meta = dict(self._db.execute("SELECT key, value FROM meta"))
+        self._run = int(meta.get("run", 0)) + 1
+        if meta.get("fingerprint") != fingerprint:
+            self._db.execute("DELETE FROM files")
+        self._db.executemany(
+            "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+            [("fingerprint", fingerprint), ("run", str(self._run))],
+        )
+
+        self._entries = {
+            path: ((size, mtime_ns, inode), result)
+            for path, size, mtime_ns, inode, result in self._db.execute(
+                "SELECT path, size, mtime_ns, inode, result FROM files"
+            )
+        }
+        self._hits = []
+        self._writes = []
+        self.hits = self.misses = 0
+
+    def get(self, rel_path, stat):
+        """
+        Returns the cached result of a file, if it did not change since.
+
+        Parameters
+        ----------
+        rel_path : str
+            The path of the file relative to the repository root.
+        stat : os.stat_result
+            The current stat of the file.
+
+        Returns
+        -------
+        object or None
+            The cached result, or None when the file is not cached or changed.
+        """
+        entry = self._entries.get(rel_path)
+        if entry is None or entry[0] != (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._hits.append(rel_path)
+        return json.loads(entry[1])
+
+    def put(self, rel_path, stat, result):
+        """
+        Stores the result of a file.
+
+        Parameters
+        ----------
+        rel_path : str
+            The path of the file relative to the repository root.
+        stat : os.stat_result
+            The stat of the file when it was scanned.
+        result : object
+            The JSON-serializable scan result.
+        """
+        self._writes.append(
+            (
+                rel_path,
+                stat.st_size,
+                stat.st_mtime_ns,
+                stat.st_ino,
+                json.dumps(result),
+                self._run,
+            )
+        )
+
+    def close(self):
+        """Flushes the pending writes, evicts old entries and closes the database."""
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", self._writes
+            )
+            self._db.executemany(
+                "UPDATE files SET last_run = ? WHERE path = ?",
+                ((self._run, path) for path in self._hits),
+            )
+            (count,) = self._db.execute("SELECT COUNT(*) FROM files").fetchone()
+            if count > self.max_entries:
+                self._db.execute(
+                    "DELETE FROM files WHERE path IN"
+                    " (SELECT path FROM files ORDER BY last_run LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class HistoryCheckpoint:
+    """
+    The commits already scanned by previous history scans of a revision range.
+
+    The checkpoint stores commits whose whole ancestry was scanned, so a
+    later scan of the same range can exclude them and only process the new
+    history. It is saved in the cache directory and is reset when the rule
+    set fingerprint changes, since old history must then be scanned again.
+
+    Examples
+    --------
+    >>> checkpoint = HistoryCheckpoint(".", "HEAD", fingerprint)
+    >>> scan(exclude=checkpoint.commits)
+    >>> checkpoint.save(scanned_tips)
+    """
+
+    def __init__(self, base_path, rev_range, fingerprint):
+        """
+        Loads the checkpoint of 'rev_range' in the repository at 'base_path'.
+
+        Parameters
+        ----------
+        base_path : str
+            The path to the repository root.
+        rev_range : str
+            The revision range of the history scan, the checkpoint key.
+        fingerprint : str
+            The fingerprint of the active rule set, see `rules_fingerprint`.
+        """
+        self.path = os.path.join(cache_directory(base_path), CHECKPOINT_FILENAME)
+        self.rev_range = rev_range
+        self.fingerprint = fingerprint
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._ranges = json.load(f)
+        except (OSError, ValueError):
+            self._ranges = {}
+        entry = self._ranges.get(rev_range, {})
+        self.commits = (
+            entry.get("commits", []) if entry.get("fingerprint") == fingerprint else []
+        )
+
+    def save(self, commits):
+        """
+        Replaces the scanned commits of the range and writes the checkpoint.
+
+        Parameters
+        ----------
+        commits : list of str
+            Commits whose whole ancestry was scanned.
+        """
+        self.commits = list(commits)
+        self._ranges[self.rev_range] = {
+            "fingerprint": self.fingerprint,
+            "commits": self.commits,
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._ranges, f, indent=2)
+        os.replace(tmp_path, self.path)
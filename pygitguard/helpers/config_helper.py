@@ -0,0 +1,618 @@
+"""Loading, validation and caching of the `.pygitguard.yaml` configuration."""
+
+import marshal
+import os
+import re
+import sys
+
+from pygitguard.__version__ import get_version
+from pygitguard.config.pygitguard_constants import (
+    ARCHIVE_SCAN,
+    BEST_PRACTICES_FILES,
+    BINARY_EXTENSIONS,
+    ENTROPY_DETECTION,
+    INTERNAL_FILE_IGNORE,
+    LARGE_FILE_CONTENT_SCAN,
+    MAX_FILE_SIZE_MB,
+    PYGITGUARD_FILENAME,
+    RULES,
+    SENSITIVE_CONTENT,
+    SENSITIVE_PATTERNS,
+    TEXT_EXTENSIONS,
+)
+from pygitguard.helpers.findings_helper import (
+    SEVERITY_CRITICAL,
+    SEVERITY_INFO,
+    SEVERITY_WARNING,
+    pattern_rule_id,
+)
+from pygitguard.helpers.git_helper import cache_location
+from pygitguard.helpers.pattern_helper import (
+    compile_content_patterns,
+    compile_filename_patterns,
+)
+from pygitguard.helpers.rule_helper import Rule, compile_rules, detector_versions
+
+CONFIG_CACHE_FILENAME = "config.marshal"
+
+# Bumped whenever the shape of the cached configuration changes
+CONFIG_CACHE_FORMAT = 6
+
+# The settings of `.pygitguard.yaml` and their defaults
+CONFIG_DEFAULTS = {
+    "MAX_FILE_SIZE_MB": MAX_FILE_SIZE_MB,
+    "SENSITIVE_CONTENT": SENSITIVE_CONTENT,
+    "SENSITIVE_PATTERNS": SENSITIVE_PATTERNS,
+    "INTERNAL_FILE_IGNORE": INTERNAL_FILE_IGNORE,
+    "BEST_PRACTICES_FILES": BEST_PRACTICES_FILES,
+    "BINARY_EXTENSIONS": BINARY_EXTENSIONS,
+    "TEXT_EXTENSIONS": TEXT_EXTENSIONS,
+    "LARGE_FILE_CONTENT_SCAN": LARGE_FILE_CONTENT_SCAN,
+    "ENTROPY_DETECTION": ENTROPY_DETECTION,
+    "ARCHIVE_SCAN": ARCHIVE_SCAN,
+    "RULES": RULES,
+}
+
+LARGE_FILE_MODES = ("skip", "sample")
+
+# The keys of a rule of LARGE_FILE_CONTENT_SCAN
+LARGE_FILE_KEYS = ("path", "mode", "sample_kb")
+
+RULE_SEVERITIES = (SEVERITY_INFO, SEVERITY_WARNING, SEVERITY_CRITICAL)
+
+# The keys of a rule of RULES
+RULE_KEYS = (
+    "id",
+    "pattern",
+    "detector",
+    "options",
+    "severity",
+    "blocking",
+    "include",
+    "exclude",
+    "file_types",
+)
+
+
+class ConfigError(ValueError):
+    """Raised when `.pygitguard.yaml` does not match the configuration schema."""
+
+
+def normalize_extensions(extensions):
+    """Returns the extensions as a lower-cased set, each with a leading dot."""
+    return frozenset(
+        (ext if ext.startswith(".") else f".{ext}").lower() for ext in extensions
+    )
+
+
+def _drop_unknown(mapping, known, where, warnings):
+    """
+    Returns 'mapping' without its keys missing from 'known'.
+
+    Unknown keys, as the settings of another version of PyGitGuard, are
+    ignored with a warning appended to 'warnings', so older and newer
+    configurations keep working.
+    """
+    unknown = sorted(set(mapping) - set(known), key=str)
+    if not unknown:
+        return mapping
+    warnings.append(
+        f"{where}: unknown keys ignored: {', '.join(map(str, unknown))}"
+        f" (expected some of {', '.join(known)})"
+    )
+    return {key: value for key, value in mapping.items() if key in known}
+
+
+def _check_strings(config, key, source):
+    """Checks that the setting 'key' is a list of strings."""
+    value = config[key]
+    if not isinstance(value, list):
+        raise ConfigError(f"{source}: {key} must be a list of strings")
+    for index, item in enumerate(value):
+        if not isinstance(item, str):
+            raise ConfigError(f"{source}: {key}[{index}] must be a string")
+
+
+def _check_patterns(config, key, source, compile_patterns):
+    """
+    Checks that the setting 'key' is a list of valid regex patterns.
+
+    The patterns are compiled with 'compile_patterns', whose matchers are
+    cached per process, so the scan uses the matcher compiled here.
+    """
+    _check_strings(config, key, source)
+    try:
+        compile_patterns(config[key])
+    except re.error:
+        for index, pattern in enumerate(config[key]):
+            try:
+                re.compile(pattern, re.IGNORECASE)
+            except re.error as error:
+                raise ConfigError(
+                    f"{source}: {key}[{index}] is not a valid regex ({error}):"
+                    f" {pattern!r}"
+                ) from None
+        raise
+
+
+def _check_best_practices(config, source):
+    """Checks the BEST_PRACTICES_FILES setting: file names, or `{file: requirement}`."""
+    value = config["BEST_PRACTICES_FILES"]
+    if not isinstance(value, list):
+        raise ConfigError(f"{source}: BEST_PRACTICES_FILES must be a list")
+    for index, item in enumerate(value):
+        if isinstance(item, str):
+            continue
+        if (
+            not isinstance(item, dict)
+            or len(item) != 1
+            or not all(isinstance(v, str) for v in (*item, *item.values()))
+        ):
+            raise ConfigError(
+                f"{source}: BEST_PRACTICES_FILES[{index}] must be a file name or"
+                " a single `file: required_file` mapping"
+            )
+
+
+def _check_large_file_rules(config, source, warnings):
+    """Checks the LARGE_FILE_CONTENT_SCAN rules, see `large_file_sample_size`."""
+    value = config["LARGE_FILE_CONTENT_SCAN"]
+    if not isinstance(value, list):
+        raise ConfigError(f"{source}: LARGE_FILE_CONTENT_SCAN must be a list")
+    for index, rule in enumerate(value):
+        where = f"{source}: LARGE_FILE_CONTENT_SCAN[{index}]"
+        if not isinstance(rule, dict):
+            raise ConfigError(f"{where} must be a mapping")
+        rule = value[index] = _drop_unknown(rule, LARGE_FILE_KEYS, where, warnings)
+        if not isinstance(rule.get("path", "*"), str):
+            raise ConfigError(f"{where}.path must be a glob string")
+        if rule.get("mode", "skip") not in LARGE_FILE_MODES:
+            raise ConfigError(
+                f"{where}.mode must be one of {', '.join(LARGE_FILE_MODES)}"
+            )
+        sample_kb = rule.get("sample_kb", 64)
+        if (
+            isinstance(sample_kb, bool)
+            or not isinstance(sample_kb, int)
+            or sample_kb <= 0
+        ):
+            raise ConfigError(f"{where}.sample_kb must be a positive integer")
+
+
+def _check_entropy_detection(config, source, warnings):
+    """Checks the ENTROPY_DETECTION setting and completes it with its defaults."""
+    value = config["ENTROPY_DETECTION"]
+    if not isinstance(value, dict):
+        raise ConfigError(f"{source}: ENTROPY_DETECTION must be a mapping")
+    where = f"{source}: ENTROPY_DETECTION"
+    value = dict(
+        ENTROPY_DETECTION, **_drop_unknown(value, ENTROPY_DETECTION, where, warnings)
+    )
+    if not isinstance(value["enabled"], bool):
+        raise ConfigError(f"{where}.enabled must be true or false")
+    min_length = value["min_length"]
+    if (
+        isinstance(min_length, bool)
+        or not isinstance(min_length, int)
+        or min_length <= 0
+    ):
+        raise ConfigError(f"{where}.min_length must be a positive integer")
+    for key in ("base64_threshold", "hex_threshold"):
+        threshold = value[key]
+        if isinstance(threshold, bool) or not isinstance(threshold, (int, float)):
+            raise ConfigError(f"{where}.{key} must be a number")
+        if threshold <= 0:
+            raise ConfigError(f"{where}.{key} must be positive")
+    config["ENTROPY_DETECTION"] = value
+
+
+def _check_archive_scan(config, source, warnings):
+    """Checks the ARCHIVE_SCAN setting and completes it with its defaults."""
+    value = config["ARCHIVE_SCAN"]
+    if not isinstance(value, dict):
+        raise ConfigError(f"{source}: ARCHIVE_SCAN must be a mapping")
+    where = f"{source}: ARCHIVE_SCAN"
+    value = dict(ARCHIVE_SCAN, **_drop_unknown(value, ARCHIVE_SCAN, where, warnings))
+    if not isinstance(value["enabled"], bool):
+        raise ConfigError(f"{where}.enabled must be true or false")
+    for key in ("max_depth", "max_members"):
+        limit = value[key]
+        if isinstance(limit, bool) or not isinstance(limit, int) or limit <= 0:
+            raise ConfigError(f"{where}.{key} must be a positive integer")
+    for key in ("max_member_mb", "max_total_mb"):
+        limit = value[key]
+        if isinstance(limit, bool) or not isinstance(limit, (int, float)):
+            raise ConfigError(f"{where}.{key} must be a number")
+        if limit <= 0:
+            raise ConfigError(f"{where}.{key} must be positive")
+    config["ARCHIVE_SCAN"] = value
+
+
+def _check_rules(config, source, warnings):
+    """Checks the RULES setting, see RULE_KEYS."""
+    value = config["RULES"]
+    if not isinstance(value, list):
+        raise ConfigError(f"{source}: RULES must be a list")
+    ids = set()
+    for index, rule in enumerate(value):
+        where = f"{source}: RULES[{index}]"
+        if not isinstance(rule, dict):
+            raise ConfigError(f"{where} must be a mapping")
+        rule = value[index] = _drop_unknown(rule, RULE_KEYS, where, warnings)
+        rule_id = rule.get("id")
+        if not isinstance(rule_id, str) or not rule_id:
+            raise ConfigError(f"{where}.id must be a non-empty string")
+        if rule_id in ids:
+            raise ConfigError(f"{where}.id is not unique: {rule_id}")
+        ids.add(rule_id)
+        if "pattern" in rule and "detector" in rule:
+            raise ConfigError(f"{where} must have either a pattern or a detector")
+        if (
+            "pattern" not in rule
+            and "detector" not in rule
+            and not any(
+                pattern_rule_id(pattern) == rule_id
+                for pattern in config["SENSITIVE_CONTENT"]
+            )
+        ):
+            raise ConfigError(
+                f"{where} must have a pattern or a detector, or the id of a"
+                " SENSITIVE_CONTENT pattern"
+            )
+        if "pattern" in rule:
+            pattern = rule["pattern"]
+            if not isinstance(pattern, str):
+                raise ConfigError(f"{where}.pattern must be a string")
+            try:
+                re.compile(pattern, re.IGNORECASE)
+            except re.error as error:
+                raise ConfigError(
+                    f"{where}.pattern is not a valid regex ({error}): {pattern!r}"
+                ) from None
+        if "detector" in rule and not isinstance(rule["detector"], str):
+            raise ConfigError(f"{where}.detector must be a plugin name")
+        if "options" in rule and "detector" not in rule:
+            raise ConfigError(f"{where}.options is only valid with a detector")
+        if not isinstance(rule.get("options", {}), dict):
+            raise ConfigError(f"{where}.options must be a mapping")
+        if rule.get("severity", SEVERITY_CRITICAL) not in RULE_SEVERITIES:
+            raise ConfigError(
+                f"{where}.severity must be one of {', '.join(RULE_SEVERITIES)}"
+            )
+        if not isinstance(rule.get("blocking", True), bool):
+            raise ConfigError(f"{where}.blocking must be true or false")
+        for key in ("include", "exclude", "file_types"):
+            items = rule.get(key, [])
+            if not isinstance(items, list) or not all(
+                isinstance(item, str) for item in items
+            ):
+                raise ConfigError(f"{where}.{key} must be a list of strings")
+
+
+def validate_config(config, source=PYGITGUARD_FILENAME, warnings=None):
+    """
+    Validates a configuration against the schema and merges it with the defaults.
+
+    Unknown settings, and unknown keys of the settings that are mappings,
+    are ignored with a warning rather than rejected, so a configuration
+    written for another version of PyGitGuard keeps working.
+
+    Parameters
+    ----------
+    config : dict or None
+        The configuration as parsed from YAML. Missing settings take their
+        default value from `pygitguard_constants`.
+    source : str
+        The name of the configuration file, used in error messages.
+    warnings : list, optional
+        Receives the messages about the ignored keys.
+
+    Returns
+    -------
+    dict
+        Every setting of CONFIG_DEFAULTS, with its configured or default value.
+
+    Raises
+    ------
+    ConfigError
+        If a setting has the wrong type, or a pattern is not a valid regex.
+    """
+    if warnings is None:
+        warnings = []
+    if config is None:
+        config = {}
+    if not isinstance(config, dict):
+        raise ConfigError(f"{source}: expected a mapping of settings")
+    merged = dict(
+        CONFIG_DEFAULTS, **_drop_unknown(config, CONFIG_DEFAULTS, source, warnings)
+    )
+
+    max_size_mb = merged["MAX_FILE_SIZE_MB"]
+    if isinstance(max_size_mb, bool) or not isinstance(max_size_mb, (int, float)):
+        raise ConfigError(f"{source}: MAX_FILE_SIZE_MB must be a number")
+    if max_size_mb <= 0:
+        raise ConfigError(f"{source}: MAX_FILE_SIZE_MB must be positive")
+    _check_patterns(merged, "SENSITIVE_CONTENT", source, compile_content_patterns)
+    _check_patterns(merged, "SENSITIVE_PATTERNS", source, compile_filename_patterns)
+    _check_strings(merged, "INTERNAL_FILE_IGNORE", source)
+    _check_strings(merged, "BINARY_EXTENSIONS", source)
+    _check_strings(merged, "TEXT_EXTENSIONS", source)
+    _check_best_practices(merged, source)
+    _check_large_file_rules(merged, source, warnings)
+    _check_entropy_detection(merged, source, warnings)
+    _check_archive_scan(merged, source, warnings)
+    _check_rules(merged, source, warnings)
+    return merged
+
+
+def _cache_key(source):
+    """
+    Returns what a cached configuration is valid for: its YAML and the runtime.
+
+    The YAML is identified by its sha256 digest, so the cache does not store
+    a copy of it.
+    """
+    from hashlib import sha256  # imported lazily, only when there is a YAML
+
+    return (
+        CONFIG_CACHE_FORMAT,
+        get_version(),
+        sys.version_info[:2],
+        sha256(source).hexdigest(),
+    )
+
+
+def _read_cached(cache_path, source):
+    """Returns the cached `(values, warnings)` of 'source', or None."""
+    try:
+        with open(cache_path, "rb") as f:
+            key, values, warnings = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return (values, warnings) if key == _cache_key(source) else None
+
+
+def _write_cached(base_path, source, values, warnings):
+    """Caches the validated configuration, ignoring read-only repositories."""
+    from pygitguard.helpers.cache_helper import cache_directory
+
+    try:
+        cache_path = os.path.join(cache_directory(base_path), CONFIG_CACHE_FILENAME)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            marshal.dump((_cache_key(source), values, warnings), f)
+        os.replace(temp_path, cache_path)
+    except (OSError, ValueError):
+        pass
+
+
+class ScanConfig:
+    """
+    The validated configuration of a repository, merged with the defaults.
+
+    The regex patterns are compiled once per process: when the YAML is
+    validated, or on first use when the validated configuration comes from
+    the cache, so a scan without files to check does not pay for them. A
+    validated configuration is cached in `.git/pygitguard/` under the
+    sha256 of the YAML it was parsed from, so later runs with the same
+    `.pygitguard.yaml` neither import nor run the YAML parser.
+
+    Attributes
+    ----------
+    max_size_mb : int or float
+        MAX_FILE_SIZE_MB.
+    sensitive_content : tuple of str
+        The SENSITIVE_CONTENT patterns, without those replaced by a rule of
+        RULES with their id.
+    sensitive_patterns : tuple of str
+        The SENSITIVE_PATTERNS file name patterns.
+    internal_file_ignore : frozenset of str
+        INTERNAL_FILE_IGNORE.
+    best_practices_files : list
+        BEST_PRACTICES_FILES.
+    binary_extensions, text_extensions : frozenset of str
+        The normalized BINARY_EXTENSIONS and TEXT_EXTENSIONS.
+    large_file_content_scan : tuple of dict
+        The LARGE_FILE_CONTENT_SCAN rules.
+    entropy_detection : dict
+        The ENTROPY_DETECTION settings, completed with their defaults.
+    archive_scan : dict
+        The ARCHIVE_SCAN settings, completed with their defaults.
+    rules : tuple of Rule
+        The RULES.
+    warnings : tuple of str
+        The messages about the unknown keys of the YAML, which are ignored.
+    """
+
+    __slots__ = (
+        "max_size_mb",
+        "sensitive_content",
+        "sensitive_patterns",
+        "internal_file_ignore",
+        "best_practices_files",
+        "binary_extensions",
+        "text_extensions",
+        "large_file_content_scan",
+        "entropy_detection",
+        "archive_scan",
+        "rules",
+        "warnings",
+    )
+
+    def __init__(self, values=None, warnings=()):
+        """
+        Builds the configuration from validated values.
+
+        Parameters
+        ----------
+        values : dict, optional
+            The settings, as returned by `validate_config`. The defaults are
+            used when omitted.
+        warnings : iterable of str
+            The warnings of `validate_config`.
+        """
+        if values is None:
+            values = CONFIG_DEFAULTS
+        self.warnings = tuple(warnings)
+        self.max_size_mb = values["MAX_FILE_SIZE_MB"]
+        # a rule with the id of a SENSITIVE_CONTENT pattern replaces it, the
+        # pattern then only applies to the files of the rule, as the rule
+        replaced = {}
+        if values["RULES"]:
+            rule_ids = {rule["id"] for rule in values["RULES"]}
+            for pattern in values["SENSITIVE_CONTENT"]:
+                rule_id = pattern_rule_id(pattern)
+                if rule_id in rule_ids:
+                    replaced[rule_id] = pattern
+        self.sensitive_content = tuple(
+            pattern
+            for pattern in values["SENSITIVE_CONTENT"]
+            if pattern not in replaced.values()
+        )
+        self.sensitive_patterns = tuple(values["SENSITIVE_PATTERNS"])
+        self.internal_file_ignore = frozenset(values["INTERNAL_FILE_IGNORE"])
+        self.best_practices_files = values["BEST_PRACTICES_FILES"]
+        self.binary_extensions = normalize_extensions(values["BINARY_EXTENSIONS"])
+        self.text_extensions = normalize_extensions(values["TEXT_EXTENSIONS"])
+        self.large_file_content_scan = tuple(values["LARGE_FILE_CONTENT_SCAN"])
+        self.entropy_detection = values["ENTROPY_DETECTION"]
+        self.archive_scan = values["ARCHIVE_SCAN"]
+        self.rules = tuple(
+            Rule(
+                rule["id"],
+                rule.get(
+                    "pattern",
+                    None if "detector" in rule else replaced.get(rule["id"]),
+                ),
+                rule.get("detector"),
+                rule.get("options"),
+                rule.get("severity", SEVERITY_CRITICAL),
+                rule.get("blocking"),
+                rule.get("include", ()),
+                rule.get("exclude", ()),
+                normalize_extensions(rule.get("file_types", ())),
+            )
+            for rule in values["RULES"]
+        )
+
+    @classmethod
+    def load(cls, base_path, use_cache=True):
+        """
+        Loads the configuration of the repository at 'base_path'.
+
+        Parameters
+        ----------
+        base_path : str
+            The path to the repository root.
+        use_cache : bool
+            When True the validated configuration is read from, and written
+            to, `.git/pygitguard/`.
+
+        Returns
+        -------
+        ScanConfig
+            The configuration, the defaults when there is no
+            `.pygitguard.yaml`.
+
+        Raises
+        ------
+        ConfigError
+            If `.pygitguard.yaml` is not valid.
+        """
+        config_path = os.path.join(base_path, PYGITGUARD_FILENAME)
+        try:
+            with open(config_path, "rb") as f:
+                source = f.read()
+        except FileNotFoundError:
+            return cls()
+
+        cache_path = os.path.join(cache_location(base_path), CONFIG_CACHE_FILENAME)
+        cached = _read_cached(cache_path, source) if use_cache else None
+        if cached is not None:
+            return cls(*cached)
+        import yaml  # imported lazily, it is slow to import
+
+        # the libyaml-based loader, when PyYAML was built with it
+        loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        try:
+            config = yaml.load(source, Loader=loader)
+        except yaml.YAMLError as error:
+            raise ConfigError(f"{PYGITGUARD_FILENAME}: invalid YAML: {error}") from None
+        warnings = []
+        values = validate_config(config, warnings=warnings)
+        if use_cache:
+            _write_cached(base_path, source, values, warnings)
+        return cls(values, warnings)
+
+    @property
+    def content_matcher(self):
+        """
+        The compiled ContentMatcher of the SENSITIVE_CONTENT patterns.
+
+        When ENTROPY_DETECTION is enabled it is a SecretMatcher, also
+        reporting high-entropy tokens.
+        """
+        entropy = self.entropy_detection
+        if not entropy["enabled"]:
+            return compile_content_patterns(self.sensitive_content)
+        # imported lazily, the no-op scans of the pre-commit hook do not need it
+        from pygitguard.helpers.entropy_helper import compile_secret_matcher
+
+        return compile_secret_matcher(
+            self.sensitive_content,
+            entropy["min_length"],
+            entropy["base64_threshold"],
+            entropy["hex_threshold"],
+        )
+
+    def matcher_for(self, rel_path):
+        """
+        Returns the content matcher of a file, with the RULES applying to it.
+
+        Files no rule applies to get `content_matcher` itself.
+
+        Parameters
+        ----------
+        rel_path : str
+            The relative path of the file.
+
+        Returns
+        -------
+        ContentMatcher
+            The matcher, or any object with its interface.
+
+        Raises
+        ------
+        ConfigError
+            If the detector plugin of a rule can not be loaded.
+        """
+        if not self.rules:
+            return self.content_matcher
+        return compile_rules(self.rules, self.content_matcher).matcher_for(rel_path)
+
+    @property
+    def filename_matcher(self):
+        """The compiled FilenameMatcher of the SENSITIVE_PATTERNS."""
+        return compile_filename_patterns(self.sensitive_patterns)
+
+    def as_tuple(self):
+        """
+        Returns the settings the scan results depend on, for `rules_fingerprint`.
+
+        Sets are sorted so the tuple has a deterministic repr.
+        """
+        return (
+            self.max_size_mb,
+            self.sensitive_content,
+            self.sensitive_patterns,
+            tuple(sorted(self.internal_file_ignore)),
+            tuple(sorted(self.binary_extensions)),
+            tuple(sorted(self.text_extensions)),
+            self.large_file_content_scan,
+            tuple(sorted(self.entropy_detection.items())),
+            tuple(sorted(self.archive_scan.items())),
+            tuple(rule.key for rule in self.rules),
+            detector_versions(
+                rule.detector for rule in self.rules if rule.detector is not None
+            ),
+        )
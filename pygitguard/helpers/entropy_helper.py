@@ -0,0 +1,403 @@
+"""Detection of bare high-entropy strings, such as keys and tokens, in file content."""
+
+import re
+from collections import Counter
+from functools import lru_cache
+from heapq import merge
+from math import log2
+
+from pygitguard.helpers.findings_helper import ENTROPY_RULE_BASE64, ENTROPY_RULE_HEX
+from pygitguard.helpers.pattern_helper import SCAN_WINDOW_SIZE, compile_content_patterns
+
+# Number of candidate tokens scored at a time
+ENTROPY_BATCH_SIZE = 1024
+
+# Smallest batch scored with NumPy: its import costs as much as scoring
+# thousands of tokens in Python, so only files with many candidates use it
+NUMPY_MIN_BATCH = 1024
+
+# The characters of the candidate tokens, `=` padding excluded
+TOKEN_ALPHABET = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/_-"
+
+# Maps the TOKEN_ALPHABET characters to "a" and the other bytes to a space:
+# candidate tokens are then runs of "a", found with `bytes.find`, which is
+# much faster than a `[...]{n,}` regex retrying at every character of the
+# shorter words
+TOKEN_RUNS = bytes(0x61 if byte in TOKEN_ALPHABET else 0x20 for byte in range(256))
+
+HEX_TOKEN = re.compile(rb"[0-9a-fA-F]+")
+
+# Digests look random but are not secrets: a token starting with an algorithm
+# prefix, as the `sha512-...` of lockfile integrity values and the `h1:...` of
+# go.sum, or following one, as `sha256:...`, or a key naming a digest, as
+# `"checksum": "..."` or `rev: ...`
+HASH_PREFIX = re.compile(
+    rb"(?:sha(?:1|224|256|384|512)|md5|blake2[bs]|h1)[-:=]", re.IGNORECASE
+)
+HASH_CONTEXT = re.compile(
+    rb"(?:(?:sha(?:1|224|256|384|512)|md5|blake2[bs]|h1)[-:=]"
+    rb"|(?<![A-Za-z0-9])(?:integrity|checksum|digest|hash|sha\w*|commit|rev)"
+    rb"['\"]?\s*[:=]\s*['\"]?)$",
+    re.IGNORECASE,
+)
+
+# How far before a token its HASH_CONTEXT is looked for
+HASH_CONTEXT_SIZE = 32
+
+# numpy, and the TOKEN_ALPHABET index of every byte, once imported
+_numpy = None
+_alphabet_index = None
+
+
+def _import_numpy():
+    """Returns the numpy module, or False when it is not installed."""
+    global _numpy, _alphabet_index
+    if _numpy is None:
+        try:
+            import numpy  # optional, imported lazily: it is slow to import
+        except ImportError:
+            _numpy = False
+            return _numpy
+        _alphabet_index = numpy.zeros(256, dtype=numpy.int64)
+        _alphabet_index[numpy.frombuffer(TOKEN_ALPHABET, dtype=numpy.uint8)] = (
+            numpy.arange(len(TOKEN_ALPHABET))
+        )
+        _numpy = numpy
+    return _numpy
+
+
+def shannon_entropy(token):
+    """
+    Returns the Shannon entropy of a token, in bits per character.
+
+    Parameters
+    ----------
+    token : bytes
+        The token.
+
+    Returns
+    -------
+    float
+        `log2(n) - sum(c * log2(c)) / n` over the counts 'c' of each
+        distinct byte of the 'n' bytes of the token.
+    """
+    length = len(token)
+    if not length:
+        return 0.0
+    counts = Counter(token).values()
+    return log2(length) - sum(c * log2(c) for c in counts) / length
+
+
+def is_alphabet_sequence(token):
+    """
+    True if the token is mostly runs of consecutive characters, as `ABC...xyz0123...`.
+
+    Charset listings, as in encoding tables, look random but are not secrets.
+    """
+    steps = sum(1 for a, b in zip(token, token[1:]) if b - a == 1)
+    return steps * 4 >= (len(token) - 1) * 3
+
+
+def is_digest(buffer, start):
+    """True if the token at 'start' in 'buffer' is a digest, see HASH_CONTEXT."""
+    return bool(
+        HASH_PREFIX.match(buffer, start)
+        or HASH_CONTEXT.search(buffer, max(start - HASH_CONTEXT_SIZE, 0), start)
+    )
+
+
+def batch_entropy(tokens):
+    """
+    Returns the Shannon entropy of each token of a batch.
+
+    Large batches are scored with NumPy when it is installed: the tokens
+    are concatenated into one array of TOKEN_ALPHABET indexes and counted
+    in a single `bincount` over `(token, character)` pairs, so no Python
+    code runs per character. Small batches, or a missing NumPy, use
+    `shannon_entropy`.
+
+    Parameters
+    ----------
+    tokens : list of bytes
+        The non-empty tokens, made of TOKEN_ALPHABET characters.
+
+    Returns
+    -------
+    list of float
+        The entropies, in bits per character, in token order.
+    """
+    if len(tokens) < NUMPY_MIN_BATCH or not _import_numpy():
+        return [shannon_entropy(token) for token in tokens]
+
+    np = _numpy
+    count = len(tokens)
+    size = len(TOKEN_ALPHABET)
+    lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=count)
+    data = _alphabet_index[np.frombuffer(b"".join(tokens), dtype=np.uint8)]
+    rows = np.repeat(np.arange(count, dtype=np.int64), lengths)
+    histograms = np.bincount(rows * size + data, minlength=count * size)
+    # sum(c * log2(c)) per token, over the non-zero counts only
+    present = np.flatnonzero(histograms)
+    counts = histograms[present].astype(np.float64)
+    weighted = np.bincount(
+        present // size, weights=counts * np.log2(counts), minlength=count
+    )
+    return (np.log2(lengths) - weighted / lengths).tolist()
+
+
+class EntropyDetector:
+    """
+    Finds tokens whose characters look random, as keys and tokens do.
+
+    Candidates are runs of base64 characters (`A-Za-z0-9+/_-` with `=`
+    padding) of at least `min_length` characters. Tokens made only of hex
+    digits are scored against `hex_threshold`, the others against
+    `base64_threshold`. A token of 'n' characters has an entropy of at most
+    `log2(n)` bits, so tokens too short to reach their threshold are never
+    scored. Numbers, alphabet listings and digests are not reported.
+
+    Attributes
+    ----------
+    min_length : int
+        The shortest candidate token.
+    base64_threshold : float
+        The entropy, in bits per character, above which a base64 token is
+        reported.
+    hex_threshold : float
+        The entropy above which a hex token is reported.
+    """
+
+    def __init__(self, min_length=20, base64_threshold=4.5, hex_threshold=3.0):
+        self.min_length = min_length
+        self.base64_threshold = base64_threshold
+        self.hex_threshold = hex_threshold
+        # the shortest tokens whose entropy can exceed each threshold
+        self._base64_length = max(min_length, int(2**base64_threshold) + 1)
+        self._hex_length = max(min_length, int(2**hex_threshold) + 1)
+        self._run = b"a" * min(self._base64_length, self._hex_length)
+
+    def __candidates(self, buffer, start=0, end=None):
+        """Yields the `(start, end, rule, threshold)` of the candidate tokens."""
+        if end is None:
+            end = len(buffer)
+        base64_threshold, hex_threshold = self.base64_threshold, self.hex_threshold
+        runs = buffer[start:end].translate(TOKEN_RUNS)
+        run, size = self._run, len(runs)
+        pos = 0
+        while True:
+            # the leftmost run of at least len(run) characters from 'pos',
+            # which is never inside a longer run
+            run_start = runs.find(run, pos)
+            if run_start == -1:
+                break
+            pos = runs.find(b" ", run_start + len(run))
+            if pos == -1:
+                pos = size
+            token_start, token_end = start + run_start, start + pos
+            token = buffer[token_start:token_end]
+            # the token spans up to two `=` of padding
+            padding = buffer[token_end : min(token_end + 2, end)]
+            token_end += len(padding) - len(padding.lstrip(b"="))
+            if token.isdigit():
+                # a number, not a hex token
+                continue
+            if HEX_TOKEN.fullmatch(token):
+                if len(token) >= self._hex_length:
+                    yield token_start, token_end, ENTROPY_RULE_HEX, hex_threshold
+            elif len(token) >= self._base64_length:
+                yield token_start, token_end, ENTROPY_RULE_BASE64, base64_threshold
+
+    def iter_tokens(self, buffer, start=0, end=None):
+        """
+        Yields the high-entropy tokens of a buffer, in buffer order.
+
+        Parameters
+        ----------
+        buffer : bytes or mmap.mmap
+            The content to scan.
+        start, end : int, optional
+            The part of the buffer scanned.
+
+        Yields
+        ------
+        tuple
+            `(start, end, rule)` with the offsets of the token in 'buffer'
+            and the rule id of its alphabet.
+        """
+        batch = []
+        for candidate in self.__candidates(buffer, start, end):
+            batch.append(candidate)
+            if len(batch) == ENTROPY_BATCH_SIZE:
+                yield from self.__score(buffer, batch)
+                batch = []
+        if batch:
+            yield from self.__score(buffer, batch)
+
+    def __score(self, buffer, batch):
+        """Yields the candidates of 'batch' above their threshold."""
+        tokens = [buffer[start:end].rstrip(b"=") for start, end, _, _ in batch]
+        for (start, end, rule, threshold), token, entropy in zip(
+            batch, tokens, batch_entropy(tokens)
+        ):
+            if (
+                entropy > threshold
+                and not is_alphabet_sequence(token)
+                and not is_digest(buffer, start)
+            ):
+                yield start, end, rule
+
+    def iter_matches(self, buffer, first_line=1):
+        """
+        Scans a whole buffer, yielding the lines with a high-entropy token.
+
+        The buffer is processed in line-aligned windows of SCAN_WINDOW_SIZE
+        bytes, as by `ContentMatcher.iter_matches`.
+
+        Parameters
+        ----------
+        buffer : bytes or mmap.mmap
+            The content to scan.
+        first_line : int
+            The line number of the first line in 'buffer'.
+
+        Yields
+        ------
+        tuple
+            `(line_number, line, rule, span)` as `ContentMatcher.iter_matches`,
+            for the first high-entropy token of every line.
+        """
+        size = len(buffer)
+        window_start = 0
+        line_number = first_line
+        while window_start < size:
+            window_end = buffer.find(b"\n", min(window_start + SCAN_WINDOW_SIZE, size))
+            window_end = size if window_end == -1 else window_end + 1
+            window = buffer[window_start:window_end]
+            window_start = window_end
+
+            counted = 0
+            reported_end = -1
+            for start, end, rule in self.iter_tokens(window):
+                if start < reported_end:
+                    continue
+                line_start = window.rfind(b"\n", 0, start) + 1
+                line_end = window.find(b"\n", end)
+                if line_end == -1:
+                    line_end = len(window)
+                reported_end = line_end
+                line_number += window.count(b"\n", counted, line_start)
+                counted = line_start
+                raw = window[line_start:line_end]
+                yield line_number, raw.decode("utf-8", errors="ignore"), rule, _span(
+                    raw, start - line_start, end - line_start
+                )
+            line_number += window.count(b"\n", counted)
+
+    def iter_line_matches(self, lines):
+        """
+        Scans separate lines, such as the lines added by a diff.
+
+        Parameters
+        ----------
+        lines : iterable of tuple
+            `(line_number, line)` pairs, with 'line' the raw bytes.
+
+        Yields
+        ------
+        tuple
+            `(line_number, line, rule, span)` for the first high-entropy
+            token of every line.
+        """
+        lines = list(lines)
+        # the lines are joined so their tokens are scored in batches
+        buffer = b"\n".join(raw for _, raw in lines)
+        offsets = []
+        offset = 0
+        for _, raw in lines:
+            offsets.append(offset)
+            offset += len(raw) + 1
+        index = 0
+        reported = -1
+        for start, end, rule in self.iter_tokens(buffer):
+            while index + 1 < len(offsets) and offsets[index + 1] <= start:
+                index += 1
+            if index == reported:
+                continue
+            reported = index
+            line_number, raw = lines[index]
+            line_start = offsets[index]
+            yield line_number, raw.decode("utf-8", errors="ignore"), rule, _span(
+                raw, start - line_start, end - line_start
+            )
+
+
+def _span(raw, start, end):
+    """Converts the byte offsets of an ASCII token in a line to text offsets."""
+    column = len(raw[:start].decode("utf-8", errors="ignore"))
+    return column, column + end - start
+
+
+class SecretMatcher:
+    """
+    The SENSITIVE_CONTENT matcher completed by the entropy detector.
+
+    It has the interface of ContentMatcher, so every scan path reports
+    both. A line matching a content rule is not reported again for its
+    entropy.
+    """
+
+    def __init__(self, matcher, detector):
+        """
+        Parameters
+        ----------
+        matcher : ContentMatcher
+            The compiled SENSITIVE_CONTENT patterns.
+        detector : EntropyDetector
+            The entropy detector.
+        """
+        self.matcher = matcher
+        self.detector = detector
+
+    def iter_matches(self, buffer, first_line=1):
+        """Scans a buffer as `ContentMatcher.iter_matches`, in line order."""
+        content = list(self.matcher.iter_matches(buffer, first_line))
+        lines = {match[0] for match in content}
+        entropy = (
+            match
+            for match in self.detector.iter_matches(buffer, first_line)
+            if match[0] not in lines
+        )
+        return merge(content, entropy, key=lambda match: match[0])
+
+    def iter_line_matches(self, lines):
+        """Scans separate `(line_number, line)` pairs, in line order."""
+        lines = list(lines)
+        content = list(self.matcher.iter_line_matches(lines))
+        matched = {match[0] for match in content}
+        entropy = self.detector.iter_line_matches(
+            [line for line in lines if line[0] not in matched]
+        )
+        return merge(content, entropy, key=lambda match: match[0])
+
+
+@lru_cache(maxsize=32)
+def compile_secret_matcher(patterns, min_length, base64_threshold, hex_threshold):
+    """
+    Returns the SecretMatcher of a configuration, compiling it once.
+
+    Parameters
+    ----------
+    patterns : tuple of str
+        The SENSITIVE_CONTENT patterns.
+    min_length, base64_threshold, hex_threshold
+        The ENTROPY_DETECTION settings, see EntropyDetector.
+
+    Returns
+    -------
+    SecretMatcher
+        The matcher.
+    """
+    return SecretMatcher(
+        compile_content_patterns(patterns),
+        EntropyDetector(min_length, base64_threshold, hex_threshold),
+    )
@@ -0,0 +1,354 @@
+"""Streaming extraction of the members of archives and notebooks, for the content scan."""
+
+import io
+
+# Archive members are reported as `archive.zip!inner/path`
+MEMBER_SEPARATOR = "!"
+
+# Why an archive was not scanned entirely, reported as info findings
+LIMIT_DESCRIPTIONS = {
+    "max_depth": "archives nested deeper than max_depth were not extracted",
+    "max_member_mb": "members larger than max_member_mb were scanned in part",
+    "max_total_mb": "extraction stopped after max_total_mb",
+    "max_members": "extraction stopped after max_members members",
+    "encrypted": "encrypted members were skipped",
+}
+
+# (extension, extractor) pairs by last extension, longest extension first
+_EXTRACTORS = {}
+
+# The extractors parsing the whole file, as opposed to streaming its members
+_WHOLE_FILE_EXTRACTORS = set()
+
+# The errors of a corrupt archive or notebook, see `_extraction_errors`
+_ERRORS = None
+
+
+class ExtractionError(ValueError):
+    """Raised when an archive or a notebook can not be read."""
+
+
+def register_extractor(extensions, extractor, streaming=True):
+    """
+    Registers the content extractor of some file extensions.
+
+    Parameters
+    ----------
+    extensions : iterable of str
+        The extensions, with the leading dot, e.g. ".tar.gz". The longest
+        registered extension matching a file name wins.
+    extractor : callable
+        Called with a binary file object, yields `(inner_path, stream)`
+        for every member, with 'stream' a binary file object the member is
+        read from, or None for a member that can not be read. A member
+        is read before the next one is requested, so the extractor can
+        stream them.
+    streaming : bool
+        False for an extractor parsing the whole file before yielding its
+        first member, as a JSON notebook: such files larger than
+        MAX_FILE_SIZE_MB are not extracted, see `is_streaming`.
+    """
+    if not streaming:
+        _WHOLE_FILE_EXTRACTORS.add(extractor)
+    for extension in extensions:
+        extension = extension.lower()
+        last = extension[extension.rfind(".") :]
+        candidates = [
+            candidate
+            for candidate in _EXTRACTORS.get(last, ())
+            if candidate[0] != extension
+        ]
+        candidates.append((extension, extractor))
+        candidates.sort(key=lambda candidate: -len(candidate[0]))
+        _EXTRACTORS[last] = candidates
+
+
+def extractor_for(name):
+    """
+    Returns the extractor of a file, from its name.
+
+    Parameters
+    ----------
+    name : str
+        The name or path of the file.
+
+    Returns
+    -------
+    callable or None
+        The extractor registered for its extension, None if there is none.
+    """
+    dot = name.rfind(".")
+    if dot < 0:
+        return None
+    candidates = _EXTRACTORS.get(name[dot:].lower())
+    if candidates is None:
+        return None
+    name = name.lower()
+    for extension, extractor in candidates:
+        if name.endswith(extension):
+            return extractor
+    return None
+
+
+def is_streaming(extractor):
+    """
+    Tells whether an extractor streams the members of a file.
+
+    The archives of a streaming extractor are extracted whatever their
+    size, the ExtractionBudget bounding what is read of them.
+    """
+    return extractor not in _WHOLE_FILE_EXTRACTORS
+
+
+def _extraction_errors():
+    """Returns the errors raised by a corrupt archive, importing their modules once."""
+    global _ERRORS
+    if _ERRORS is None:
+        import lzma
+        import tarfile
+        import zipfile
+        import zlib
+
+        _ERRORS = (
+            OSError,
+            ValueError,
+            EOFError,
+            RuntimeError,
+            zlib.error,
+            lzma.LZMAError,
+            tarfile.TarError,
+            zipfile.BadZipFile,
+        )
+    return _ERRORS
+
+
+class ExtractionBudget:
+    """
+    What is left of the ARCHIVE_SCAN limits while an archive is extracted.
+
+    One budget is shared by an archive and every archive nested in it, so
+    a decompression bomb costs at most 'max_total_mb' of reads, however
+    its members are nested.
+
+    Attributes
+    ----------
+    max_depth : int
+        The deepest nesting level extracted, 1 being the archive itself.
+    member_size : int
+        The bytes read of each member.
+    total_size : int
+        The bytes left to read.
+    members : int
+        The members left to read.
+    problems : dict
+        Why the archive was not scanned entirely: a description per limit,
+        see LIMIT_DESCRIPTIONS, and of the first unreadable nested archive.
+    """
+
+    def __init__(self, max_depth, max_member_size, max_total_size, max_members):
+        self.max_depth = max_depth
+        self.member_size = max_member_size
+        self.total_size = max_total_size
+        self.members = max_members
+        self.problems = {}
+
+    @classmethod
+    def from_settings(cls, archive_scan):
+        """Returns the budget of an archive under the ARCHIVE_SCAN settings."""
+        return cls(
+            archive_scan["max_depth"],
+            int(archive_scan["max_member_mb"] * 1024 * 1024),
+            int(archive_scan["max_total_mb"] * 1024 * 1024),
+            archive_scan["max_members"],
+        )
+
+    def exceed(self, limit, description=None):
+        """Records that the extraction hit 'limit'."""
+        self.problems.setdefault(limit, description or LIMIT_DESCRIPTIONS[limit])
+
+    def read(self, stream):
+        """
+        Reads a member, within the limits.
+
+        Parameters
+        ----------
+        stream : file object
+            The member.
+
+        Returns
+        -------
+        bytes or None
+            The content. A member larger than what is left is cut after
+            its last complete line. None once the total size is spent.
+        """
+        if self.total_size <= 0:
+            self.exceed("max_total_mb")
+            return None
+        size = min(self.member_size, self.total_size)
+        data = stream.read(size + 1)
+        if len(data) > size:
+            self.exceed("max_member_mb" if size == self.member_size else "max_total_mb")
+            data = data[: data.rfind(b"\n", 0, size) + 1]
+            self.total_size -= size
+        else:
+            self.total_size -= len(data)
+        return data
+
+
+def iter_members(fileobj, name, budget, depth=1):
+    """
+    Streams the members of an archive or a notebook, within a budget.
+
+    Members with an extractor of their own, such as an archive in an
+    archive, are extracted in turn while the nesting depth allows it.
+
+    Parameters
+    ----------
+    fileobj : file object
+        The content of the archive, opened in binary mode.
+    name : str
+        The name of the archive, which selects its extractor.
+    budget : ExtractionBudget
+        The limits of the extraction, updated as members are read.
+    depth : int
+        The nesting level of the archive.
+
+    Yields
+    ------
+    tuple
+        `(inner_path, content)` for every member, with nested members
+        as `inner.zip!path` and 'content' the bytes of the member.
+
+    Raises
+    ------
+    ExtractionError
+        If the archive can not be read. An unreadable nested archive is
+        recorded in the budget instead.
+    """
+    extractor = extractor_for(name)
+    try:
+        for inner_path, stream in extractor(fileobj):
+            if stream is None:
+                budget.exceed("encrypted")
+                continue
+            if budget.members <= 0:
+                budget.exceed("max_members")
+                return
+            budget.members -= 1
+            nested = extractor_for(inner_path) is not None
+            if nested and depth >= budget.max_depth:
+                budget.exceed("max_depth")
+            data = budget.read(stream)
+            if data is None:
+                return
+            if not nested or depth >= budget.max_depth:
+                yield inner_path, data
+                continue
+            try:
+                for path, content in iter_members(
+                    io.BytesIO(data), inner_path, budget, depth + 1
+                ):
+                    yield f"{inner_path}{MEMBER_SEPARATOR}{path}", content
+            except ExtractionError as error:
+                budget.exceed("unreadable", str(error))
+    except _extraction_errors() as error:
+        raise ExtractionError(f"{name}: {error}") from None
+
+
+def extract_zip(fileobj):
+    """Streams the files of a zip archive, see `register_extractor`."""
+    import zipfile  # imported lazily, like every extractor dependency
+
+    with zipfile.ZipFile(fileobj) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            if info.flag_bits & 0x1:
+                yield info.filename, None
+                continue
+            with archive.open(info) as member:
+                yield info.filename, member
+
+
+def extract_tar(fileobj):
+    """
+    Streams the regular files of a tar archive, see `register_extractor`.
+
+    The archive is read as a stream, compressed or not, so it is never
+    seeked nor held in memory.
+    """
+    import tarfile  # imported lazily, like every extractor dependency
+
+    with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+        for member in archive:
+            if member.isfile():
+                yield member.name, archive.extractfile(member)
+
+
+def _notebook_text(value):
+    """Returns a notebook string field, stored as a string or a list of lines."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return "".join(line for line in value if isinstance(line, str))
+    return ""
+
+
+def _output_text(output):
+    """Returns the text of a cell output: streams, text data and tracebacks."""
+    if not isinstance(output, dict):
+        return ""
+    parts = [_notebook_text(output.get("text"))]
+    data = output.get("data")
+    if isinstance(data, dict):
+        parts.extend(
+            _notebook_text(value)
+            for mime_type, value in data.items()
+            if mime_type.startswith("text/")
+        )
+    if output.get("output_type") == "error":
+        parts.append(f"{output.get('ename', '')}: {output.get('evalue', '')}")
+        traceback = output.get("traceback")
+        if isinstance(traceback, list):
+            parts.extend(line for line in traceback if isinstance(line, str))
+    return "\n".join(part for part in parts if part)
+
+
+def extract_notebook(fileobj):
+    """
+    Streams the source and the text outputs of the cells of a Jupyter notebook.
+
+    A cell is reported as `cells/<index>/source` and its outputs as
+    `cells/<index>/outputs/<index>`, after their position in the notebook
+    JSON, so line numbers are relative to the cell. Images and other
+    binary outputs are skipped.
+    """
+    import json  # imported lazily, like every extractor dependency
+
+    notebook = json.load(fileobj)
+    cells = notebook.get("cells") if isinstance(notebook, dict) else None
+    if not isinstance(cells, list):
+        raise ValueError("not a Jupyter notebook (nbformat 4)")
+    for index, cell in enumerate(cells):
+        if not isinstance(cell, dict):
+            continue
+        source = _notebook_text(cell.get("source"))
+        if source:
+            yield f"cells/{index}/source", io.BytesIO(source.encode("utf-8"))
+        outputs = cell.get("outputs")
+        for output_index, output in enumerate(
+            outputs if isinstance(outputs, list) else ()
+        ):
+            text = _output_text(output)
+            if text:
+                yield (
+                    f"cells/{index}/outputs/{output_index}",
+                    io.BytesIO(text.encode("utf-8")),
+                )
+
+
+register_extractor((".zip", ".jar", ".war", ".ear", ".whl", ".egg"), extract_zip)
+register_extractor(
+    (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz"), extract_tar
+)
+register_extractor((".ipynb",), extract_notebook, streaming=False)
@@ -0,0 +1,492 @@
+"""Structured scan findings and their rendering to text, JSON, JSON Lines and SARIF."""
+
+import logging
+from functools import lru_cache
+
+from pygitguard.__version__ import get_version
+from pygitguard.config.pygitguard_constants import (
+    SENSITIVE_CONTENT_RULES,
+    SENSITIVE_PATTERN_RULES,
+)
+
+SEVERITY_INFO = "info"
+SEVERITY_WARNING = "warning"
+SEVERITY_CRITICAL = "critical"
+
+# Findings of these severities block the commit
+BLOCKING_SEVERITIES = frozenset((SEVERITY_WARNING, SEVERITY_CRITICAL))
+
+LOG_LEVELS = {
+    SEVERITY_INFO: logging.INFO,
+    SEVERITY_WARNING: logging.WARNING,
+    SEVERITY_CRITICAL: logging.CRITICAL,
+}
+
+SARIF_LEVELS = {
+    SEVERITY_INFO: "note",
+    SEVERITY_WARNING: "warning",
+    SEVERITY_CRITICAL: "error",
+}
+
+KIND_FILENAME = "filename"
+KIND_LARGE_FILE = "large-file"
+KIND_CONTENT = "content"
+KIND_ENTROPY = "entropy"
+KIND_BEST_PRACTICE = "best-practice"
+KIND_ARCHIVE = "archive"
+
+# Rule ids of the entropy findings, per alphabet
+ENTROPY_RULE_BASE64 = "entropy-base64"
+ENTROPY_RULE_HEX = "entropy-hex"
+ENTROPY_RULES = (ENTROPY_RULE_BASE64, ENTROPY_RULE_HEX)
+
+# The rule ids of the built-in patterns, by kind of finding and pattern
+BUILTIN_RULE_IDS = {
+    KIND_CONTENT: {
+        pattern: rule_id for rule_id, pattern in SENSITIVE_CONTENT_RULES.items()
+    },
+    KIND_FILENAME: {
+        pattern: rule_id for rule_id, pattern in SENSITIVE_PATTERN_RULES.items()
+    },
+}
+
+# Number of hex digits of the pattern digest in the ids of configured patterns
+PATTERN_ID_LENGTH = 8
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+INFORMATION_URI = "https://github.com/digo5ds/pygitguard"
+
+
+@lru_cache(maxsize=None)
+def pattern_rule_id(pattern, kind=KIND_CONTENT):
+    """
+    Returns the rule id of a SENSITIVE_CONTENT or SENSITIVE_PATTERNS regex.
+
+    Built-in patterns have a fixed short id, e.g. "password-assignment".
+    Patterns added in `.pygitguard.yaml` get the kind followed by the start
+    of the sha256 of the regex, e.g. "content-1f3a9c2e", which stays the
+    same as long as the regex does.
+
+    Parameters
+    ----------
+    pattern : str
+        The regex.
+    kind : str
+        KIND_CONTENT or KIND_FILENAME.
+
+    Returns
+    -------
+    str
+        The rule id.
+    """
+    rule_id = BUILTIN_RULE_IDS[kind].get(pattern)
+    if rule_id is None:
+        # imported lazily, the no-op hook scan has no pattern to report
+        import hashlib
+
+        digest = hashlib.sha256(pattern.encode("utf-8")).hexdigest()
+        rule_id = f"{kind}-{digest[:PATTERN_ID_LENGTH]}"
+    return rule_id
+
+
+class Finding:
+    """
+    A single issue found by a scan.
+
+    Findings are compact `__slots__` records: building one does not format
+    any message, text is only produced when the findings are rendered.
+
+    Attributes
+    ----------
+    kind : str
+        The check that produced it: "filename", "large-file", "content",
+        "entropy", "best-practice" or "archive".
+    rule_id : str
+        The rule that matched, e.g. "password-assignment", see
+        `pattern_rule_id`.
+    severity : str
+        "info", "warning" or "critical". Warnings and critical findings
+        block the commit, unless 'blocks' says otherwise.
+    path : str
+        The path of the file, relative to the repository root. Members of
+        an archive or a notebook are `archive.zip!inner/path`.
+    line : int or None
+        The 1-based line of a content finding.
+    column : int or None
+        The 1-based column where the match starts.
+    span : tuple or None
+        The `(start, end)` character offsets of the match in the line.
+    snippet : str or None
+        The matching line of a content or entropy finding, the file
+        motivating a best practice recommendation, or why an archive was
+        not scanned entirely.
+    commit : str or None
+        The commit that introduced the file, for findings of a history scan.
+    rules : tuple of str or None
+        Every rule matched by a file name, 'rule_id' being the first one. A
+        file is reported once whatever the number of rules it matches.
+    blocks : bool or None
+        Whether the finding blocks the commit, as set by the `blocking`
+        option of a rule of RULES, None to decide from the severity.
+    """
+
+    __slots__ = (
+        "kind",
+        "rule_id",
+        "severity",
+        "path",
+        "line",
+        "column",
+        "span",
+        "snippet",
+        "commit",
+        "rules",
+        "blocks",
+    )
+
+    def __init__(
+        self,
+        kind,
+        rule_id,
+        severity,
+        path,
+        line=None,
+        column=None,
+        span=None,
+        snippet=None,
+        commit=None,
+        rules=None,
+        blocks=None,
+    ):
+        self.kind = kind
+        self.rule_id = rule_id
+        self.severity = severity
+        self.path = path
+        self.line = line
+        self.column = column
+        self.span = tuple(span) if span is not None else None
+        self.snippet = snippet
+        self.commit = commit
+        self.rules = tuple(rules) if rules is not None else None
+        self.blocks = blocks
+
+    @property
+    def blocking(self):
+        """True if the finding blocks the commit."""
+        if self.blocks is not None:
+            return self.blocks
+        return self.severity in BLOCKING_SEVERITIES
+
+    def as_tuple(self):
+        """Returns the fields in slot order, e.g. for serialization."""
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def to_dict(self):
+        """Returns the fields as a JSON-serializable dictionary."""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        if self.span is not None:
+            data["span"] = list(self.span)
+        if self.rules is not None:
+            data["rules"] = list(self.rules)
+        return data
+
+    @property
+    def location(self):
+        """The path, prefixed by the commit as in `git show <commit>:<path>`."""
+        if self.commit is None:
+            return self.path
+        return f"{self.commit[:12]}:{self.path}"
+
+    def message(self):
+        """
+        Returns the human readable description of the finding.
+
+        Returns
+        -------
+        str
+            The message logged by the text output.
+        """
+        if self.kind == KIND_CONTENT:
+            return (
+                f"SENSITIVE content in: {self.location} line:{self.line}:"
+                f" {self.snippet.strip()} (rule: {self.rule_id})"
+            )
+        if self.kind == KIND_ENTROPY:
+            return (
+                f"HIGH ENTROPY string in: {self.location} line:{self.line}:"
+                f" {self.snippet.strip()} (rule: {self.rule_id})"
+            )
+        if self.kind == KIND_FILENAME:
+            message = f"WARNING: sensitive file name: '{self.location}'"
+            if self.rules and len(self.rules) > 1:
+                return f"{message} (rules: {', '.join(self.rules)})"
+            return message
+        if self.kind == KIND_LARGE_FILE:
+            return f"LARGE FILE: {self.location}"
+        if self.kind == KIND_ARCHIVE:
+            return f"ARCHIVE not fully scanned: {self.location}: {self.snippet}"
+        if self.snippet:
+            return (
+                f"RECOMENDED: you are using '{self.snippet}' → consider"
+                f" adding best practice file '{self.path}'"
+            )
+        return f"RECOMENDED: create best practice file '{self.path}'"
+
+    def __eq__(self, other):
+        if not isinstance(other, Finding):
+            return NotImplemented
+        return self.as_tuple() == other.as_tuple()
+
+    def __hash__(self):
+        return hash(self.as_tuple())
+
+    def __repr__(self):
+        return f"Finding({', '.join(repr(value) for value in self.as_tuple())})"
+
+
+class FindingCollector:
+    """
+    Buffers the findings of a scan until they are rendered.
+
+    With a writer, such as a JsonLinesWriter, the findings are written as
+    soon as they are added instead, and are not kept in memory.
+
+    Attributes
+    ----------
+    findings : list of Finding
+        The findings, in the order they were added, when there is no writer.
+    block_commit : bool
+        True once a blocking finding was added.
+    count : int
+        The number of findings added.
+
+    Notes
+    -----
+    The truth value of a collector is `block_commit`, so code testing the
+    result of `PyGitGuardScan.scan_repository` as a bool keeps working.
+    """
+
+    def __init__(self, writer=None):
+        self.findings = []
+        self.block_commit = False
+        self.count = 0
+        self.writer = writer
+
+    def add(self, finding):
+        """Adds a finding, updating `block_commit`."""
+        self.count += 1
+        if self.writer is not None:
+            self.writer.write(finding)
+        else:
+            self.findings.append(finding)
+        if finding.blocking:
+            self.block_commit = True
+
+    def extend(self, findings):
+        """Adds several findings."""
+        for finding in findings:
+            self.add(finding)
+
+    def __iter__(self):
+        return iter(self.findings)
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self.block_commit
+
+
+def render_text(findings, logger):
+    """
+    Renders the findings through a logger, with the severity as log level.
+
+    Parameters
+    ----------
+    findings : iterable of Finding
+        The findings to render.
+    logger : logging.Logger
+        The logger used for the console output.
+    """
+    for finding in findings:
+        logger.log(LOG_LEVELS[finding.severity], finding.message())
+
+
+def render_json(findings, stream):
+    """
+    Writes the findings as a single JSON document.
+
+    Parameters
+    ----------
+    findings : iterable of Finding
+        The findings to render.
+    stream : file object
+        The text stream written to.
+    """
+    import json  # imported lazily, text output does not need it
+
+    json.dump(
+        {"findings": [finding.to_dict() for finding in findings]}, stream, indent=2
+    )
+    stream.write("\n")
+
+
+class JsonLinesWriter:
+    """
+    Writes findings as JSON Lines, one `Finding.to_dict()` object per line.
+
+    Every line is flushed, so a consumer reading a pipe gets each finding
+    as soon as the scan finds it. Each line is written at once, so several
+    writers, e.g. one per repository, can share a stream.
+    """
+
+    def __init__(self, stream, extra=None):
+        """
+        Parameters
+        ----------
+        stream : file object
+            The text stream written to.
+        extra : dict, optional
+            Fields added to every line, e.g. the repository of the findings.
+        """
+        import json  # imported lazily, text output does not need it
+
+        self.stream = stream
+        self.extra = extra
+        self._dumps = json.dumps
+
+    def write(self, finding):
+        """Writes a finding."""
+        data = finding.to_dict()
+        if self.extra:
+            data.update(self.extra)
+        self.stream.write(self._dumps(data) + "\n")
+        self.stream.flush()
+
+    def close(self):
+        """Ends the output."""
+        self.stream.flush()
+
+
+def render_jsonl(findings, stream):
+    """
+    Writes the findings as JSON Lines, see JsonLinesWriter.
+
+    Parameters
+    ----------
+    findings : iterable of Finding
+        The findings to render.
+    stream : file object
+        The text stream written to.
+    """
+    writer = JsonLinesWriter(stream)
+    for finding in findings:
+        writer.write(finding)
+    writer.close()
+
+
+def sarif_result(finding):
+    """
+    Converts a finding into a SARIF 2.1.0 result object.
+
+    Parameters
+    ----------
+    finding : Finding
+        The finding to convert.
+
+    Returns
+    -------
+    dict
+        The SARIF result.
+    """
+    location = {"artifactLocation": {"uri": finding.path}}
+    if finding.line is not None:
+        region = {"startLine": finding.line}
+        if finding.span is not None:
+            region["startColumn"] = finding.span[0] + 1
+            region["endColumn"] = finding.span[1] + 1
+        location["region"] = region
+    result = {
+        "ruleId": finding.rule_id,
+        "level": SARIF_LEVELS[finding.severity],
+        "message": {"text": finding.message()},
+        "locations": [{"physicalLocation": location}],
+    }
+    properties = {}
+    if finding.commit is not None:
+        properties["commit"] = finding.commit
+    if finding.rules is not None and len(finding.rules) > 1:
+        properties["rules"] = list(finding.rules)
+    if properties:
+        result["properties"] = properties
+    return result
+
+
+class SarifWriter:
+    """
+    Writes findings as a SARIF 2.1.0 log, one result at a time.
+
+    The results are written as they come, so the log is never held in
+    memory. The `tool` object of the run, whose rules are only known at
+    the end, is written after the results: the members of a JSON object
+    are unordered, SARIF consumers read it the same.
+    """
+
+    def __init__(self, stream):
+        """
+        Parameters
+        ----------
+        stream : file object
+            The text stream written to.
+        """
+        import json  # imported lazily, text output does not need it
+
+        self.stream = stream
+        self._dumps = json.dumps
+        self._rule_ids = set()
+        self._started = False
+
+    def __start(self):
+        """Writes the beginning of the log, up to the results array."""
+        self._started = True
+        header = self._dumps({"$schema": SARIF_SCHEMA, "version": "2.1.0"})
+        self.stream.write(header[:-1] + ', "runs": [{"results": [')
+
+    def write(self, finding):
+        """Writes the result of a finding."""
+        if self._started:
+            self.stream.write(",")
+        else:
+            self.__start()
+        self.stream.write("\n  " + self._dumps(sarif_result(finding)))
+        self._rule_ids.add(finding.rule_id)
+
+    def close(self):
+        """Writes the end of the log, with the tool and its rules."""
+        if not self._started:
+            self.__start()
+        driver = {
+            "name": "PyGitGuard",
+            "version": get_version(),
+            "informationUri": INFORMATION_URI,
+            "rules": [{"id": rule_id} for rule_id in sorted(self._rule_ids)],
+        }
+        self.stream.write('\n], "tool": ' + self._dumps({"driver": driver}) + "}]}\n")
+        self.stream.flush()
+
+
+def render_sarif(findings, stream):
+    """
+    Writes the findings as a SARIF 2.1.0 log, for code scanning upload.
+
+    Parameters
+    ----------
+    findings : iterable of Finding
+        The findings to render.
+    stream : file object
+        The text stream written to.
+    """
+    writer = SarifWriter(stream)
+    for finding in findings:
+        writer.write(finding)
+    writer.close()
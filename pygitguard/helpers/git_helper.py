@@ -1,21 +1,817 @@
 # git helper functions
+import codecs
 import os
+import subprocess
+from collections import namedtuple
+from stat import S_ISREG
 
-import pathspec
+from pygitguard.config.pygitguard_constants import (
+    CACHE_DIRNAME,
+    STANDALONE_CACHE_DIRNAME,
+)
+
+# Size of the blocks streamed when the middle of a large object is discarded
+STREAM_BLOCK_SIZE = 1024 * 1024
+
+# The first and last bytes of a content too large to be read whole.
+# 'newlines_before_tail' is None when it has not been counted.
+ContentSample = namedtuple(
+    "ContentSample", "size head tail tail_offset newlines_before_tail"
+)
+
+
+def _read_ignore_file(path):
+    """
+    Reads and compiles an ignore file into gitwildmatch patterns.
+
+    Parameters
+    ----------
+    path : str
+        The path to a `.gitignore`-style file.
+
+    Returns
+    -------
+    tuple or None
+        The compiled patterns that carry a verdict, or None when the file
+        does not exist or has no usable patterns.
+    """
+    if not os.path.isfile(path):
+        return None
+    # imported lazily, it is slow to import and only needed by full scans
+    import pathspec
+
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        spec = pathspec.PathSpec.from_lines("gitwildmatch", f.read().splitlines())
+    patterns = tuple(p for p in spec.patterns if p.include is not None)
+    return patterns or None
+
+
+def _last_match(patterns, rel_path):
+    """
+    Returns the verdict of the last pattern matching 'rel_path'.
+
+    Like git, the last matching pattern in a file wins, so patterns are
+    evaluated from the bottom up and the first hit decides.
+
+    Returns
+    -------
+    bool or None
+        True if ignored, False if re-included by a negated pattern and
+        None if no pattern matched.
+    """
+    for pattern in reversed(patterns):
+        if pattern.regex.match(rel_path):
+            return pattern.include
+    return None
+
+
+def get_global_excludes_file():
+    """
+    Returns the path of the user's global excludes file.
+
+    Uses `core.excludesFile` from the git configuration and falls back to
+    git's default `$XDG_CONFIG_HOME/git/ignore` location.
+    """
+    try:
+        result = subprocess.run(
+            ["git", "config", "--path", "--get", "core.excludesFile"],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        if result.returncode == 0 and result.stdout.strip():
+            return os.path.expanduser(result.stdout.strip())
+    except OSError:
+        pass
+    config_home = os.environ.get("XDG_CONFIG_HOME") or os.path.join(
+        os.path.expanduser("~"), ".config"
+    )
+    return os.path.join(config_home, "git", "ignore")
+
+
+class GitIgnoreMatcher:
+    """
+    A reusable matcher answering whether a path is ignored by git.
+
+    The matcher is built once per scan. Every ignore file is read and
+    compiled at most once, and the verdict for each directory is memoized,
+    so checking a file costs a dictionary lookup for its directory plus the
+    evaluation of the patterns that apply to it.
+
+    Sources are evaluated with git's precedence: a `.gitignore` in the
+    file's own directory wins over one in a parent directory, those win
+    over `.git/info/exclude`, which wins over the global excludes file.
+    Files inside an ignored directory can not be re-included.
+
+    Attributes
+    ----------
+    base_path : str
+        The path to the repository root.
+    """
+
+    def __init__(self, base_path=".", global_excludes_file=None):
+        """
+        Initializes the matcher for the repository at 'base_path'.
+
+        Parameters
+        ----------
+        base_path : str
+            The path to the repository root.
+        global_excludes_file : str, optional
+            Overrides the global excludes file. Defaults to the one
+            configured in git.
+        """
+        self.base_path = base_path
+        if global_excludes_file is None:
+            global_excludes_file = get_global_excludes_file()
+        # Repository-wide sources, from highest to lowest precedence
+        self._repo_sources = tuple(
+            patterns
+            for patterns in (
+                _read_ignore_file(os.path.join(base_path, ".git", "info", "exclude")),
+                _read_ignore_file(global_excludes_file),
+            )
+            if patterns
+        )
+        self._dir_patterns = {}  # rel_dir -> patterns of its .gitignore
+        self._chains = {}  # rel_dir -> ((prefix, patterns), ...)
+        self._dir_verdicts = {"": False}  # rel_dir -> ignored
+
+    def _patterns_for(self, rel_dir):
+        """Returns the compiled `.gitignore` of 'rel_dir', reading it once."""
+        try:
+            return self._dir_patterns[rel_dir]
+        except KeyError:
+            patterns = _read_ignore_file(
+                os.path.join(self.base_path, rel_dir, ".gitignore")
+            )
+            self._dir_patterns[rel_dir] = patterns
+            return patterns
+
+    def _chain(self, rel_dir):
+        """
+        Returns the per-directory ignore files applying to 'rel_dir'.
+
+        Each entry is a `(prefix, patterns)` pair where 'prefix' is the
+        directory of the ignore file, ordered from the deepest directory to
+        the repository root.
+        """
+        try:
+            return self._chains[rel_dir]
+        except KeyError:
+            pass
+        if rel_dir:
+            parent = os.path.dirname(rel_dir)
+            chain = self._chain(parent)
+            patterns = self._patterns_for(rel_dir)
+            if patterns:
+                chain = ((rel_dir + "/", patterns),) + chain
+        else:
+            patterns = self._patterns_for("")
+            chain = (("", patterns),) if patterns else ()
+        self._chains[rel_dir] = chain
+        return chain
+
+    def _verdict(self, rel_dir, rel_path):
+        """Evaluates 'rel_path' against every source applying in 'rel_dir'."""
+        for prefix, patterns in self._chain(rel_dir):
+            verdict = _last_match(patterns, rel_path[len(prefix) :])
+            if verdict is not None:
+                return verdict
+        for patterns in self._repo_sources:
+            verdict = _last_match(patterns, rel_path)
+            if verdict is not None:
+                return verdict
+        return False
+
+    def is_dir_ignored(self, rel_dir):
+        """
+        Checks if the directory 'rel_dir' (relative to base_path) is ignored.
+
+        Parameters
+        ----------
+        rel_dir : str
+            The directory path relative to the repository root, using '/'
+            as separator.
+
+        Returns
+        -------
+        bool
+            True if the directory, or any of its parents, is ignored.
+        """
+        try:
+            return self._dir_verdicts[rel_dir]
+        except KeyError:
+            pass
+        parent = os.path.dirname(rel_dir)
+        ignored = self.is_dir_ignored(parent) or self._verdict(parent, rel_dir + "/")
+        self._dir_verdicts[rel_dir] = ignored
+        return ignored
+
+    def is_ignored(self, path):
+        """
+        Checks if the file at 'path' is ignored.
+
+        Parameters
+        ----------
+        path : str
+            The file path as produced by walking 'base_path', e.g.
+            `os.path.join(base_path, "src", "app.py")`.
+
+        Returns
+        -------
+        bool
+            True if the file is ignored by git.
+        """
+        rel_path = os.path.relpath(path, self.base_path)
+        if os.sep != "/":
+            rel_path = rel_path.replace(os.sep, "/")
+        return self.is_rel_ignored(rel_path)
+
+    def is_rel_ignored(self, rel_path):
+        """
+        Checks if the file 'rel_path' (relative to base_path) is ignored.
+
+        Parameters
+        ----------
+        rel_path : str
+            The file path relative to the repository root, using '/' as
+            separator.
+
+        Returns
+        -------
+        bool
+            True if the file is ignored by git.
+        """
+        rel_dir = os.path.dirname(rel_path)
+        if self.is_dir_ignored(rel_dir):
+            return True
+        return self._verdict(rel_dir, rel_path)
+
+
+def walk_repository(base_path=".", ignore_matcher=None, directories=None):
+    """
+    Walks the repository at 'base_path' yielding the files that are not ignored.
+
+    Built on `os.scandir`, ignored directories (and always `.git`) are pruned
+    before descending, so the cost of the walk scales with the tracked
+    content instead of everything on disk. The stat comes from the
+    `DirEntry` so callers do not need another syscall for it. Only regular
+    files, or symlinks to them, are yielded: symlinks to directories are
+    neither followed nor scanned, as with `os.walk`, and sockets, FIFOs and
+    devices are skipped.
+
+    Parameters
+    ----------
+    base_path : str
+        The path to the repository root.
+    ignore_matcher : GitIgnoreMatcher, optional
+        The matcher used to prune ignored paths. Built from 'base_path' when
+        not given.
+    directories : list, optional
+        When given, the relative path of every directory walked, "" for
+        the root, is appended to it.
+
+    Yields
+    ------
+    tuple
+        `(full_path, rel_path, filename, stat)` for every file, where
+        'rel_path' is relative to 'base_path' and uses '/' as separator and
+        'stat' is the `os.stat_result` of the file.
+    """
+    if ignore_matcher is None:
+        ignore_matcher = GitIgnoreMatcher(base_path)
+
+    stack = [(base_path, "")]
+    while stack:
+        dir_path, rel_dir = stack.pop()
+        if directories is not None:
+            directories.append(rel_dir)
+        try:
+            with os.scandir(dir_path) as entries:
+                entries = list(entries)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name != ".git" and not ignore_matcher.is_dir_ignored(
+                        rel_path
+                    ):
+                        subdirs.append((entry.path, rel_path))
+                    continue
+                if ignore_matcher.is_rel_ignored(rel_path):
+                    continue
+                stat = entry.stat()
+            except OSError:
+                # broken symlinks or files removed during the walk
+                continue
+            if not S_ISREG(stat.st_mode):
+                # symlinks to directories, sockets, FIFOs and devices
+                continue
+            yield entry.path, rel_path, entry.name, stat
+
+        stack.extend(reversed(subdirs))
+
+
+class GitCatFile:
+    """
+    A long-lived `git cat-file --batch` process streaming object contents.
+
+    Objects are requested by SHA over the process stdin, so reading many
+    blobs costs one subprocess instead of one per object.
+
+    Examples
+    --------
+    >>> with GitCatFile(".") as cat_file:
+    ...     content = cat_file.read(sha)
+    """
+
+    def __init__(self, base_path="."):
+        """
+        Prepares the `git cat-file` processes of the repository.
+
+        The processes are started on first use, so nothing is spawned when
+        there is nothing to read.
+
+        Parameters
+        ----------
+        base_path : str
+            The path to the repository.
+        """
+        self.base_path = base_path
+        self._process = None
+        self._check_process = None
+
+    def _start(self, mode):
+        """Starts a `git cat-file` process in 'mode', e.g. "--batch"."""
+        return subprocess.Popen(
+            ["git", "-C", self.base_path, "cat-file", mode],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def read(self, sha, max_size=None, sample_size=0):
+        """
+        Reads the content of the object 'sha'.
+
+        Parameters
+        ----------
+        sha : str
+            The object name.
+        max_size : int, optional
+            Objects larger than this many bytes are not read whole: only
+            their first and last 'sample_size' bytes are kept and the rest is
+            streamed through in blocks, so memory stays bounded.
+        sample_size : int
+            The number of bytes kept at each end of an object larger than
+            'max_size'.
+
+        Returns
+        -------
+        bytes or ContentSample or None
+            The object content, a ContentSample for objects larger than
+            'max_size', or None if the object does not exist.
+        """
+        if self._process is None:
+            self._process = self._start("--batch")
+        stdout = self._process.stdout
+        self._process.stdin.write(sha.encode("ascii") + b"\n")
+        self._process.stdin.flush()
+        header = stdout.readline().split()
+        if len(header) < 3 or header[1] == b"missing":
+            return None
+        size = int(header[2])
+        if max_size is None or size <= max_size:
+            content = stdout.read(size)
+            stdout.read(1)  # trailing newline
+            return content
+
+        head = stdout.read(min(sample_size, size))
+        tail_offset = max(len(head), size - sample_size)
+        newlines = head.count(b"\n")
+        remaining = tail_offset - len(head)
+        while remaining:
+            block = stdout.read(min(STREAM_BLOCK_SIZE, remaining))
+            newlines += block.count(b"\n")
+            remaining -= len(block)
+        tail = stdout.read(size - tail_offset)
+        stdout.read(1)  # trailing newline
+        return ContentSample(size, head, tail, tail_offset, newlines)
+
+    def size(self, sha):
+        """
+        Returns the size of the object 'sha' without reading its content.
+
+        The sizes are queried from a second long-lived `git cat-file
+        --batch-check` process, started on first use.
+
+        Parameters
+        ----------
+        sha : str
+            The object name.
+
+        Returns
+        -------
+        int or None
+            The object size in bytes, or None if the object does not exist.
+        """
+        if self._check_process is None:
+            self._check_process = self._start("--batch-check")
+        self._check_process.stdin.write(sha.encode("ascii") + b"\n")
+        self._check_process.stdin.flush()
+        header = self._check_process.stdout.readline().split()
+        if len(header) < 3 or header[1] == b"missing":
+            return None
+        return int(header[2])
+
+    def close(self):
+        """Terminates the `git cat-file` processes."""
+        for process in (self._process, self._check_process):
+            if process is None:
+                continue
+            if process.poll() is None:
+                process.stdin.close()
+                process.wait()
+            process.stdout.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def diff_arguments(revisions=None):
+    """
+    Returns the `git diff` arguments selecting the changes to scan.
+
+    Parameters
+    ----------
+    revisions : list of str, optional
+        Revision arguments, e.g. `["main..HEAD"]`. The staged changes are
+        selected when empty.
+
+    Returns
+    -------
+    list of str
+        The arguments, restricted to added, copied, modified, renamed and
+        type-changed files, since deleted files have nothing to scan.
+    """
+    return [
+        *(revisions or ["--cached"]),
+        "--no-renames",
+        "--relative",
+        "--ignore-submodules",
+        "--diff-filter=ACMRT",
+    ]
+
+
+def get_changed_files(base_path=".", revisions=None):
+    """
+    Lists the files changed by the staged changes or a revision range.
+
+    Parameters
+    ----------
+    base_path : str
+        The path to the repository.
+    revisions : list of str, optional
+        Revision arguments of `git diff`, e.g. `["main..HEAD"]`. The files
+        staged in the index are listed when empty.
+
+    Returns
+    -------
+    list of tuple
+        `(rel_path, blob_sha)` pairs, with 'rel_path' relative to
+        'base_path' and 'blob_sha' the new content of the file.
+    """
+    output = subprocess.run(
+        [
+            "git",
+            "-C",
+            base_path,
+            "diff",
+            "--raw",
+            "-z",
+            "--no-abbrev",
+            *diff_arguments(revisions),
+        ],
+        capture_output=True,
+        check=True,
+    ).stdout
+    fields = output.split(b"\0")
+    staged = []
+    # --raw -z emits ":<src mode> <dst mode> <src sha> <dst sha> <status>\0<path>\0"
+    for meta, path in zip(fields[0::2], fields[1::2]):
+        _, dst_mode, _, dst_sha, _ = meta.split(b" ")
+        if dst_mode == b"160000":
+            continue
+        staged.append((os.fsdecode(path), dst_sha.decode("ascii")))
+    return staged
+
+
+def git_directory(base_path="."):
+    """
+    Returns the git directory of the repository at 'base_path', without running git.
+
+    `.git` is the git directory itself, or in linked worktrees and
+    submodules a file pointing to it with a `gitdir: <path>` line.
+
+    Parameters
+    ----------
+    base_path : str
+        The path to the repository root.
+
+    Returns
+    -------
+    str or None
+        The path to the git directory, None when 'base_path' is not the
+        root of a git repository.
+    """
+    dot_git = os.path.join(base_path, ".git")
+    if os.path.isdir(dot_git):
+        return dot_git
+    try:
+        with open(dot_git, encoding="utf-8") as f:
+            line = f.readline().strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+    if not line.startswith("gitdir:"):
+        return None
+    return os.path.join(base_path, line[len("gitdir:") :].strip())
+
+
+def cache_location(base_path="."):
+    """
+    Returns the directory of the PyGitGuard caches of a repository.
+
+    It is CACHE_DIRNAME in the git directory, so nothing is written to the
+    working tree, or STANDALONE_CACHE_DIRNAME at the root of a directory
+    that is not a git repository. It is not created.
+
+    Parameters
+    ----------
+    base_path : str
+        The path to the repository root.
+
+    Returns
+    -------
+    str
+        The path to the cache directory.
+    """
+    git_dir = git_directory(base_path)
+    if git_dir is None:
+        return os.path.join(base_path, STANDALONE_CACHE_DIRNAME)
+    return os.path.join(git_dir, CACHE_DIRNAME)
+
+
+def get_staged_files(base_path="."):
+    """
+    Lists the files staged in the index of the repository at 'base_path'.
+
+    Only added, copied, modified, renamed and type-changed entries are
+    returned, deleted files and submodules have nothing to scan.
+
+    Parameters
+    ----------
+    base_path : str
+        The path to the repository.
+
+    Returns
+    -------
+    list of tuple
+        `(rel_path, blob_sha)` pairs, with 'rel_path' relative to
+        'base_path'.
+    """
+    return get_changed_files(base_path)
+
+
+def _unquote_path(path):
+    """Decodes a path of a diff header, C-quoted by git when unusual."""
+    if path.startswith(b'"') and path.endswith(b'"'):
+        path = codecs.escape_decode(path[1:-1])[0]
+    return os.fsdecode(path)
+
+
+def iter_added_lines(base_path=".", revisions=None):
+    """
+    Yields the lines added by the staged changes or a revision range.
+
+    The output of `git diff -U0` is streamed and parsed line by line, so
+    the work is proportional to the size of the diff, not of the files.
+
+    Parameters
+    ----------
+    base_path : str
+        The path to the repository.
+    revisions : list of str, optional
+        Revision arguments of `git diff`, e.g. `["main..HEAD"]`. The staged
+        changes are read when empty.
+
+    Yields
+    ------
+    tuple
+        `(rel_path, lines)` for every file with added lines, in the order
+        of `get_changed_files`, with 'lines' a list of `(line_number, line)`
+        pairs: the line numbers in the new content and the raw bytes of the
+        lines without their newline. Binary files are not yielded.
+    """
+    process = subprocess.Popen(
+        [
+            "git",
+            "-c",
+            "core.quotePath=false",
+            "-C",
+            base_path,
+            "diff",
+            "-U0",
+            "--no-prefix",
+            "--no-color",
+            "--no-ext-diff",
+            *diff_arguments(revisions),
+        ],
+        stdout=subprocess.PIPE,
+    )
+    rel_path, lines, in_hunk, line_number = None, [], False, 0
+    try:
+        for raw in process.stdout:
+            if in_hunk and raw.startswith(b"+"):
+                lines.append((line_number, raw[1:].rstrip(b"\n")))
+                line_number += 1
+            elif raw.startswith(b"@@ "):
+                # "@@ -<start>[,<count>] +<start>[,<count>] @@"
+                in_hunk = True
+                line_number = int(raw.split(b" ", 3)[2][1:].split(b",")[0])
+            elif raw.startswith(b"diff --git "):
+                if lines:
+                    yield rel_path, lines
+                rel_path, lines, in_hunk = None, [], False
+            elif not in_hunk and raw.startswith(b"+++ "):
+                # git appends a tab to paths containing spaces
+                rel_path = _unquote_path(raw[4:].rstrip(b"\n").rstrip(b"\t"))
+        if lines:
+            yield rel_path, lines
+    finally:
+        process.stdout.close()
+        if process.wait() not in (0, -13):  # -13: SIGPIPE when stopped early
+            raise subprocess.CalledProcessError(process.returncode, process.args)
+
+
+def resolve_revisions(base_path, revisions):
+    """
+    Resolves revision arguments to the commits they include.
+
+    Parameters
+    ----------
+    base_path : str
+        The path to the repository.
+    revisions : list of str
+        Revision arguments of `git rev-list`, e.g. `["v1.0..HEAD"]` or
+        `["--all"]`.
+
+    Returns
+    -------
+    list of str
+        The SHAs of the included tips, without the excluded (`^`) ones.
+    """
+    output = subprocess.run(
+        ["git", "-C", base_path, "rev-parse", "--revs-only", *revisions],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    return [rev for rev in output.split() if not rev.startswith("^")]
+
+
+def independent_commits(base_path, commits):
+    """
+    Drops the commits that are ancestors of another commit of the list.
+
+    Parameters
+    ----------
+    base_path : str
+        The path to the repository.
+    commits : iterable of str
+        Commit SHAs.
+
+    Returns
+    -------
+    list of str
+        The commits none of the others can reach.
+    """
+    commits = list(dict.fromkeys(commits))
+    if len(commits) <= 1:
+        return commits
+    output = subprocess.run(
+        ["git", "-C", base_path, "merge-base", "--independent", *commits],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    return output.split()
+
+
+def iter_history_changes(base_path, revisions, exclude=()):
+    """
+    Yields the blobs added or modified by every commit of a revision range.
+
+    The output of `git log --raw` is streamed and parsed incrementally, so
+    the history is never held in memory. Commits come parents first, and
+    merges are diffed against each of their parents so blobs introduced
+    while resolving a merge are included.
+
+    Parameters
+    ----------
+    base_path : str
+        The path to the repository.
+    revisions : list of str
+        Revision arguments of `git log`, e.g. `["HEAD"]` or `["--all"]`.
+    exclude : iterable of str
+        Commits whose whole ancestry is skipped, e.g. the ones already
+        scanned by a previous run.
+
+    Yields
+    ------
+    tuple
+        `(commit_sha, changes)` for every commit, with 'changes' a list of
+        `(rel_path, blob_sha)` pairs.
+    """
+    process = subprocess.Popen(
+        [
+            "git",
+            "-C",
+            base_path,
+            "log",
+            "--topo-order",
+            "--reverse",
+            "--root",
+            "-m",
+            "--raw",
+            "-z",
+            "--no-abbrev",
+            "--no-renames",
+            "--relative",
+            "--diff-filter=ACMRT",
+            "--format=commit:%H",
+            *revisions,
+            *(f"^{commit}" for commit in exclude),
+            "--",
+        ],
+        stdout=subprocess.PIPE,
+    )
+    commit, changes, meta = None, [], None
+    pending = b""
+    try:
+        for block in iter(lambda: process.stdout.read(STREAM_BLOCK_SIZE), b""):
+            fields = (pending + block).split(b"\0")
+            pending = fields.pop()
+            # "commit:<sha>\0" headers, each followed by the --raw entries
+            # ":<src mode> <dst mode> <src sha> <dst sha> <status>\0<path>\0"
+            for field in fields:
+                if meta is not None:
+                    _, dst_mode, _, dst_sha, _ = meta.split(b" ")
+                    if dst_mode != b"160000":
+                        changes.append((os.fsdecode(field), dst_sha.decode("ascii")))
+                    meta = None
+                    continue
+                field = field.lstrip(b"\n")
+                if field.startswith(b":"):
+                    meta = field[1:]
+                elif field.startswith(b"commit:"):
+                    sha = field[7:].decode("ascii")
+                    if sha != commit:
+                        if commit is not None:
+                            yield commit, changes
+                        commit, changes = sha, []
+        if commit is not None:
+            yield commit, changes
+    finally:
+        process.stdout.close()
+        if process.wait() not in (0, -13):  # -13: SIGPIPE when stopped early
+            raise subprocess.CalledProcessError(process.returncode, process.args)
 
 
 def is_ignored_by_gitignore(path, base_path="."):
     """
     Checks if the given 'path' (relative to base_path) is ignored by .gitignore.
+
+    .. deprecated::
+        This builds a new GitIgnoreMatcher, reading every ignore file, on
+        each call. Build one `GitIgnoreMatcher(base_path)` and call its
+        `is_ignored` for each path instead.
     """
-    gitignore_path = os.path.join(base_path, ".gitignore")
-    if not os.path.isfile(gitignore_path):
-        return False
-    with open(gitignore_path, "r", encoding="utf-8") as f:
-        patterns = f.read().splitlines()
-    spec = pathspec.PathSpec.from_lines("gitwildmatch", patterns)
-    rel_path = os.path.relpath(path, base_path)
-    return spec.match_file(rel_path)
+    import warnings  # imported lazily, only deprecated calls need it
+
+    warnings.warn(
+        "is_ignored_by_gitignore is deprecated, use GitIgnoreMatcher(base_path)"
+        ".is_ignored(path) instead",
+        DeprecationWarning,
+        stacklevel=2,
+    )
+    return GitIgnoreMatcher(base_path).is_ignored(path)
 
 
 #
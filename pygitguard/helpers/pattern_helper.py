@@ -0,0 +1,469 @@
+"""Compilation of the configured regex patterns into fast matchers."""
+
+import re
+from functools import lru_cache
+
+try:  # Python >= 3.11
+    import re._parser as sre_parse
+except ImportError:  # pragma: no cover - older Pythons
+    import sre_parse
+
+# Shortest literal worth using as a prefilter keyword
+MIN_KEYWORD_LENGTH = 3
+
+# Size of the line-aligned windows a buffer is scanned in
+SCAN_WINDOW_SIZE = 1024 * 1024
+
+# Numbered or named backreferences change meaning once patterns are merged
+BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+# A file name rule `.*<literal>[s]?(\..*)?$`, as most of SENSITIVE_PATTERNS:
+# the literal ends the name or is followed by a dot
+LITERAL_FILENAME_RULE = re.compile(
+    r"\.\*((?:[A-Za-z0-9_-]|\\\.)+)(\[s\]\?|s\?)?\(\\\.\.\*\)\?\$"
+)
+
+
+def extract_keyword(pattern):
+    """
+    Extracts a literal that every match of 'pattern' must contain.
+
+    Only literals at the top level of the pattern are considered, so the
+    keyword is mandatory for a match. The longest run of consecutive
+    literal characters is chosen.
+
+    Parameters
+    ----------
+    pattern : str
+        A regex pattern.
+
+    Returns
+    -------
+    str or None
+        The lower-cased keyword, or None when the pattern has no mandatory
+        literal of at least MIN_KEYWORD_LENGTH characters.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except (re.error, RecursionError):
+        return None
+
+    best, run = "", []
+    for opcode, value in list(parsed) + [(None, None)]:
+        if opcode == sre_parse.LITERAL:
+            run.append(chr(value))
+            continue
+        if len(run) > len(best):
+            best = "".join(run)
+        run = []
+    return best.lower() if len(best) >= MIN_KEYWORD_LENGTH else None
+
+
+def filename_literals(pattern):
+    """
+    Returns the literals of a file name rule of the form `.*<literal>(\\..*)?$`.
+
+    Such a rule matches a name when one of its literals ends the name or
+    is followed by a dot, which needs no regex to check. An optional
+    trailing `s?` or `[s]?` gives a second literal.
+
+    Parameters
+    ----------
+    pattern : str
+        A SENSITIVE_PATTERNS regex.
+
+    Returns
+    -------
+    tuple of str or None
+        The lower-cased literals, or None when the rule has another form.
+    """
+    match = LITERAL_FILENAME_RULE.fullmatch(pattern)
+    if match is None:
+        return None
+    literal = match.group(1).replace("\\.", ".").lower()
+    if match.group(2):
+        return literal, f"{literal}s"
+    return (literal,)
+
+
+def minimize_keywords(keywords):
+    """
+    Drops keywords made redundant by a shorter keyword they contain.
+
+    A line containing 'passwords' always contains 'password', so only the
+    latter needs to be checked.
+    """
+    minimal = []
+    for keyword in sorted(set(keywords), key=len):
+        if not any(kept in keyword for kept in minimal):
+            minimal.append(keyword)
+    return tuple(minimal)
+
+
+class ContentMatcher:
+    """
+    All the SENSITIVE_CONTENT patterns merged into a single compiled regex.
+
+    Each pattern becomes a named group of one alternation, so a line is
+    scanned once instead of once per pattern and is reported once, with the
+    rule that matched. When every pattern contains a mandatory literal a
+    keyword prefilter skips lines that can not match before running the
+    regex at all.
+
+    Attributes
+    ----------
+    patterns : tuple of str
+        The source patterns, in configuration order.
+    keywords : tuple of str or None
+        The lower-cased prefilter keywords, or None when the prefilter is
+        disabled.
+
+    Notes
+    -----
+    Whole buffers are scanned as bytes by `iter_matches`: a bytes "finder"
+    (the keywords, or the merged patterns) locates candidate lines and only
+    those lines are decoded and checked with the text patterns, so clean
+    content never goes through per-line Python code.
+    """
+
+    def __init__(self, patterns):
+        """
+        Compiles the patterns.
+
+        Parameters
+        ----------
+        patterns : iterable of str
+            The regex patterns, matched case-insensitively.
+
+        Raises
+        ------
+        re.error
+            If any of the patterns is not a valid regex.
+        """
+        self.patterns = tuple(patterns)
+        self._compiled = tuple(re.compile(p, re.IGNORECASE) for p in self.patterns)
+        mergeable = not any(BACKREFERENCE.search(p) for p in self.patterns)
+        try:
+            # an empty alternation would match every line
+            self._combined = (
+                re.compile(
+                    "|".join(f"(?P<r{i}>{p})" for i, p in enumerate(self.patterns)),
+                    re.IGNORECASE,
+                )
+                if mergeable and self.patterns
+                else None
+            )
+        except re.error:
+            # Patterns defining their own named groups can not be merged,
+            # they are searched one by one.
+            self._combined = None
+
+        keywords = [extract_keyword(p) for p in self.patterns]
+        self.keywords = (
+            minimize_keywords(keywords) if keywords and all(keywords) else None
+        )
+        self._finder = self.__compile_finder(mergeable)
+
+    def __compile_finder(self, mergeable):
+        """
+        Compiles the bytes regex locating candidate lines in a buffer.
+
+        Returns
+        -------
+        re.Pattern or None
+            A regex over the keywords when they are all ASCII, meant to run
+            on lower-cased content, the merged patterns otherwise, or None
+            when neither compiles as bytes.
+        """
+        self._lowered_finder = False
+        if self.keywords is not None and all(k.isascii() for k in self.keywords):
+            self._lowered_finder = True
+            return re.compile(
+                b"|".join(re.escape(k.encode("ascii")) for k in self.keywords)
+            )
+        if not mergeable or not self.patterns:
+            return None
+        try:
+            return re.compile(
+                "|".join(f"(?:{p})" for p in self.patterns).encode("utf-8"),
+                re.IGNORECASE,
+            )
+        except re.error:
+            return None
+
+    def search(self, line):
+        """
+        Searches a line for the first sensitive content match.
+
+        Parameters
+        ----------
+        line : str
+            The text to search.
+
+        Returns
+        -------
+        tuple or None
+            `(pattern, match)` with the source pattern of the rule that
+            matched, or None if no rule matched.
+        """
+        if self.keywords is not None:
+            lowered = line.lower()
+            if not any(keyword in lowered for keyword in self.keywords):
+                return None
+
+        if self._combined is not None:
+            match = self._combined.search(line)
+            if match is None:
+                return None
+            return self.patterns[int(match.lastgroup[1:])], match
+
+        for pattern, compiled in zip(self.patterns, self._compiled):
+            match = compiled.search(line)
+            if match:
+                return pattern, match
+        return None
+
+    def iter_matches(self, buffer, first_line=1):
+        """
+        Scans a whole buffer, yielding the lines with sensitive content.
+
+        Candidate lines are located with a bytes regex over the buffer and
+        line numbers are only computed for them, by counting the newlines up
+        to the candidate offset. The buffer is processed in line-aligned
+        windows of SCAN_WINDOW_SIZE bytes so memory stays bounded for
+        memory-mapped files.
+
+        Parameters
+        ----------
+        buffer : bytes or mmap.mmap
+            The content to scan.
+        first_line : int
+            The line number of the first line in 'buffer', used when the
+            buffer is one chunk of a larger file.
+
+        Yields
+        ------
+        tuple
+            `(line_number, line, pattern, span)` for every matching line,
+            where 'line' is the decoded text, 'pattern' the rule that matched
+            and 'span' the `(start, end)` offsets of the match in the line.
+        """
+        if not self.patterns:
+            return
+        size = len(buffer)
+        window_start = 0
+        line_number = first_line
+        while window_start < size:
+            window_end = buffer.find(b"\n", min(window_start + SCAN_WINDOW_SIZE, size))
+            window_end = size if window_end == -1 else window_end + 1
+            window = buffer[window_start:window_end]
+            window_start = window_end
+
+            # keywords are lower-cased ASCII, a lowered copy of the window
+            # lets a case-sensitive regex find them much faster
+            haystack = window.lower() if self._lowered_finder else window
+            pos = counted = 0
+            while pos < len(window):
+                if self._finder is None:
+                    candidate = pos
+                else:
+                    match = self._finder.search(haystack, pos)
+                    if match is None:
+                        break
+                    candidate = match.start()
+                line_start = window.rfind(b"\n", 0, candidate) + 1
+                line_end = window.find(b"\n", candidate)
+                if line_end == -1:
+                    line_end = len(window)
+                line = window[line_start:line_end].decode("utf-8", errors="ignore")
+                result = self.search(line)
+                if result is not None:
+                    line_number += window.count(b"\n", counted, line_start)
+                    counted = line_start
+                    yield line_number, line, result[0], result[1].span()
+                pos = line_end + 1
+            line_number += window.count(b"\n", counted)
+
+    def iter_line_matches(self, lines):
+        """
+        Scans separate lines, such as the lines added by a diff.
+
+        Parameters
+        ----------
+        lines : iterable of tuple
+            `(line_number, line)` pairs, with 'line' the raw bytes.
+
+        Yields
+        ------
+        tuple
+            `(line_number, line, pattern, span)` for every matching line,
+            as `iter_matches`.
+        """
+        for line_number, raw in lines:
+            line = raw.decode("utf-8", errors="ignore")
+            result = self.search(line)
+            if result is not None:
+                yield line_number, line, result[0], result[1].span()
+
+
+@lru_cache(maxsize=32)
+def _compile_content_patterns(patterns):
+    return ContentMatcher(patterns)
+
+
+def compile_content_patterns(patterns):
+    """
+    Returns the ContentMatcher for 'patterns', compiling it once per pattern set.
+
+    Parameters
+    ----------
+    patterns : iterable of str or ContentMatcher
+        The regex patterns. An already compiled matcher, or any object with
+        its interface, is returned as is.
+
+    Returns
+    -------
+    ContentMatcher
+        The compiled matcher.
+    """
+    if hasattr(patterns, "iter_matches"):
+        return patterns
+    return _compile_content_patterns(tuple(patterns))
+
+
+class FilenameMatcher:
+    """
+    All the SENSITIVE_PATTERNS evaluated in one pass over a file name.
+
+    Rules of the form `.*<literal>(\\..*)?$` are not run as regexes:
+
+    - extension rules, whose literal is `.<ext>`, are dictionary lookups
+      of the dot-separated parts of the name;
+    - keyword rules, as `secrets?` or `id_rsa`, are a single
+      `str.endswith` over all the keywords for each prefix of the name
+      ending at a dot or at its end, and only the prefixes passing it
+      are attributed to their keywords.
+
+    The remaining rules are prefiltered by one combined regex and only
+    searched one by one when it matches. Names that are not ASCII or
+    contain a newline, where case folding or `$` could differ from the
+    literal checks, are matched with the rule regexes.
+
+    Attributes
+    ----------
+    patterns : tuple of str
+        The source patterns, in configuration order.
+    """
+
+    def __init__(self, patterns):
+        """
+        Compiles the patterns.
+
+        Parameters
+        ----------
+        patterns : iterable of str
+            The regex patterns, matched case-insensitively.
+
+        Raises
+        ------
+        re.error
+            If any of the patterns is not a valid regex.
+        """
+        self.patterns = tuple(patterns)
+        self._compiled = tuple(re.compile(p, re.IGNORECASE) for p in self.patterns)
+        self._extensions = {}
+        self._keywords = {}
+        self._residual = []
+        for index, pattern in enumerate(self.patterns):
+            literals = filename_literals(pattern)
+            if literals is None:
+                self._residual.append(index)
+                continue
+            for literal in literals:
+                if literal.startswith(".") and "." not in literal[1:]:
+                    self._extensions.setdefault(literal[1:], []).append(index)
+                else:
+                    self._keywords.setdefault(literal, []).append(index)
+        self._keyword_suffixes = tuple(self._keywords)
+
+        self._combined = None
+        residual = [self.patterns[index] for index in self._residual]
+        if residual and not any(BACKREFERENCE.search(p) for p in residual):
+            try:
+                self._combined = re.compile(
+                    "|".join(f"(?:{p})" for p in residual), re.IGNORECASE
+                )
+            except re.error:
+                self._combined = None
+
+    def match(self, filename):
+        """
+        Returns every rule matching a file name.
+
+        Parameters
+        ----------
+        filename : str
+            The name of the file, without its directory.
+
+        Returns
+        -------
+        tuple of str
+            The source patterns of the matching rules, in configuration
+            order, empty when none matched.
+        """
+        if not filename.isascii() or "\n" in filename:
+            return tuple(
+                pattern
+                for pattern, compiled in zip(self.patterns, self._compiled)
+                if compiled.search(filename)
+            )
+
+        matched = set()
+        lowered = filename.lower()
+        parts = lowered.split(".")
+        if self._extensions:
+            for part in parts[1:]:
+                rules = self._extensions.get(part)
+                if rules is not None:
+                    matched.update(rules)
+        if self._keyword_suffixes:
+            end = -1
+            for part in parts:
+                end += len(part) + 1
+                prefix = lowered[:end]
+                if prefix.endswith(self._keyword_suffixes):
+                    for keyword, rules in self._keywords.items():
+                        if prefix.endswith(keyword):
+                            matched.update(rules)
+        if self._residual and (
+            self._combined is None or self._combined.search(filename)
+        ):
+            for index in self._residual:
+                if self._compiled[index].search(filename):
+                    matched.add(index)
+        return tuple(self.patterns[index] for index in sorted(matched))
+
+
+@lru_cache(maxsize=32)
+def _compile_filename_patterns(patterns):
+    return FilenameMatcher(patterns)
+
+
+def compile_filename_patterns(patterns):
+    """
+    Returns the FilenameMatcher for 'patterns', compiling it once per pattern set.
+
+    Parameters
+    ----------
+    patterns : iterable of str or FilenameMatcher
+        The file name regex patterns. An already compiled matcher is
+        returned as is.
+
+    Returns
+    -------
+    FilenameMatcher
+        The compiled matcher.
+    """
+    if isinstance(patterns, FilenameMatcher):
+        return patterns
+    return _compile_filename_patterns(tuple(patterns))
@@ -0,0 +1,396 @@
+"""Instrumentation of the scans: time and call counts per phase, rule and file."""
+
+import re
+from heapq import nlargest
+from time import perf_counter
+
+from pygitguard.helpers.findings_helper import ENTROPY_RULES, pattern_rule_id
+from pygitguard.helpers.pattern_helper import compile_content_patterns
+from pygitguard.helpers.rule_helper import Rule
+
+# Rule id of the entropy detector in the rule timings
+ENTROPY_RULE = "entropy"
+
+# Number of files and rules listed in the report
+PROFILE_TOP = 10
+
+# The public scan methods timed as phases, with the position of their
+# `rel_path` argument, whose time is added to the file, or None
+SCAN_PHASES = {
+    "load_pygitguard_config": ("config", None),
+    "check_best_practices": ("best-practices", None),
+    "check_sensitive_filenames": ("filename", 1),
+    "check_large_file": ("large-file", 1),
+    "check_sensitive_content": ("content", 1),
+    "check_added_lines": ("content", 0),
+    "check_archive": ("archive", 1),
+}
+
+
+class ScanProfiler:
+    """
+    Records where the time of a scan goes.
+
+    Phases are timed cumulatively, with their number of calls; nested
+    phases are named after their parent, e.g. `content.match` is the part
+    of `content` spent in the matchers. The time of each file is the sum of
+    its checks, and the content rules are timed one by one on the content
+    each file was matched against.
+
+    Timing a rule alone means matching the content once more per rule.
+    That work is excluded from the phases and the files it happens in, so
+    they keep reporting the cost of the scan itself.
+
+    Attributes
+    ----------
+    phases : dict
+        `[seconds, calls]` per phase name.
+    rules : dict
+        `[seconds, calls, matches]` per content rule.
+    files : dict
+        The seconds spent on each file, by relative path.
+    pstats_path : str or None
+        Where the cProfile statistics of the scan are dumped, if anywhere.
+    seconds : float
+        The wall time between `start` and `stop`.
+    """
+
+    def __init__(self, pstats_path=None):
+        self.phases = {}
+        self.rules = {}
+        self.files = {}
+        self.pstats_path = pstats_path
+        self.seconds = 0.0
+        # seconds spent timing rules, excluded from the enclosing phases
+        self._excluded = 0.0
+        self._started = None
+        self._cprofile = None
+        self._matchers = {}
+
+    def start(self):
+        """Starts the wall clock, and cProfile when a pstats file is wanted."""
+        if self.pstats_path:
+            import cProfile  # imported lazily, only for pstats dumps
+
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._started = perf_counter()
+
+    def stop(self):
+        """Stops the wall clock and dumps the cProfile statistics, if any."""
+        self.seconds += perf_counter() - self._started
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.pstats_path)
+            self._cprofile = None
+
+    def clock(self):
+        """Returns the `(start, excluded)` pair a call of a phase is timed from."""
+        return perf_counter(), self._excluded
+
+    def add(self, phase, clock, rel_path=None):
+        """
+        Records a call of a phase.
+
+        Parameters
+        ----------
+        phase : str
+            The phase name.
+        clock : tuple
+            The `clock()` when the call started.
+        rel_path : str, optional
+            The file the call worked on.
+        """
+        start, excluded = clock
+        seconds = perf_counter() - start - (self._excluded - excluded)
+        stats = self.phases.get(phase)
+        if stats is None:
+            stats = self.phases[phase] = [0.0, 0]
+        stats[0] += seconds
+        stats[1] += 1
+        if rel_path is not None:
+            self.files[rel_path] = self.files.get(rel_path, 0.0) + seconds
+
+    def timed(self, phase, func, path_index=None):
+        """
+        Wraps a function so that its calls are recorded as 'phase'.
+
+        Parameters
+        ----------
+        phase : str
+            The phase name.
+        func : callable
+            The function.
+        path_index : int, optional
+            The position of the `rel_path` argument, whose file the time
+            is added to.
+
+        Returns
+        -------
+        callable
+            The timed function. Recursive calls, as of
+            `GitIgnoreMatcher.is_dir_ignored`, are timed once.
+        """
+        depth = 0
+
+        def timed_call(*args, **kwargs):
+            nonlocal depth
+            if depth:
+                return func(*args, **kwargs)
+            depth += 1
+            clock = self.clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                depth -= 1
+                rel_path = None
+                if path_index is not None and len(args) > path_index:
+                    rel_path = args[path_index]
+                self.add(phase, clock, rel_path)
+
+        return timed_call
+
+    def wrap(self, obj, phase, methods):
+        """
+        Times some methods of an object, replacing them on the instance.
+
+        Parameters
+        ----------
+        obj : object
+            The object, e.g. a GitCatFile.
+        phase : str
+            The phase name its calls are recorded as.
+        methods : iterable of str
+            The names of the methods.
+
+        Returns
+        -------
+        object
+            'obj' itself.
+        """
+        for name in methods:
+            setattr(obj, name, self.timed(phase, getattr(obj, name)))
+        return obj
+
+    def iterate(self, phase, iterable):
+        """Yields the items of 'iterable', timing the production of each as 'phase'."""
+        iterator = iter(iterable)
+        while True:
+            clock = self.clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(phase, clock)
+                return
+            self.add(phase, clock)
+            yield item
+
+    def instrument(self, scanner):
+        """
+        Times the checks of a PyGitGuardScan, see SCAN_PHASES.
+
+        The content matchers given to the content checks are wrapped in a
+        ProfiledMatcher, timing the matching and each rule.
+        """
+        for name, (phase, path_index) in SCAN_PHASES.items():
+            method = getattr(scanner, name)
+            if name in (
+                "check_sensitive_content",
+                "check_added_lines",
+                "check_archive",
+            ):
+                method = self.__profile_patterns(method)
+            setattr(scanner, name, self.timed(phase, method, path_index))
+
+    def __profile_patterns(self, check):
+        """Wraps a content check so that its patterns are profiled."""
+
+        def profiled_check(*args, **kwargs):
+            if len(args) > 2:
+                args = args[:2] + (self.matcher(args[2]),) + args[3:]
+            else:
+                kwargs["patterns"] = self.matcher(kwargs["patterns"])
+            return check(*args, **kwargs)
+
+        return profiled_check
+
+    def matcher(self, patterns):
+        """Returns the ProfiledMatcher of some patterns, or of a compiled matcher."""
+        if isinstance(patterns, ProfiledMatcher):
+            return patterns
+        key = id(patterns)
+        cached = self._matchers.get(key)
+        if cached is None or cached[0] is not patterns:
+            cached = self._matchers[key] = (patterns, ProfiledMatcher(self, patterns))
+        return cached[1]
+
+    def add_rule(self, rule, seconds, matches=0):
+        """Records a run of a content rule over some content."""
+        stats = self.rules.get(rule)
+        if stats is None:
+            stats = self.rules[rule] = [0.0, 0, 0]
+        stats[0] += seconds
+        stats[1] += 1
+        stats[2] += matches
+
+    def exclude(self, seconds):
+        """Excludes seconds of profiling work from the enclosing phases."""
+        self._excluded += seconds
+
+    def report(self, top=PROFILE_TOP):
+        """
+        Formats the profile.
+
+        Parameters
+        ----------
+        top : int
+            The number of slowest files and most expensive rules listed.
+
+        Returns
+        -------
+        list of str
+            The lines of the report.
+        """
+        lines = [f"Profile: scan took {self.seconds:.3f}s"]
+        if self.phases:
+            lines.append("Phases (cumulative seconds, calls):")
+            for phase in sorted(self.phases):
+                seconds, calls = self.phases[phase]
+                lines.append(f"  {phase:<20} {seconds:>9.4f}s {calls:>9}")
+        if self.files:
+            lines.append(f"Slowest files (top {top}):")
+            for rel_path, seconds in nlargest(
+                top, self.files.items(), key=lambda item: item[1]
+            ):
+                lines.append(f"  {seconds:>9.4f}s  {rel_path}")
+        if self.rules:
+            lines.append(
+                f"Most expensive content rules (top {top}, each rule timed alone;"
+                " seconds, runs, matches):"
+            )
+            for rule, (seconds, calls, matches) in nlargest(
+                top, self.rules.items(), key=lambda item: item[1][0]
+            ):
+                lines.append(f"  {seconds:>9.4f}s {calls:>7} {matches:>7}  {rule}")
+        if self.pstats_path:
+            lines.append(f"cProfile statistics written to {self.pstats_path}")
+        return lines
+
+    def log_report(self, logger, top=PROFILE_TOP):
+        """Logs the report, see `report`."""
+        for line in self.report(top):
+            logger.info(line)
+
+
+class ProfiledMatcher:
+    """
+    A content matcher recording the time of the matching and of each rule.
+
+    The matches come from the wrapped matcher, so the findings of a
+    profiled scan are the ones of a normal scan. After each match, the
+    SENSITIVE_CONTENT rules and the patterns of RULES are run one at a
+    time, and the entropy detector and the detector plugins on their own,
+    over the same content, which tells which rule the merged regex spends
+    its time on.
+    """
+
+    def __init__(self, profiler, patterns):
+        """
+        Parameters
+        ----------
+        profiler : ScanProfiler
+            The profiler recording the timings.
+        patterns : list of str or ContentMatcher
+            The patterns, or the matcher they were compiled into, e.g. a
+            SecretMatcher.
+        """
+        self.profiler = profiler
+        self.inner = compile_content_patterns(patterns)
+        # a SecretMatcher combines a ContentMatcher and an EntropyDetector
+        self.detector = getattr(self.inner, "detector", None)
+        content = getattr(self.inner, "matcher", self.inner)
+        # reported by rule id: the Rule of a pattern of RULES, or the id of
+        # a SENSITIVE_CONTENT pattern
+        rules = getattr(self.inner, "rules", {})
+        self.rules = tuple(
+            (
+                rules[pattern].id if pattern in rules else pattern_rule_id(pattern),
+                pattern,
+                re.compile(pattern, re.IGNORECASE),
+            )
+            for pattern in getattr(content, "patterns", ())
+        )
+        # the detector plugins of a RuleMatcher, timed by rule id
+        self.plugins = getattr(self.inner, "plugins", ())
+
+    def __count(self, matches):
+        """Returns the number of matches of each rule."""
+        counts = {}
+        for match in matches:
+            rule = match[2]
+            if isinstance(rule, Rule):
+                rule = rule.pattern if rule.pattern is not None else rule.id
+            elif rule in ENTROPY_RULES:
+                rule = ENTROPY_RULE
+            counts[rule] = counts.get(rule, 0) + 1
+        return counts
+
+    def __time_rules(self, matches, run_rule, run_detector, run_plugin):
+        """Times the rules, the entropy detector and the plugins with the runners."""
+        profiler = self.profiler
+        start = perf_counter()
+        counts = self.__count(matches)
+        for rule_id, pattern, compiled in self.rules:
+            rule_start = perf_counter()
+            run_rule(compiled)
+            profiler.add_rule(
+                rule_id, perf_counter() - rule_start, counts.get(pattern, 0)
+            )
+        if self.detector is not None:
+            rule_start = perf_counter()
+            run_detector(self.detector)
+            profiler.add_rule(
+                ENTROPY_RULE, perf_counter() - rule_start, counts.get(ENTROPY_RULE, 0)
+            )
+        for rule, plugin in self.plugins:
+            rule_start = perf_counter()
+            run_plugin(plugin)
+            profiler.add_rule(
+                rule.id, perf_counter() - rule_start, counts.get(rule.id, 0)
+            )
+        profiler.exclude(perf_counter() - start)
+
+    def iter_matches(self, buffer, first_line=1):
+        """Matches a buffer as `ContentMatcher.iter_matches`, timing it."""
+        clock = self.profiler.clock()
+        matches = list(self.inner.iter_matches(buffer, first_line))
+        self.profiler.add("content.match", clock)
+
+        prepare = perf_counter()
+        text = buffer[:].decode("utf-8", errors="ignore")
+        self.profiler.exclude(perf_counter() - prepare)
+        self.__time_rules(
+            matches,
+            lambda compiled: sum(1 for _ in compiled.finditer(text)),
+            lambda detector: sum(1 for _ in detector.iter_tokens(buffer)),
+            lambda plugin: sum(1 for _ in plugin.iter_matches(buffer, first_line)),
+        )
+        return iter(matches)
+
+    def iter_line_matches(self, lines):
+        """Matches separate lines as `ContentMatcher.iter_line_matches`, timing it."""
+        lines = list(lines)
+        clock = self.profiler.clock()
+        matches = list(self.inner.iter_line_matches(lines))
+        self.profiler.add("content.match", clock)
+
+        prepare = perf_counter()
+        texts = [raw.decode("utf-8", errors="ignore") for _, raw in lines]
+        self.profiler.exclude(perf_counter() - prepare)
+        self.__time_rules(
+            matches,
+            lambda compiled: sum(1 for text in texts if compiled.search(text)),
+            lambda detector: sum(1 for _ in detector.iter_line_matches(lines)),
+            lambda plugin: sum(1 for _ in plugin.iter_line_matches(lines)),
+        )
+        return iter(matches)
@@ -0,0 +1,516 @@
+"""The RULES of `.pygitguard.yaml`: scoped content rules and detector plugins."""
+
+import os
+import re
+from abc import ABC, abstractmethod
+from fnmatch import translate
+from functools import lru_cache
+from heapq import merge
+
+from pygitguard.config.pygitguard_constants import (
+    DETECTOR_ENTRY_POINT_GROUP,
+    PYGITGUARD_FILENAME,
+)
+from pygitguard.helpers.pattern_helper import compile_content_patterns
+
+# The detector factories registered in this process, by name
+DETECTORS = {}
+
+# The entry points of the installed detector plugins, once listed
+_entry_points = None
+
+
+def _freeze(value):
+    """Returns a hashable copy of a YAML value, with mappings as sorted tuples."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class Rule:
+    """
+    A content rule of RULES, with the files it applies to.
+
+    Rules compare and hash by value, so the compiled rule sets of equal
+    configurations are shared.
+
+    Attributes
+    ----------
+    id : str
+        The rule id, reported as the `rule_id` of its findings.
+    pattern : str or None
+        The regex of the rule, matched case-insensitively.
+    detector : str or None
+        The name of the detector plugin of the rule, instead of a pattern.
+    options : dict
+        The keyword arguments the detector is created with.
+    severity : str
+        The severity of its findings.
+    blocks : bool or None
+        Whether its findings block the commit, None to decide from the
+        severity.
+    include, exclude : tuple of str
+        Path globs of the files the rule applies, and does not apply, to.
+        Without `include` it applies to every file.
+    file_types : frozenset of str
+        The extensions of the files it applies to, every file when empty.
+    """
+
+    __slots__ = (
+        "id",
+        "pattern",
+        "detector",
+        "options",
+        "severity",
+        "blocks",
+        "include",
+        "exclude",
+        "file_types",
+        "key",
+        "_hash",
+    )
+
+    def __init__(
+        self,
+        id,
+        pattern=None,
+        detector=None,
+        options=None,
+        severity="critical",
+        blocks=None,
+        include=(),
+        exclude=(),
+        file_types=frozenset(),
+    ):
+        self.id = id
+        self.pattern = pattern
+        self.detector = detector
+        self.options = dict(options or {})
+        self.severity = severity
+        self.blocks = blocks
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        self.file_types = frozenset(file_types)
+        self.key = (
+            id,
+            pattern,
+            detector,
+            _freeze(self.options),
+            severity,
+            blocks,
+            self.include,
+            self.exclude,
+            tuple(sorted(self.file_types)),
+        )
+        self._hash = hash(self.key)
+
+    def __eq__(self, other):
+        if not isinstance(other, Rule):
+            return NotImplemented
+        return self.key == other.key
+
+    def __hash__(self):
+        return self._hash
+
+    def __repr__(self):
+        return f"Rule({self.id!r})"
+
+
+class Detector(ABC):
+    """
+    Base class of the custom detectors provided by plugins.
+
+    A plugin declares a factory, usually a subclass, in the
+    `pygitguard.detectors` entry point group::
+
+        [project.entry-points."pygitguard.detectors"]
+        stripe = "my_package.detectors:StripeKeyDetector"
+
+    and a rule of `.pygitguard.yaml` uses it with `detector: stripe`. The
+    factory is called with the `options` of the rule as keyword arguments.
+
+    Subclasses must implement `search`, checking one line, or can not be
+    instantiated. Detectors with a faster way of scanning whole files
+    override `iter_matches` and `iter_line_matches` too, which have the
+    interface of `ContentMatcher.iter_matches`, their rule being ignored.
+    """
+
+    def __init__(self, **options):
+        self.options = options
+
+    @abstractmethod
+    def search(self, line):
+        """
+        Searches a line for a secret.
+
+        Parameters
+        ----------
+        line : str
+            The decoded line, without its newline.
+
+        Returns
+        -------
+        tuple or None
+            The `(start, end)` span of the secret in the line, or None.
+        """
+
+    def iter_matches(self, buffer, first_line=1):
+        """Scans a buffer line by line with `search`, see `ContentMatcher`."""
+        lines = buffer[:].split(b"\n")
+        return self.iter_line_matches(enumerate(lines, first_line))
+
+    def iter_line_matches(self, lines):
+        """Scans separate `(line_number, line)` pairs with `search`."""
+        for line_number, raw in lines:
+            line = raw.decode("utf-8", errors="ignore")
+            span = self.search(line)
+            if span is not None:
+                yield line_number, line, None, tuple(span)
+
+
+def register_detector(name, factory):
+    """
+    Registers a detector factory in this process, as a plugin would.
+
+    Parameters
+    ----------
+    name : str
+        The name rules refer to it by. It takes precedence over an
+        installed plugin of the same name.
+    factory : callable
+        Called with the `options` of a rule, returns an object with the
+        interface of Detector.
+    """
+    DETECTORS[name] = factory
+
+
+def _detector_entry_points():
+    """Returns the entry points of the installed detector plugins, by name."""
+    global _entry_points
+    if _entry_points is None:
+        try:
+            from importlib.metadata import entry_points  # imported lazily
+        except ImportError:  # Python 3.7, plugins need importlib_metadata
+            try:
+                from importlib_metadata import entry_points
+            except ImportError:
+                _entry_points = {}
+                return _entry_points
+        found = entry_points()
+        if hasattr(found, "select"):
+            group = found.select(group=DETECTOR_ENTRY_POINT_GROUP)
+        else:
+            group = found.get(DETECTOR_ENTRY_POINT_GROUP, ())
+        _entry_points = {entry_point.name: entry_point for entry_point in group}
+    return _entry_points
+
+
+def detector_versions(names):
+    """
+    Returns the versions of the plugins providing some detectors.
+
+    They are part of the cache fingerprint, so upgrading a plugin rescans
+    the files.
+
+    Parameters
+    ----------
+    names : iterable of str
+        The detector names.
+
+    Returns
+    -------
+    tuple
+        `(name, version)` pairs, the version being None for detectors
+        registered in this process or of unknown distributions.
+    """
+    versions = []
+    for name in sorted(set(names)):
+        entry_point = None if name in DETECTORS else _detector_entry_points().get(name)
+        dist = getattr(entry_point, "dist", None)
+        versions.append((name, getattr(dist, "version", None)))
+    return tuple(versions)
+
+
+def load_detector(name, options):
+    """
+    Creates the detector of a rule.
+
+    Parameters
+    ----------
+    name : str
+        The name of the detector: registered with `register_detector`, or
+        of an entry point of the `pygitguard.detectors` group.
+    options : dict
+        The keyword arguments of its factory.
+
+    Returns
+    -------
+    object
+        The detector, with the interface of Detector.
+
+    Raises
+    ------
+    ConfigError
+        If no plugin provides the detector, or it rejects the options.
+    """
+    # imported lazily, config_helper imports this module
+    from pygitguard.helpers.config_helper import ConfigError
+
+    factory = DETECTORS.get(name)
+    if factory is None:
+        entry_point = _detector_entry_points().get(name)
+        if entry_point is None:
+            raise ConfigError(
+                f"{PYGITGUARD_FILENAME}: no detector plugin {name!r} is installed"
+                f" (entry point group {DETECTOR_ENTRY_POINT_GROUP})"
+            )
+        factory = entry_point.load()
+    try:
+        detector = factory(**options)
+    except TypeError as error:
+        raise ConfigError(
+            f"{PYGITGUARD_FILENAME}: invalid options of detector {name!r}: {error}"
+        ) from None
+    if not hasattr(detector, "iter_matches") or not hasattr(
+        detector, "iter_line_matches"
+    ):
+        raise ConfigError(
+            f"{PYGITGUARD_FILENAME}: detector {name!r} does not have the"
+            " interface of pygitguard.helpers.rule_helper.Detector"
+        )
+    return detector
+
+
+def _compile_globs(globs):
+    """Compiles path globs into one regex, None when there are none."""
+    if not globs:
+        return None
+    return re.compile("|".join(f"(?:{translate(glob)})" for glob in globs))
+
+
+class RuleMatcher:
+    """
+    The content matcher of the files a subset of RULES applies to.
+
+    The patterns of the rules are merged with SENSITIVE_CONTENT into a
+    single ContentMatcher, a line being reported once, by the first rule
+    matching it; SENSITIVE_CONTENT comes first. The detectors of plugins,
+    and the entropy detector when enabled, run besides it. Matches of a
+    rule carry the Rule instead of a pattern, so the findings get its id
+    and severity.
+
+    It has the interface of ContentMatcher, and the `matcher` and
+    `detector` attributes of a SecretMatcher.
+    """
+
+    def __init__(self, matcher, detector, rules, plugins):
+        """
+        Parameters
+        ----------
+        matcher : ContentMatcher
+            The merged patterns.
+        detector : EntropyDetector or None
+            The entropy detector.
+        rules : dict
+            The Rule of each pattern of a rule.
+        plugins : tuple
+            `(rule, detector)` for each rule with a detector plugin.
+        """
+        self.matcher = matcher
+        self.detector = detector
+        self.rules = rules
+        self.plugins = plugins
+
+    def __merge(self, content, entropy, plugins):
+        """Merges the matches of every source, in line order."""
+        rules = self.rules
+        content = [
+            match if rule is None else (match[0], match[1], rule, match[3])
+            for match, rule in ((match, rules.get(match[2])) for match in content)
+        ]
+        sources = [content]
+        if entropy is not None:
+            lines = {match[0] for match in content}
+            sources.append(match for match in entropy if match[0] not in lines)
+        for rule, matches in plugins:
+            sources.append(
+                [
+                    (line_number, line, rule, span)
+                    for line_number, line, _, span in matches
+                ]
+            )
+        return merge(*sources, key=lambda match: match[0])
+
+    def iter_matches(self, buffer, first_line=1):
+        """Scans a buffer as `ContentMatcher.iter_matches`, in line order."""
+        return self.__merge(
+            self.matcher.iter_matches(buffer, first_line),
+            (
+                self.detector.iter_matches(buffer, first_line)
+                if self.detector is not None
+                else None
+            ),
+            [
+                (rule, plugin.iter_matches(buffer, first_line))
+                for rule, plugin in self.plugins
+            ],
+        )
+
+    def iter_line_matches(self, lines):
+        """Scans separate `(line_number, line)` pairs, in line order."""
+        lines = list(lines)
+        return self.__merge(
+            self.matcher.iter_line_matches(lines),
+            (
+                self.detector.iter_line_matches(lines)
+                if self.detector is not None
+                else None
+            ),
+            [(rule, plugin.iter_line_matches(lines)) for rule, plugin in self.plugins],
+        )
+
+
+class RuleSet:
+    """
+    RULES compiled for dispatch: which rules apply to a file, and their matcher.
+
+    The rules are bucketed once by the extensions they are scoped to, so
+    finding the rules of a file is a dictionary lookup of its extension,
+    and only rules with path globs are checked against its path. The
+    matcher of each distinct subset of rules is compiled once and shared
+    by every file it applies to. Files no rule applies to get the plain
+    SENSITIVE_CONTENT matcher, at no extra cost.
+    """
+
+    def __init__(self, rules, base):
+        """
+        Compiles the rules and loads their detector plugins.
+
+        Parameters
+        ----------
+        rules : tuple of Rule
+            The rules, in configuration order.
+        base : ContentMatcher or SecretMatcher
+            The matcher of SENSITIVE_CONTENT and of the entropy detector.
+
+        Raises
+        ------
+        ConfigError
+            If the detector of a rule can not be loaded.
+        """
+        self.rules = rules
+        self.base = base
+        self._plugins = {
+            index: load_detector(rule.detector, rule.options)
+            for index, rule in enumerate(rules)
+            if rule.detector is not None
+        }
+        self._globs = [
+            (_compile_globs(rule.include), _compile_globs(rule.exclude))
+            for rule in rules
+        ]
+
+        # (rules applying whatever the path, rules to check the path of)
+        # for the files of each extension some rule is scoped to
+        def bucket(indices):
+            static = tuple(i for i in indices if self._globs[i] == (None, None))
+            scoped = tuple(i for i in indices if self._globs[i] != (None, None))
+            return static, scoped
+
+        unscoped = [i for i, rule in enumerate(rules) if not rule.file_types]
+        extensions = {ext for rule in rules for ext in rule.file_types}
+        self._default = bucket(unscoped)
+        self._dispatch = {
+            extension: bucket(
+                sorted(
+                    unscoped
+                    + [
+                        i
+                        for i, rule in enumerate(rules)
+                        if extension in rule.file_types
+                    ]
+                )
+            )
+            for extension in extensions
+        }
+        self._matchers = {}
+
+    def applies(self, index, rel_path):
+        """True if the path globs of the rule at 'index' select 'rel_path'."""
+        include, exclude = self._globs[index]
+        if include is not None and not include.match(rel_path):
+            return False
+        return exclude is None or not exclude.match(rel_path)
+
+    def matcher_for(self, rel_path):
+        """
+        Returns the matcher of a file, with the rules applying to it.
+
+        Parameters
+        ----------
+        rel_path : str
+            The relative path of the file, or `archive.zip!inner/path`
+            for a member of an archive.
+
+        Returns
+        -------
+        ContentMatcher or RuleMatcher
+            The matcher, `base` when no rule applies to the file.
+        """
+        name = rel_path.rpartition("/")[2].rpartition("!")[2]
+        static, scoped = self._dispatch.get(
+            os.path.splitext(name)[1].lower(), self._default
+        )
+        if scoped:
+            selected = [i for i in scoped if self.applies(i, rel_path)]
+            key = tuple(sorted(static + tuple(selected))) if selected else static
+        else:
+            key = static
+        matcher = self._matchers.get(key)
+        if matcher is None:
+            matcher = self._matchers[key] = self.__compile(key)
+        return matcher
+
+    def __compile(self, key):
+        """Compiles the matcher of the rules at the indices 'key'."""
+        if not key:
+            return self.base
+        content = getattr(self.base, "matcher", self.base)
+        patterns = list(content.patterns)
+        rules = {}
+        for index in key:
+            pattern = self.rules[index].pattern
+            # a pattern of SENSITIVE_CONTENT, or of an earlier rule, is
+            # reported as such
+            if pattern is None or pattern in rules or pattern in content.patterns:
+                continue
+            rules[pattern] = self.rules[index]
+            patterns.append(pattern)
+        return RuleMatcher(
+            compile_content_patterns(patterns),
+            getattr(self.base, "detector", None),
+            rules,
+            tuple((self.rules[i], self._plugins[i]) for i in key if i in self._plugins),
+        )
+
+
+@lru_cache(maxsize=32)
+def compile_rules(rules, base):
+    """
+    Returns the RuleSet of some rules, compiling it once per process.
+
+    Parameters
+    ----------
+    rules : tuple of Rule
+        The RULES.
+    base : ContentMatcher or SecretMatcher
+        The matcher of SENSITIVE_CONTENT and of the entropy detector.
+
+    Returns
+    -------
+    RuleSet
+        The compiled rules.
+    """
+    return RuleSet(rules, base)
@@ -1,20 +1,244 @@
 """A module to scan a Git repository for security and best practice issues."""
 
+import io
+import logging
+import mmap
 import os
-import re
+from fnmatch import fnmatch
 from logging import Logger
 
-import yaml
-
 from pygitguard.config.pygitguard_constants import (
-    BEST_PRACTICES_FILES,
+    BINARY_EXTENSIONS,
+    BINARY_SNIFF_SIZE,
     INTERNAL_FILE_IGNORE,
-    MAX_FILE_SIZE_MB,
-    PYGITGUARD_FILENAME,
-    SENSITIVE_CONTENT,
-    SENSITIVE_PATTERNS,
+    TEXT_EXTENSIONS,
+)
+from pygitguard.helpers.config_helper import ScanConfig
+from pygitguard.helpers.extract_helper import (
+    ExtractionBudget,
+    ExtractionError,
+    extractor_for,
+    is_streaming,
+    iter_members,
+)
+from pygitguard.helpers.findings_helper import (
+    ENTROPY_RULES,
+    KIND_ARCHIVE,
+    KIND_BEST_PRACTICE,
+    KIND_CONTENT,
+    KIND_ENTROPY,
+    KIND_FILENAME,
+    KIND_LARGE_FILE,
+    SEVERITY_CRITICAL,
+    SEVERITY_INFO,
+    SEVERITY_WARNING,
+    Finding,
+    FindingCollector,
+    pattern_rule_id,
+)
+from pygitguard.helpers.git_helper import (
+    ContentSample,
+    GitCatFile,
+    GitIgnoreMatcher,
+    get_changed_files,
+    get_staged_files,
+    independent_commits,
+    iter_added_lines,
+    iter_history_changes,
+    resolve_revisions,
+    walk_repository,
+)
+from pygitguard.helpers.pattern_helper import (
+    compile_content_patterns,
+    compile_filename_patterns,
 )
-from pygitguard.helpers.git_helper import is_ignored_by_gitignore
+from pygitguard.helpers.rule_helper import Rule
+
+# Size of the blocks read when a file can not be memory-mapped
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Number of files handed to a worker process at a time
+PARALLEL_BATCH_SIZE = 256
+
+# Commits between two saves of the history checkpoint
+HISTORY_CHECKPOINT_INTERVAL = 1000
+
+
+def classify_extension(filename, binary_extensions, text_extensions):
+    """
+    Classifies a file as binary or text from its extension alone.
+
+    Parameters
+    ----------
+    filename : str
+        The name or path of the file.
+    binary_extensions : container of str
+        Lower-cased extensions, with the leading dot, always treated as binary.
+    text_extensions : container of str
+        Lower-cased extensions, with the leading dot, always treated as text.
+
+    Returns
+    -------
+    bool or None
+        True for binary, False for text, None when the content must be
+        sniffed to decide.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if not extension:
+        return None
+    if extension in binary_extensions:
+        return True
+    if extension in text_extensions:
+        return False
+    return None
+
+
+def is_binary_content(head):
+    """
+    Checks if content looks binary, i.e. has a NUL byte in its first bytes.
+
+    Parameters
+    ----------
+    head : bytes or mmap.mmap
+        The content, or at least its first BINARY_SNIFF_SIZE bytes.
+
+    Returns
+    -------
+    bool
+        True if a NUL byte is found in the first BINARY_SNIFF_SIZE bytes.
+    """
+    return head.find(b"\0", 0, BINARY_SNIFF_SIZE) != -1
+
+
+def large_file_sample_size(rel_path, rules):
+    """
+    Returns how much of a file larger than MAX_FILE_SIZE_MB is scanned.
+
+    Parameters
+    ----------
+    rel_path : str
+        The relative path of the file.
+    rules : list of dict
+        The LARGE_FILE_CONTENT_SCAN rules, each with a `path` glob, a `mode`
+        ("skip" or "sample") and for samples a `sample_kb` size. The first
+        rule whose glob matches the path applies.
+
+    Returns
+    -------
+    int or None
+        The number of bytes scanned at each end of the file, or None when
+        its content is not scanned.
+    """
+    for rule in rules:
+        if fnmatch(rel_path, rule.get("path", "*")):
+            if rule.get("mode", "skip") == "sample":
+                return int(rule.get("sample_kb", 64)) * 1024
+            return None
+    return None
+
+
+def count_newlines(f, end):
+    """Counts the newlines in the first 'end' bytes of the binary file 'f'."""
+    f.seek(0)
+    total = 0
+    while end > 0:
+        block = f.read(min(READ_CHUNK_SIZE, end))
+        if not block:
+            break
+        total += block.count(b"\n")
+        end -= len(block)
+    return total
+
+
+def max_read_size(filename, settings):
+    """
+    Returns the size up to which a git object is read whole, see GitCatFile.read.
+
+    Archives are extracted from memory when they come from git objects, so
+    they are read whole up to the `max_total_mb` of ARCHIVE_SCAN instead of
+    MAX_FILE_SIZE_MB.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file.
+    settings : ScanConfig
+        The configuration of the scan.
+
+    Returns
+    -------
+    int
+        The size in bytes.
+    """
+    max_size = int(settings.max_size_mb * 1024 * 1024)
+    if settings.archive_scan["enabled"]:
+        extractor = extractor_for(filename)
+        if extractor is not None and is_streaming(extractor):
+            max_total_size = int(settings.archive_scan["max_total_mb"] * 1024 * 1024)
+            return max(max_size, max_total_size)
+    return max_size
+
+
+def read_sample(f, size, sample_size):
+    """
+    Reads the first and last 'sample_size' bytes of a binary file.
+
+    Parameters
+    ----------
+    f : file object
+        A file opened in binary mode.
+    size : int
+        The size of the file.
+    sample_size : int
+        The number of bytes read at each end.
+
+    Returns
+    -------
+    ContentSample
+        The sample, without its newline count which is computed on demand.
+    """
+    head = f.read(min(sample_size, size))
+    tail_offset = max(len(head), size - sample_size)
+    f.seek(tail_offset)
+    tail = f.read(size - tail_offset)
+    return ContentSample(size, head, tail, tail_offset, None)
+
+
+def read_line_chunks(f, chunk_size=READ_CHUNK_SIZE, head=b""):
+    """
+    Reads a binary file in large chunks that always end on a line boundary.
+
+    The incomplete last line of a chunk is carried over to the next one, so
+    a match, which never spans lines, is never split between two chunks.
+
+    Parameters
+    ----------
+    f : file object
+        A file opened in binary mode.
+    chunk_size : int
+        The number of bytes read at a time.
+    head : bytes
+        Bytes already read from the start of 'f'.
+
+    Yields
+    ------
+    bytes
+        The chunks, each ending with a newline except possibly the last.
+    """
+    carry = head
+    while True:
+        data = f.read(chunk_size)
+        if not data:
+            if carry:
+                yield carry
+            return
+        data = carry + data
+        cut = data.rfind(b"\n") + 1
+        if cut == 0:
+            carry = data
+            continue
+        carry = data[cut:]
+        yield data[:cut]
 
 
 class PyGitGuardScan:
@@ -42,7 +266,7 @@ class PyGitGuardScan:
         Scans the repository at the given path, updating `block_commit` if any issues are found.
     """
 
-    def __init__(self, logger: Logger):
+    def __init__(self, logger: Logger, profiler=None, writer=None):
         """
         Initializes the PyGitGuardScan instance with a logger.
 
@@ -51,16 +275,80 @@ class PyGitGuardScan:
         logger : Logger
             An instance of a logging.Logger to be used for logging messages
             during the scan process.
+        profiler : ScanProfiler, optional
+            When given, the checks, git reads, walk and cache of the scans
+            are timed into it. Profiled scans run serially.
+        writer : JsonLinesWriter or SarifWriter, optional
+            When given, the findings are written to it as soon as they are
+            found, instead of being kept in `findings`.
 
         Attributes
         ----------
         block_commit : bool
             A flag indicating whether the commit should be blocked due
             to detected issues. Initialized to False.
+        findings : FindingCollector
+            The findings of the checks, buffered until they are rendered.
+        files_scanned : int
+            The number of files checked by the last scan.
+        binary_files_skipped : int
+            The number of binary files whose content was not scanned.
+        large_files_capped : int
+            The number of large files whose content was skipped or sampled.
+        cache_hits : int
+            The number of unchanged files whose results came from the cache.
+        commits_scanned : int
+            The number of commits read by a history scan.
+        baseline : Baseline or None
+            The known findings, which are suppressed instead of reported.
+        findings_suppressed : int
+            The number of findings suppressed by the baseline.
+        profiler : ScanProfiler or None
+            The profiler timing the scans, if any.
+        executor : concurrent.futures.Executor or None
+            A process pool shared by the scans of several repositories, see
+            `create_shared_executor`. Each scan creates its own pool otherwise.
         """
 
         self.logger = logger
         self.block_commit = False  # <- flag de bloqueio de commit
+        self.findings = FindingCollector(writer)
+        self.files_scanned = 0
+        self.binary_files_skipped = 0
+        self.large_files_capped = 0
+        self.cache_hits = 0
+        self.commits_scanned = 0
+        self.baseline = None
+        self.findings_suppressed = 0
+        self.profiler = profiler
+        self.executor = None
+        # the commit of the findings of a history scan
+        self.__commit = None
+        if profiler is not None:
+            profiler.instrument(self)
+
+    def __timed(self, phase, obj, *methods):
+        """Times some methods of 'obj' as 'phase' when the scan is profiled."""
+        if self.profiler is None:
+            return obj
+        return self.profiler.wrap(obj, phase, methods)
+
+    def __iterate(self, phase, iterable):
+        """Times the iteration of 'iterable' as 'phase' when the scan is profiled."""
+        if self.profiler is None:
+            return iterable
+        return self.profiler.iterate(phase, iterable)
+
+    def __report(self, finding):
+        """Buffers a finding, blocking the commit if it is blocking."""
+        if self.baseline is not None and finding in self.baseline:
+            self.findings_suppressed += 1
+            return
+        if self.__commit is not None:
+            finding.commit = self.__commit
+        self.findings.add(finding)
+        if finding.blocking:
+            self.block_commit = True  # ← bloqueia commit
 
     def __get_value_case_insensitive(self, d: dict, key: str):
         """
@@ -82,51 +370,41 @@ class PyGitGuardScan:
                 return v
         raise KeyError(f"Key '{key}' not found")
 
-    def load_pygitguard_config(self, base_path):
+    def load_pygitguard_config(self, base_path, use_cache=False):
         """
-        Loads configuration from the project root's `gitguard.yaml` file.
+        Loads configuration from the project root's `.pygitguard.yaml` file.
 
         If the file does not exist, the default configuration is returned.
+        Settings missing from the file take their default value.
 
         Parameters
         ----------
         base_path : str
             The path to the project root.
+        use_cache : bool
+            When True the validated configuration is cached in
+            `.git/pygitguard/`, and the file is only parsed again when its
+            content changes.
 
         Returns
         -------
-        tuple
-            A tuple containing the maximum file size in megabytes,
-            sensitive content regex patterns, and sensitive file patterns.
-        """
-        config_path = os.path.join(base_path, PYGITGUARD_FILENAME)
-        if not os.path.isfile(config_path):
-            return (
-                MAX_FILE_SIZE_MB,
-                SENSITIVE_CONTENT,
-                SENSITIVE_PATTERNS,
-                INTERNAL_FILE_IGNORE,
-                BEST_PRACTICES_FILES,
-            )
-
-        with open(config_path, "r", encoding="utf-8") as f:
-            config = yaml.safe_load(f) or {}
+        ScanConfig
+            The validated configuration.
 
-        return (
-            config.get("MAX_FILE_SIZE_MB", MAX_FILE_SIZE_MB),
-            config.get("SENSITIVE_CONTENT", SENSITIVE_CONTENT),
-            config.get("SENSITIVE_PATTERNS", SENSITIVE_PATTERNS),
-            config.get("INTERNAL_FILE_IGNORE", INTERNAL_FILE_IGNORE),
-            config.get("BEST_PRACTICES_FILES", BEST_PRACTICES_FILES),
-        )
+        Raises
+        ------
+        ConfigError
+            If the file is not valid YAML or does not match the schema.
+        """
+        return ScanConfig.load(base_path, use_cache)
 
     def check_best_practices(self, base_path, best_practices_files):
         """
         Verifies if the best practices files are present in the repository.
 
         Files in `BEST_PRACTICES_FILES` are checked against the files in the
-        repository root. If a file is not found, a recommendation message is
-        logged and the commit is blocked.
+        repository root. If a file is not found, a recommendation is
+        reported, without blocking the commit.
 
         Args:
             base_path: The path to the repository root.
@@ -141,14 +419,22 @@ class PyGitGuardScan:
                 src = list(item.keys())[0].lower()
                 target = self.__get_value_case_insensitive(item, src)
                 if src in files_in_dir and target.lower() not in files_in_dir:
-                    self.logger.info(
-                        f"RECOMENDED: you are using '{src}' → consider"
-                        f"adding best practice file '{target}'"
+                    self.__report(
+                        Finding(
+                            KIND_BEST_PRACTICE,
+                            KIND_BEST_PRACTICE,
+                            SEVERITY_INFO,
+                            target,
+                            snippet=src,
+                        )
                     )
             else:
                 if item.lower() not in files_in_dir:
-                    self.logger.info(f"RECOMENDED: create best practice file '{item}'")
-                    self.block_commit = False
+                    self.__report(
+                        Finding(
+                            KIND_BEST_PRACTICE, KIND_BEST_PRACTICE, SEVERITY_INFO, item
+                        )
+                    )
 
     def check_sensitive_filenames(
         self, filename, rel_path, patterns, internal_file_ignore
@@ -156,8 +442,8 @@ class PyGitGuardScan:
         """
         Checks if a file's name matches any of the given patterns.
 
-        If a file's name matches any of the given patterns, a warning is logged
-        and the commit is blocked.
+        If a file's name matches any of the given patterns, one warning finding
+        listing every pattern it matched is reported and the commit is blocked.
 
         Parameters
         ----------
@@ -166,23 +452,29 @@ class PyGitGuardScan:
         rel_path : str
             The relative path to the file from the base path.
         patterns : list[str]
-            A list of regex patterns to search for within the file's name.
+            A list of regex patterns to search for within the file's name,
+            compiled once per pattern set into a FilenameMatcher.
 
         Returns
         -------
         None
         """
-        for pattern in patterns:
-            if (
-                re.search(pattern, filename, re.IGNORECASE)
-                and filename not in internal_file_ignore
-            ):
-                self.logger.warning(f"WARNING: sensitive file name: '{rel_path}'")
-                self.block_commit = True  # ← bloqueia commit
+        if filename in internal_file_ignore:
+            return
+        rules = compile_filename_patterns(patterns).match(filename)
+        if rules:
+            rules = [pattern_rule_id(rule, KIND_FILENAME) for rule in rules]
+            self.__report(
+                Finding(
+                    KIND_FILENAME, rules[0], SEVERITY_WARNING, rel_path, rules=rules
+                )
+            )
 
-    def check_large_file(self, full_path, rel_path, max_size_mb, internal_file_ignore):
+    def check_large_file(
+        self, full_path, rel_path, max_size_mb, internal_file_ignore, size=None
+    ):
         """
-        Checks if a file exceeds the maximum allowed size and logs a warning if it does.
+        Checks if a file exceeds the maximum allowed size and reports it if it does.
 
         Parameters
         ----------
@@ -192,22 +484,41 @@ class PyGitGuardScan:
             The relative path of the file from the base path.
         max_size_mb : int
             The maximum file size in megabytes allowed before triggering a warning.
+        size : int, optional
+            The file size in bytes when already known (e.g. from the walk),
+            avoiding another stat of the file.
+
+        Returns
+        -------
+        bool
+            True if the file exceeds the limit, even when it is ignored.
 
         Notes
         -----
-        If the file size exceeds the specified limit, a warning is logged and the
-        commit block flag is set to True.
+        If the file size exceeds the specified limit, a critical finding is
+        reported and the commit block flag is set to True.
         """
 
-        if (
-            os.path.getsize(full_path) > max_size_mb * 1024 * 1024
-            and full_path not in internal_file_ignore
-        ):
+        if size is None:
+            size = os.path.getsize(full_path)
+        large = size > max_size_mb * 1024 * 1024
+        if large and full_path not in internal_file_ignore:
 
-            self.logger.critical(f"LARGE FILE: {rel_path}")
-            self.block_commit = True  # ← bloqueia commit
+            self.__report(
+                Finding(KIND_LARGE_FILE, KIND_LARGE_FILE, SEVERITY_CRITICAL, rel_path)
+            )
+        return large
 
-    def check_sensitive_content(self, full_path, rel_path, patterns):
+    def check_sensitive_content(
+        self,
+        full_path,
+        rel_path,
+        patterns,
+        content=None,
+        binary_extensions=BINARY_EXTENSIONS,
+        text_extensions=TEXT_EXTENSIONS,
+        sample_size=None,
+    ):
         """
         Checks a file for sensitive content based on provided regex patterns.
 
@@ -216,67 +527,837 @@ class PyGitGuardScan:
         full_path : str
             The full path to the file being checked.
         rel_path : str
-            The relative path to the file being checked, used for logging.
-        patterns : list of str
-            A list of regex patterns to search for within the file's content.
+            The relative path to the file, reported in the findings.
+        patterns : list of str or ContentMatcher
+            A list of regex patterns to search for within the file's content,
+            or the matcher they were compiled into, e.g. a SecretMatcher also
+            reporting high-entropy tokens.
+        content : bytes or ContentSample, optional
+            The file content when it does not come from the working tree
+            (e.g. a staged blob). The file is read from 'full_path' otherwise.
+        binary_extensions : container of str
+            Extensions whose content is never scanned.
+        text_extensions : container of str
+            Extensions whose content is always scanned.
+        sample_size : int, optional
+            When given, only the first and last 'sample_size' bytes of the
+            file are read and scanned, keeping memory constant regardless of
+            the file size.
+
+        Binary files, identified by their extension or by a NUL byte in
+        their first bytes, are skipped and counted in `binary_files_skipped`.
+        The whole content is scanned as a single memory-mapped buffer and
+        line numbers are computed only for the matching lines. Files that can
+        not be mapped are read in large chunks instead.
 
-        If sensitive content matching any of the patterns is found, a critical log
-        message is recorded and the commit is blocked by setting `self.block_commit`
-        to True.
+        If sensitive content matching any of the patterns is found, a critical
+        finding is reported and the commit is blocked by setting
+        `self.block_commit` to True.
         """
 
         if os.path.basename(full_path) in INTERNAL_FILE_IGNORE:
             return
 
-        with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
-            for idx, line in enumerate(f, 1):
-                for pattern in patterns:
-                    if re.search(pattern, line, re.IGNORECASE):
-                        self.logger.critical(
-                            f"SENSITIVE content in: {rel_path} line:{idx}: {line.strip()}"
-                        )
-                        self.block_commit = True  # ← bloqueia commit
+        binary = classify_extension(full_path, binary_extensions, text_extensions)
+        if binary:
+            self.binary_files_skipped += 1
+            return
+        sniff = binary is None
 
-    def scan_repository(self, base_path):
+        patterns = compile_content_patterns(patterns)
+        if isinstance(content, ContentSample):
+            if sniff and is_binary_content(content.head):
+                self.binary_files_skipped += 1
+                return
+            self.__scan_sample(content, rel_path, patterns)
+            return
+        if content is not None:
+            if sniff and is_binary_content(content):
+                self.binary_files_skipped += 1
+                return
+            self.__report_content(patterns.iter_matches(content), rel_path)
+            return
+
+        with open(full_path, "rb") as f:
+            if sample_size is not None:
+                sample = read_sample(f, os.fstat(f.fileno()).st_size, sample_size)
+                if sniff and is_binary_content(sample.head):
+                    self.binary_files_skipped += 1
+                    return
+                self.__scan_sample(
+                    sample,
+                    rel_path,
+                    patterns,
+                    lambda: count_newlines(f, sample.tail_offset),
+                )
+                return
+            try:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # empty or special files can not be mapped, read them in chunks
+                head = f.read(BINARY_SNIFF_SIZE)
+                if sniff and is_binary_content(head):
+                    self.binary_files_skipped += 1
+                    return
+                first_line = 1
+                for chunk in read_line_chunks(f, head=head):
+                    self.__report_content(
+                        patterns.iter_matches(chunk, first_line), rel_path
+                    )
+                    first_line += chunk.count(b"\n")
+                return
+            with buffer:
+                if sniff and is_binary_content(buffer):
+                    self.binary_files_skipped += 1
+                    return
+                self.__report_content(patterns.iter_matches(buffer), rel_path)
+
+    def check_added_lines(
+        self,
+        rel_path,
+        lines,
+        patterns,
+        binary_extensions=(),
+        text_extensions=(),
+    ):
         """
-        Scans the given repository for sensitive content, large files, and best practices.
+        Checks the lines added to a file by a diff for sensitive content.
+
+        Only the given lines are searched, so the work is proportional to
+        the size of the change instead of the size of the file.
 
         Parameters
         ----------
-        base_path : str
-            The path to the root of the repository
+        rel_path : str
+            The relative path to the file, reported in the findings.
+        lines : iterable of tuple
+            `(line_number, line)` pairs, with 'line' the raw bytes of a line
+            and 'line_number' its position in the new content.
+        patterns : list of str or ContentMatcher
+            The regex patterns to search for.
+        binary_extensions : container of str
+            Extensions, with the leading dot, of files always treated as
+            binary, whose content is skipped.
+        text_extensions : container of str
+            Extensions, with the leading dot, of files always treated as text.
+        """
+        if os.path.basename(rel_path) in INTERNAL_FILE_IGNORE:
+            return
+        if classify_extension(rel_path, binary_extensions, text_extensions):
+            self.binary_files_skipped += 1
+            return
+        self.__report_content(
+            compile_content_patterns(patterns).iter_line_matches(lines), rel_path
+        )
+
+    def check_archive(self, full_path, rel_path, patterns, settings, content=None):
+        """
+        Checks the members of an archive, or the cells of a notebook, as files.
+
+        The members are streamed out of the archive in memory, never to
+        disk, and each one gets the content checks of a file, its findings
+        reported as `archive.zip!inner/path`. The extraction
+        stops at the ARCHIVE_SCAN limits, each limit reached being reported
+        as an info finding.
+
+        Parameters
+        ----------
+        full_path : str
+            The path to the archive.
+        rel_path : str
+            The relative path to the archive, prefixing its members.
+        patterns : list of str or ContentMatcher
+            The regex patterns to search for in the members.
+        settings : ScanConfig
+            The configuration of the scan.
+        content : bytes, optional
+            The archive when it does not come from the working tree.
 
         Returns
         -------
         bool
-            True if any issues were detected, False if the repository is clean
+            False if the archive could not be read at all, e.g. a corrupt
+            zip or a notebook that is not valid JSON, whose content is then
+            left to `check_sensitive_content`.
+        """
+        if os.path.basename(full_path) in INTERNAL_FILE_IGNORE:
+            return True
+        patterns = compile_content_patterns(patterns)
+        budget = ExtractionBudget.from_settings(settings.archive_scan)
+        extracted = False
+        with open(full_path, "rb") if content is None else io.BytesIO(content) as f:
+            try:
+                for inner_path, data in iter_members(f, rel_path, budget):
+                    extracted = True
+                    self.__scan_member(
+                        f"{rel_path}!{inner_path}", inner_path, data, patterns, settings
+                    )
+            except ExtractionError as error:
+                if not extracted:
+                    return False
+                budget.exceed("unreadable", str(error))
+        for limit, description in budget.problems.items():
+            self.__report(
+                Finding(
+                    KIND_ARCHIVE,
+                    f"archive-{limit}",
+                    SEVERITY_INFO,
+                    rel_path,
+                    snippet=description,
+                )
+            )
+        return True
+
+    def __scan_member(self, member_path, inner_path, data, patterns, settings):
+        """
+        Runs the content checks on a member of an archive.
+
+        The names of the members are not checked against SENSITIVE_PATTERNS:
+        they are not files of the repository, and the classes and modules
+        of ordinary packages, as `User.class`, would block the commit.
         """
-        (
-            max_size_mb,
-            sensitive_content,
-            sensitive_patterns,
-            internal_file_ignore,
-            best_pratices_files,
-        ) = self.load_pygitguard_config(base_path)
-        self.check_best_practices(base_path, best_pratices_files)
+        filename = inner_path.rpartition("!")[2].rpartition("/")[2]
+        if filename in INTERNAL_FILE_IGNORE:
+            return
+        binary = classify_extension(
+            filename, settings.binary_extensions, settings.text_extensions
+        )
+        if binary or (binary is None and is_binary_content(data)):
+            return
+        if settings.rules:
+            patterns = settings.matcher_for(member_path)
+            if self.profiler is not None:
+                patterns = self.profiler.matcher(patterns)
+        self.__report_content(patterns.iter_matches(data), member_path)
+
+    def __scan_sample(self, sample, rel_path, patterns, newlines_before_tail=None):
+        """
+        Scans the first and last bytes of a large file.
 
-        for root, _, files in os.walk(base_path):
-            for filename in files:
-                full_path = os.path.join(root, filename)
-                rel_path = os.path.relpath(full_path, base_path)
+        Partial lines at the edges of the sample are dropped. The line
+        numbers in the tail require the newlines before it, which are only
+        counted when the tail has a match.
 
-                if is_ignored_by_gitignore(full_path, base_path):
-                    continue
+        Parameters
+        ----------
+        sample : ContentSample
+            The sampled content.
+        rel_path : str
+            The relative path to the file, reported in the findings.
+        patterns : ContentMatcher
+            The compiled sensitive content patterns.
+        newlines_before_tail : callable, optional
+            Counts the newlines before the tail when the sample does not
+            carry that count.
+        """
+        head, tail = sample.head, sample.tail
+        if not tail:
+            self.__report_content(patterns.iter_matches(head), rel_path)
+            return
+
+        cut = head.rfind(b"\n") + 1
+        self.__report_content(patterns.iter_matches(head[:cut]), rel_path)
+        if sample.tail_offset == len(head):
+            # head and tail are contiguous, the cut line continues in the tail
+            first_line = head.count(b"\n", 0, cut) + 1
+            self.__report_content(
+                patterns.iter_matches(head[cut:] + tail, first_line), rel_path
+            )
+            return
+
+        skip = tail.find(b"\n") + 1
+        if skip == 0:
+            return
+        matches = list(patterns.iter_matches(tail[skip:]))
+        if not matches:
+            return
+        offset = sample.newlines_before_tail
+        if offset is None:
+            offset = newlines_before_tail()
+        # +1 for the newline ending the partial first line of the tail
+        offset += 1
+        self.__report_content(
+            ((idx + offset, *match) for idx, *match in matches),
+            rel_path,
+        )
 
+    def __report_content(self, matches, rel_path):
+        """
+        Reports the sensitive content matches of a file.
+
+        The matches of RULES are reported with the id, severity and
+        blocking option of their rule, those of SENSITIVE_CONTENT as
+        critical findings, with the id of their pattern, and high-entropy
+        tokens as info findings, which do not block the commit.
+
+        Parameters
+        ----------
+        matches : iterable of tuple
+            `(line_number, line, pattern, span)` tuples from
+            `ContentMatcher.iter_matches`, where 'pattern' is the Rule of
+            the matches of RULES, or the rule id of the entropy matches.
+        rel_path : str
+            The relative path to the file being checked.
+        """
+        for idx, line, pattern, span in matches:
+            if isinstance(pattern, Rule):
+                self.__report(
+                    Finding(
+                        KIND_CONTENT,
+                        pattern.id,
+                        pattern.severity,
+                        rel_path,
+                        idx,
+                        span[0] + 1,
+                        span,
+                        line,
+                        blocks=pattern.blocks,
+                    )
+                )
+                continue
+            entropy = pattern in ENTROPY_RULES
+            self.__report(
+                Finding(
+                    KIND_ENTROPY if entropy else KIND_CONTENT,
+                    pattern if entropy else pattern_rule_id(pattern),
+                    SEVERITY_INFO if entropy else SEVERITY_CRITICAL,
+                    rel_path,
+                    idx,
+                    span[0] + 1,
+                    span,
+                    line,
+                )
+            )
+
+    def __scan_file(self, full_path, rel_path, filename, size, settings, content=None):
+        """
+        Runs the filename, size and content checks on one file.
+
+        The members of archives and notebooks are checked when ARCHIVE_SCAN
+        is enabled, see `check_archive`: archives whatever their size, the
+        ARCHIVE_SCAN limits bounding their extraction, and notebooks up to
+        MAX_FILE_SIZE_MB. The content of the other files larger than
+        MAX_FILE_SIZE_MB is skipped or only sampled, as configured in
+        LARGE_FILE_CONTENT_SCAN.
+
+        Parameters
+        ----------
+        full_path : str
+            The path to the file.
+        rel_path : str
+            The relative path of the file from the base path.
+        filename : str
+            The name of the file.
+        size : int
+            The size of the file in bytes.
+        settings : ScanConfig
+            The configuration of the scan.
+        content : bytes or ContentSample, optional
+            The content when it does not come from the working tree.
+        """
+        self.files_scanned += 1
+        self.check_sensitive_filenames(
+            filename,
+            rel_path,
+            settings.sensitive_patterns,
+            settings.internal_file_ignore,
+        )
+        large = self.check_large_file(
+            full_path,
+            rel_path,
+            settings.max_size_mb,
+            settings.internal_file_ignore,
+            size,
+        )
+        extractor = settings.archive_scan["enabled"] and extractor_for(filename)
+        if extractor and (not large or is_streaming(extractor)):
+            if isinstance(content, ContentSample):
+                self.__report(
+                    Finding(
+                        KIND_ARCHIVE,
+                        "archive-max_total_mb",
+                        SEVERITY_INFO,
+                        rel_path,
+                        snippet="archives larger than max_total_mb in git objects"
+                        " were not extracted",
+                    )
+                )
+            elif self.check_archive(
+                full_path, rel_path, settings.content_matcher, settings, content
+            ):
+                return
+        sample_size = None
+        if large:
+            self.large_files_capped += 1
+            sample_size = large_file_sample_size(
+                rel_path, settings.large_file_content_scan
+            )
+            if sample_size is None:
+                return
+        self.check_sensitive_content(
+            full_path,
+            rel_path,
+            settings.matcher_for(rel_path),
+            content,
+            settings.binary_extensions,
+            settings.text_extensions,
+            sample_size,
+        )
+
+    def scan_files(self, files, settings):
+        """
+        Runs the filename, size and content checks on a list of files.
+
+        Parameters
+        ----------
+        files : iterable of tuple
+            `(full_path, rel_path, filename, stat)` for every file, as
+            yielded by `walk_repository`.
+        settings : ScanConfig
+            The configuration of the scan.
+        """
+        for full_path, rel_path, filename, stat in files:
+            self.__scan_file(full_path, rel_path, filename, stat.st_size, settings)
+
+    def iter_file_results(self, files, settings, jobs):
+        """
+        Scans 'files', yielding the result of each file in order.
+
+        With more than one job and enough files, the files are fanned out
+        to a pool of worker processes in contiguous batches of
+        PARALLEL_BATCH_SIZE and the results are read back in submission
+        order, so the output is identical to a serial scan. With a shared
+        `executor` every file goes to its pool, with the settings of the
+        scan, whatever the number of files.
+
+        Parameters
+        ----------
+        files : list of tuple
+            `(full_path, rel_path, filename, stat)` for every file.
+        settings : ScanConfig
+            The configuration of the scan, compiled once per worker.
+        jobs : int
+            The number of worker processes.
+
+        Yields
+        ------
+        list
+            `[findings, counters]` for every file, see `_scan_isolated`.
+        """
+        shared = self.executor is not None and self.profiler is None
+        if not shared and (jobs <= 1 or len(files) <= PARALLEL_BATCH_SIZE):
+            scanner = PyGitGuardScan(self.logger, self.profiler)
+            yield from _scan_isolated(scanner, files, settings)
+            return
+
+        batches = [
+            files[i : i + PARALLEL_BATCH_SIZE]
+            for i in range(0, len(files), PARALLEL_BATCH_SIZE)
+        ]
+        if shared:
+            for results in self.executor.map(
+                _scan_batch, batches, [settings] * len(batches)
+            ):
+                yield from results
+            return
+
+        from concurrent.futures import ProcessPoolExecutor  # imported lazily
+
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=(settings,)
+        ) as executor:
+            for results in executor.map(_scan_batch, batches):
+                yield from results
+
+    def add_result(self, result):
+        """
+        Collects the findings of a file result and aggregates its counters.
+
+        Parameters
+        ----------
+        result : list
+            `[findings, counters]`, as yielded by `iter_file_results`. The
+            baseline applies to its findings.
+        """
+        findings, counters = result
+        for values in findings:
+            self.__report(Finding(*values))
+        self.files_scanned += counters[0]
+        self.binary_files_skipped += counters[1]
+        self.large_files_capped += counters[2]
+
+    def __scan_history(self, base_path, rev_range, settings, checkpoint=None):
+        """
+        Scans every blob introduced in the history of a revision range.
+
+        Each unique blob is scanned once, with the path and commit where it
+        first appears, no matter how many commits keep it unchanged; the
+        filename check runs once per path. The blobs are read through one
+        long-lived `git cat-file --batch` process.
+
+        Parameters
+        ----------
+        base_path : str
+            The path to the root of the repository.
+        rev_range : str
+            The revision arguments of `git log`, e.g. "HEAD" or "v1.0..main".
+        settings : ScanConfig
+            The configuration of the scan.
+        checkpoint : HistoryCheckpoint, optional
+            The commits already scanned by previous runs, which are skipped.
+            It is updated every HISTORY_CHECKPOINT_INTERVAL commits, so an
+            interrupted scan resumes where it stopped, and at the end.
+        """
+        revisions = rev_range.split()
+        exclude = checkpoint.commits if checkpoint is not None else ()
+        tips = resolve_revisions(base_path, revisions)
+        seen_blobs, seen_paths = set(), set()
+        with GitCatFile(base_path) as cat_file:
+            self.__timed("git-read", cat_file, "read")
+            for commit, changes in self.__iterate(
+                "git-log", iter_history_changes(base_path, revisions, exclude)
+            ):
+                self.__commit = commit
+                for rel_path, sha in changes:
+                    filename = os.path.basename(rel_path)
+                    if sha in seen_blobs:
+                        if rel_path not in seen_paths:
+                            seen_paths.add(rel_path)
+                            self.check_sensitive_filenames(
+                                filename,
+                                rel_path,
+                                settings.sensitive_patterns,
+                                settings.internal_file_ignore,
+                            )
+                        continue
+                    seen_blobs.add(sha)
+                    seen_paths.add(rel_path)
+                    sample_size = large_file_sample_size(
+                        rel_path, settings.large_file_content_scan
+                    )
+                    content = cat_file.read(
+                        sha, max_read_size(filename, settings), sample_size or 0
+                    )
+                    if content is None:
+                        continue
+                    if isinstance(content, ContentSample):
+                        size = content.size
+                    else:
+                        size = len(content)
+                    self.__scan_file(
+                        os.path.join(base_path, rel_path),
+                        rel_path,
+                        filename,
+                        size,
+                        settings,
+                        content,
+                    )
+                self.commits_scanned += 1
+                if (
+                    checkpoint is not None
+                    and self.commits_scanned % HISTORY_CHECKPOINT_INTERVAL == 0
+                ):
+                    checkpoint.save(
+                        independent_commits(base_path, checkpoint.commits + [commit])
+                    )
+        self.__commit = None
+        if checkpoint is not None:
+            checkpoint.save(independent_commits(base_path, checkpoint.commits + tips))
+
+    def __scan_diff(self, base_path, rev_range, settings):
+        """
+        Scans the changed files, checking only the content of added lines.
+
+        The filename and size checks run on every changed file, while the
+        content checks only run on the lines added by the diff, so lines
+        that were already committed are not reported again.
+
+        Parameters
+        ----------
+        base_path : str
+            The path to the root of the repository.
+        rev_range : str
+            The revision arguments of `git diff`, e.g. "main..HEAD", or an
+            empty string for the staged changes.
+        settings : ScanConfig
+            The configuration of the scan.
+        """
+        revisions = rev_range.split()
+        added = self.__iterate("git-diff", iter_added_lines(base_path, revisions))
+        pending = next(added, None)
+        with GitCatFile(base_path) as cat_file:
+            self.__timed("git-read", cat_file, "size")
+            for rel_path, sha in self.__iterate(
+                "git-diff", get_changed_files(base_path, revisions)
+            ):
+                # both diffs list the files in the same order
+                lines = []
+                if pending is not None and pending[0] == rel_path:
+                    lines = pending[1]
+                    pending = next(added, None)
+                self.files_scanned += 1
                 self.check_sensitive_filenames(
-                    filename,
+                    os.path.basename(rel_path),
                     rel_path,
-                    sensitive_patterns,
-                    internal_file_ignore,
+                    settings.sensitive_patterns,
+                    settings.internal_file_ignore,
+                )
+                if self.check_large_file(
+                    os.path.join(base_path, rel_path),
+                    rel_path,
+                    settings.max_size_mb,
+                    settings.internal_file_ignore,
+                    cat_file.size(sha) or 0,
+                ):
+                    self.large_files_capped += 1
+                    if (
+                        large_file_sample_size(
+                            rel_path, settings.large_file_content_scan
+                        )
+                        is None
+                    ):
+                        continue
+                self.check_added_lines(
+                    rel_path,
+                    lines,
+                    settings.matcher_for(rel_path),
+                    settings.binary_extensions,
+                    settings.text_extensions,
+                )
+
+    def scan_repository(
+        self,
+        base_path,
+        staged=False,
+        jobs=1,
+        use_cache=False,
+        history=None,
+        resume=False,
+        diff=None,
+        baseline=None,
+        settings=None,
+    ):
+        """
+        Scans the given repository for sensitive content, large files, and best practices.
+
+        Parameters
+        ----------
+        base_path : str
+            The path to the root of the repository
+        staged : bool
+            When True only the files staged for commit are scanned, using
+            their content in the git index instead of the working tree.
+        jobs : int
+            The number of processes scanning the working tree. Staged scans
+            are proportional to the diff and always run serially.
+        use_cache : bool
+            When True the results of the working tree files are cached in
+            `.git/pygitguard/` and unchanged files are not scanned again.
+        history : str, optional
+            A revision range, e.g. "HEAD" or "v1.0..main", whose whole
+            history is scanned instead of the working tree.
+        resume : bool
+            When True the history scan skips the commits scanned by the
+            previous resumed scans of the range, recorded in a checkpoint in
+            `.git/pygitguard/`, and records the commits it scans. The
+            findings of the skipped commits are not reported.
+        diff : str, optional
+            When given, only the lines added by a diff are content-scanned:
+            the staged changes for an empty string, or the changes of a
+            range such as "main..HEAD".
+        baseline : Baseline, optional
+            The known findings, suppressed from the returned findings.
+        settings : ScanConfig, optional
+            The configuration of the scan, e.g. kept by a long-running
+            process. `.pygitguard.yaml` is loaded when not given.
+
+        When the scan is profiled 'jobs' is ignored: the files are scanned
+        serially, in this process, so that their checks can be timed.
+
+        Returns
+        -------
+        FindingCollector
+            The findings, in path order after the best practice
+            recommendations. It is truthy if the commit must be blocked.
+        """
+        if settings is None:
+            settings = self.load_pygitguard_config(base_path, use_cache)
+            for warning in settings.warnings:
+                self.logger.warning(warning)
+        self.baseline = baseline
+        self.check_best_practices(base_path, settings.best_practices_files)
+
+        if diff is not None:
+            self.__scan_diff(base_path, diff, settings)
+            return self.findings
+
+        if history is not None:
+            checkpoint = None
+            if resume:
+                from pygitguard.helpers.cache_helper import (
+                    HistoryCheckpoint,
+                    rules_fingerprint,
                 )
-                self.check_large_file(
-                    full_path, rel_path, max_size_mb, internal_file_ignore
+
+                checkpoint = HistoryCheckpoint(
+                    base_path, history, rules_fingerprint(*settings.as_tuple())
                 )
-                self.check_sensitive_content(full_path, rel_path, sensitive_content)
+            self.__scan_history(base_path, history, settings, checkpoint)
+            return self.findings
+
+        if staged:
+            staged_files = self.__iterate("git-index", get_staged_files(base_path))
+            with GitCatFile(base_path) as cat_file:
+                self.__timed("git-read", cat_file, "read")
+                for rel_path, sha in staged_files:
+                    sample_size = large_file_sample_size(
+                        rel_path, settings.large_file_content_scan
+                    )
+                    content = cat_file.read(
+                        sha,
+                        max_read_size(os.path.basename(rel_path), settings),
+                        sample_size or 0,
+                    )
+                    if content is None:
+                        continue
+                    if isinstance(content, ContentSample):
+                        size = content.size
+                    else:
+                        size = len(content)
+                    self.__scan_file(
+                        os.path.join(base_path, rel_path),
+                        rel_path,
+                        os.path.basename(rel_path),
+                        size,
+                        settings,
+                        content,
+                    )
+            return self.findings
+
+        ignore_matcher = self.__timed(
+            "walk.gitignore",
+            GitIgnoreMatcher(base_path),
+            "is_dir_ignored",
+            "is_rel_ignored",
+        )
+        files = sorted(
+            self.__iterate("walk", walk_repository(base_path, ignore_matcher)),
+            key=lambda file: file[1],
+        )
+        if self.profiler is not None:
+            jobs = 1
+        if not use_cache:
+            for result in self.iter_file_results(files, settings, jobs):
+                self.add_result(result)
+            return self.findings
+
+        # imported lazily, sqlite3 is only needed by cached scans
+        from pygitguard.helpers.cache_helper import ScanCache, rules_fingerprint
+
+        with ScanCache(base_path, rules_fingerprint(*settings.as_tuple())) as cache:
+            self.__timed("cache", cache, "get", "put")
+            cached = [cache.get(file[1], file[3]) for file in files]
+            results = self.iter_file_results(
+                [file for file, result in zip(files, cached) if result is None],
+                settings,
+                jobs,
+            )
+            for file, result in zip(files, cached):
+                if result is None:
+                    result = next(results)
+                    cache.put(file[1], file[3], result)
+                self.add_result(result)
+            self.cache_hits = cache.hits
+
+        return self.findings
+
+    def log_summary(self):
+        """Logs how many files were scanned and whose content was skipped."""
+        if self.cache_hits:
+            self.logger.info(f"Scan cache: {self.cache_hits} unchanged files skipped")
+        if self.commits_scanned:
+            self.logger.info(f"History: {self.commits_scanned} commits scanned")
+        if self.findings_suppressed:
+            self.logger.info(
+                f"Baseline: {self.findings_suppressed} known findings suppressed"
+            )
+        self.logger.info(
+            f"Scanned {self.files_scanned} files, content of"
+            f" {self.binary_files_skipped} binary files skipped,"
+            f" content of {self.large_files_capped} large files skipped or sampled"
+        )
+
+
+def _scan_isolated(scanner, files, settings):
+    """
+    Scans 'files' one by one, isolating the result of each file.
+
+    Yields
+    ------
+    list
+        `[findings, counters]` for every file, where 'findings' are the
+        `Finding.as_tuple()` values of the file and 'counters' its
+        `(files_scanned, binary_files_skipped, large_files_capped)`. The
+        result is JSON-serializable so it can be cached.
+    """
+    for file in files:
+        scanner.findings = FindingCollector()
+        scanner.files_scanned = scanner.binary_files_skipped = 0
+        scanner.large_files_capped = 0
+        scanner.scan_files((file,), settings)
+        yield [
+            [finding.as_tuple() for finding in scanner.findings],
+            [
+                scanner.files_scanned,
+                scanner.binary_files_skipped,
+                scanner.large_files_capped,
+            ],
+        ]
+
+
+# (scanner, settings) of the current worker process
+_worker = None
+
+
+def _init_worker(settings=None):
+    """
+    Prepares a worker process of the parallel scan.
+
+    The settings, with their compiled patterns, are received once per
+    worker instead of once per file. Workers of a shared pool receive them
+    with each batch instead.
+    """
+    global _worker
+    _worker = (PyGitGuardScan(logging.getLogger("PYGITGUARD")), settings)
+
+
+def _scan_batch(files, settings=None):
+    """Scans a batch of files in a worker process, returning their results."""
+    scanner, worker_settings = _worker
+    if settings is None:
+        settings = worker_settings
+    return list(_scan_isolated(scanner, files, settings))
+
+
+def create_shared_executor(jobs):
+    """
+    Creates a process pool shared by the scans of several repositories.
+
+    The settings travel with every batch, so repositories with different
+    configurations share the pool, and the patterns of each rule set are
+    compiled once per worker. Assign it to `PyGitGuardScan.executor` and
+    shut it down when every scan is done.
+
+    Parameters
+    ----------
+    jobs : int
+        The number of worker processes.
+
+    Returns
+    -------
+    concurrent.futures.ProcessPoolExecutor
+        The pool.
+    """
+    from concurrent.futures import ProcessPoolExecutor  # imported lazily
 
-        return self.block_commit
+    return ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker)
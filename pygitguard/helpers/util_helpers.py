@@ -7,12 +7,19 @@ import yaml
 from pygitguard.__version__ import get_version
 from pygitguard.config.logger import logger
 from pygitguard.config.pygitguard_constants import (
+    ARCHIVE_SCAN,
     BEST_PRACTICES_FILES,
+    BINARY_EXTENSIONS,
+    ENTROPY_DETECTION,
     INTERNAL_FILE_IGNORE,
+    LARGE_FILE_CONTENT_SCAN,
     MAX_FILE_SIZE_MB,
+    PRE_COMMIT_CONFIG_FILENAME,
     PYGITGUARD_FILENAME,
+    RULES,
     SENSITIVE_CONTENT,
     SENSITIVE_PATTERNS,
+    TEXT_EXTENSIONS,
 )
 
 
@@ -27,7 +34,13 @@ def export_config_to_yaml(filepath=PYGITGUARD_FILENAME):
             "SENSITIVE_CONTENT": SENSITIVE_CONTENT,
             "BEST_PRACTICES_FILES": BEST_PRACTICES_FILES,
             "MAX_FILE_SIZE_MB": MAX_FILE_SIZE_MB,
+            "LARGE_FILE_CONTENT_SCAN": LARGE_FILE_CONTENT_SCAN,
             "INTERNAL_FILE_IGNORE": INTERNAL_FILE_IGNORE,
+            "BINARY_EXTENSIONS": BINARY_EXTENSIONS,
+            "TEXT_EXTENSIONS": TEXT_EXTENSIONS,
+            "ENTROPY_DETECTION": ENTROPY_DETECTION,
+            "ARCHIVE_SCAN": ARCHIVE_SCAN,
+            "RULES": RULES,
         }
         comment = (
             "# .gitguard.yaml: Configuration file for GitGuard.\n"
@@ -40,11 +53,12 @@ def export_config_to_yaml(filepath=PYGITGUARD_FILENAME):
             f.write(comment)
             yaml.dump(config, f, allow_unicode=True, sort_keys=False)
             logger.info(
-                "The file gitguard.yaml has been created, you can configure your settings there."
+                f"The file {filepath} has been created, you can configure your"
+                " settings there."
             )
 
 
-def create_pre_commit_config(path=".pre-commit-config.yaml"):
+def create_pre_commit_config(path=PRE_COMMIT_CONFIG_FILENAME):
     """
     Creates a pre-commit configuration file for PyGitGuard.
 
@@ -64,7 +78,7 @@ def create_pre_commit_config(path=".pre-commit-config.yaml"):
         content = f"""
     repos:
   - repo: https://github.com/digo5ds/pygitguard
-    rev:{get_version}
+    rev: {get_version()}
     hooks:
       - id: pygitguard-scan
         name: PyGitGuard Scan
@@ -76,6 +90,4 @@ def create_pre_commit_config(path=".pre-commit-config.yaml"):
     """
         with open(path, "w", encoding="utf-8") as f:
             f.write(content.strip() + "\n")
-            logger.info(
-                "created .pre-commit-config.yaml you can configure your hooks there."
-            )
+            logger.info(f"created {path} you can configure your hooks there.")
@@ -0,0 +1,482 @@
+"""A resident scan daemon, answering the scans of the pre-commit hook from memory."""
+
+import json
+import os
+import selectors
+import socket
+import stat as stat_module
+import struct
+
+from pygitguard.config.pygitguard_constants import (
+    PYGITGUARD_FILENAME,
+    WATCH_SOCKET_FILENAME,
+)
+from pygitguard.helpers.config_helper import ConfigError, ScanConfig
+from pygitguard.helpers.git_helper import (
+    GitIgnoreMatcher,
+    cache_location,
+    walk_repository,
+)
+from pygitguard.helpers.scan_helper import PyGitGuardScan
+
+# Seconds between two walks of the repository when inotify is not available
+WATCH_POLL_INTERVAL = 2.0
+
+# Seconds without file events before the changed files are rescanned
+WATCH_DEBOUNCE = 0.2
+
+# Seconds a client waits for the answer of the daemon before scanning itself
+WATCH_QUERY_TIMEOUT = 30.0
+
+# inotify events, see inotify(7)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+INOTIFY_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_ONLYDIR
+)
+INOTIFY_EVENT = struct.Struct("iIII")
+
+# Files whose change affects every file of the repository
+RESCAN_ALL_FILENAMES = (".gitignore", PYGITGUARD_FILENAME)
+
+
+def socket_path(base_path):
+    """Returns the path of the socket of the daemon watching 'base_path'."""
+    return os.path.join(cache_location(base_path), WATCH_SOCKET_FILENAME)
+
+
+def file_signature(stat):
+    """Returns what tells that a file changed, as for the scan cache."""
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+class InotifyWatcher:
+    """
+    Watches directories through the Linux inotify API, called with ctypes.
+
+    Attributes
+    ----------
+    fd : int
+        The non-blocking inotify file descriptor, to wait on with select.
+    """
+
+    def __init__(self, base_path):
+        """
+        Parameters
+        ----------
+        base_path : str
+            The path to the repository root.
+
+        Raises
+        ------
+        OSError
+            If inotify is not available, e.g. on macOS or Windows.
+        """
+        import ctypes  # imported lazily, only the daemon uses it
+        import ctypes.util
+
+        try:
+            libc = ctypes.CDLL(
+                ctypes.util.find_library("c") or "libc.so.6", use_errno=True
+            )
+            self._add_watch = libc.inotify_add_watch
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except AttributeError as error:
+            raise OSError(f"inotify is not available: {error}") from error
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._get_errno = ctypes.get_errno
+        self.fd = fd
+        self.base_path = base_path
+        self._directories = {}  # watch descriptor -> rel_dir
+
+    def watch(self, rel_dir):
+        """
+        Watches the files of a directory, if not already watched.
+
+        Raises
+        ------
+        OSError
+            If the watch can not be added, e.g. when `max_user_watches` is
+            reached.
+        """
+        path = os.path.join(self.base_path, rel_dir) if rel_dir else self.base_path
+        wd = self._add_watch(self.fd, os.fsencode(path), INOTIFY_MASK)
+        if wd < 0:
+            errno = self._get_errno()
+            raise OSError(errno, f"inotify_add_watch failed on {path}")
+        self._directories[wd] = rel_dir
+
+    def read(self):
+        """
+        Reads the pending events.
+
+        Returns
+        -------
+        tuple
+            `(paths, rescan_all)` with the relative paths of the changed
+            files, and True when the whole repository must be walked again:
+            on a queue overflow, or when a directory, a `.gitignore` or the
+            configuration changed.
+        """
+        paths = set()
+        rescan_all = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                start = offset + INOTIFY_EVENT.size
+                name = os.fsdecode(data[start : start + length].rstrip(b"\0"))
+                offset = start + length
+                if mask & IN_Q_OVERFLOW:
+                    rescan_all = True
+                    continue
+                if mask & IN_IGNORED:
+                    # the directory was removed
+                    self._directories.pop(wd, None)
+                    continue
+                rel_dir = self._directories.get(wd)
+                if rel_dir is None or not name:
+                    continue
+                if mask & IN_ISDIR or name in RESCAN_ALL_FILENAMES:
+                    rescan_all = True
+                    continue
+                paths.add(f"{rel_dir}/{name}" if rel_dir else name)
+        return paths, rescan_all
+
+    def close(self):
+        """Closes the inotify file descriptor."""
+        os.close(self.fd)
+
+
+class ScanDaemon:
+    """
+    Keeps the scan results of a working tree in memory, up to date.
+
+    The configuration is compiled and the repository scanned once, then
+    only the files that changed are scanned again: the files reported by
+    inotify, or the files whose size, mtime or inode changed on the
+    periodic walks where inotify is not available. Adding or removing a
+    directory, or editing a `.gitignore` or `.pygitguard.yaml`, walks the
+    whole repository again; when the configuration changed, every file is
+    scanned again.
+
+    The daemon answers scans over a Unix socket, with one JSON request per
+    connection:
+
+    - `{"command": "scan", "staged": false}` returns the findings of the
+      working tree from memory;
+    - `{"command": "scan", "staged": true}` scans the files staged for
+      commit, in the daemon, with its compiled configuration.
+
+    The answer is `{"result": [findings, counters]}`, the result of a file
+    as yielded by `PyGitGuardScan.iter_file_results` but for the whole
+    scan, or `{"error": message}`.
+
+    Attributes
+    ----------
+    base_path : str
+        The absolute path to the repository root.
+    settings : ScanConfig or None
+        The configuration, None while `.pygitguard.yaml` is not valid.
+    index : dict
+        `(signature, result)` per relative path of the scanned files.
+    """
+
+    def __init__(self, base_path, logger, jobs=1, poll=False):
+        """
+        Parameters
+        ----------
+        base_path : str
+            The path to the repository root.
+        logger : logging.Logger
+            The logger of the daemon.
+        jobs : int
+            The number of processes of the first scan and of the walks
+            rescanning many files.
+        poll : bool
+            When True the repository is walked every WATCH_POLL_INTERVAL
+            seconds, even when inotify is available.
+        """
+        self.base_path = os.path.abspath(base_path)
+        self.logger = logger
+        self.jobs = jobs
+        self.settings = None
+        self.config_error = None
+        self.index = {}
+        self._ignore_matcher = None
+        self._changed = set()
+        self._rescan_all = True
+        self._watcher = None
+        if not poll:
+            try:
+                self._watcher = InotifyWatcher(self.base_path)
+            except OSError as error:
+                logger.info(f"Watch: {error}, polling the repository instead")
+
+    def __load_config(self):
+        """Loads `.pygitguard.yaml`, clearing the index when the rules changed."""
+        try:
+            settings = ScanConfig.load(self.base_path, use_cache=True)
+        except ConfigError as error:
+            self.settings = None
+            self.config_error = f"Invalid configuration: {error}"
+            self.logger.error(self.config_error)
+            return
+        for warning in settings.warnings:
+            self.logger.warning(warning)
+        if self.settings is None or settings.as_tuple() != self.settings.as_tuple():
+            self.index.clear()
+        self.settings = settings
+        self.config_error = None
+
+    def __rescan(self, files):
+        """Scans 'files', `(full_path, rel_path, filename, stat)` tuples, into the index."""
+        if not files:
+            return
+        scanner = PyGitGuardScan(self.logger)
+        results = scanner.iter_file_results(files, self.settings, self.jobs)
+        for file, result in zip(files, results):
+            self.index[file[1]] = (file_signature(file[3]), result)
+        self.logger.info(f"Watch: {len(files)} changed files scanned")
+
+    def __sync_all(self):
+        """Walks the whole repository, scanning the new and changed files."""
+        self.__load_config()
+        if self.settings is None:
+            # the configuration is at the root, watch it to see it fixed
+            self.__watch([""])
+            return
+        self._ignore_matcher = GitIgnoreMatcher(self.base_path)
+        directories = []
+        changed = []
+        seen = set()
+        for file in walk_repository(self.base_path, self._ignore_matcher, directories):
+            rel_path = file[1]
+            seen.add(rel_path)
+            entry = self.index.get(rel_path)
+            if entry is None or entry[0] != file_signature(file[3]):
+                changed.append(file)
+        for rel_path in self.index.keys() - seen:
+            del self.index[rel_path]
+        self.__rescan(changed)
+        self.__watch(directories)
+
+    def __watch(self, directories):
+        """Watches 'directories' with inotify, falling back to polling on errors."""
+        if self._watcher is None:
+            return
+        try:
+            for rel_dir in directories:
+                self._watcher.watch(rel_dir)
+        except OSError as error:
+            self.logger.info(f"Watch: {error}, polling the repository instead")
+            self._watcher.close()
+            self._watcher = None
+
+    def __sync_paths(self, paths):
+        """Scans the changed files among 'paths', forgetting the removed ones."""
+        changed = []
+        for rel_path in sorted(paths):
+            full_path = os.path.join(self.base_path, rel_path)
+            try:
+                stat = os.stat(full_path)
+            except OSError:
+                self.index.pop(rel_path, None)
+                continue
+            if not stat_module.S_ISREG(stat.st_mode):
+                # directories, sockets and FIFOs, as `walk_repository`
+                self.index.pop(rel_path, None)
+                continue
+            if self._ignore_matcher.is_rel_ignored(rel_path):
+                self.index.pop(rel_path, None)
+                continue
+            entry = self.index.get(rel_path)
+            if entry is None or entry[0] != file_signature(stat):
+                changed.append((full_path, rel_path, os.path.basename(rel_path), stat))
+        self.__rescan(changed)
+
+    def sync(self):
+        """Brings the index up to date with the working tree."""
+        if self._watcher is None or self._rescan_all:
+            self._rescan_all = False
+            self._changed.clear()
+            self.__sync_all()
+            return
+        if self._changed and self.settings is not None:
+            paths, self._changed = self._changed, set()
+            self.__sync_paths(paths)
+
+    def __read_events(self):
+        """Records the changes reported by inotify."""
+        paths, rescan_all = self._watcher.read()
+        self._changed |= paths
+        self._rescan_all = self._rescan_all or rescan_all
+
+    def scan(self, staged=False):
+        """
+        Returns the answer to a scan request, see the class documentation.
+
+        Parameters
+        ----------
+        staged : bool
+            When True the files staged for commit are scanned, otherwise the
+            findings of the working tree come from the index.
+        """
+        if self._watcher is not None:
+            self.__read_events()
+        self.sync()
+        if self.settings is None:
+            return {"error": self.config_error}
+
+        scanner = PyGitGuardScan(self.logger)
+        if staged:
+            scanner.scan_repository(self.base_path, staged=True, settings=self.settings)
+            findings = [finding.as_tuple() for finding in scanner.findings]
+            counters = [
+                scanner.files_scanned,
+                scanner.binary_files_skipped,
+                scanner.large_files_capped,
+            ]
+            return {"result": [findings, counters]}
+
+        scanner.check_best_practices(self.base_path, self.settings.best_practices_files)
+        findings = [finding.as_tuple() for finding in scanner.findings]
+        counters = [0, 0, 0]
+        for rel_path in sorted(self.index):
+            file_findings, file_counters = self.index[rel_path][1]
+            findings.extend(file_findings)
+            for i, value in enumerate(file_counters):
+                counters[i] += value
+        return {"result": [findings, counters]}
+
+    def __answer(self, connection):
+        """Reads a request from a client connection and answers it."""
+        with connection:
+            connection.settimeout(WATCH_QUERY_TIMEOUT)
+            try:
+                request = json.loads(connection.makefile("rb").readline())
+                if request.get("command") != "scan":
+                    response = {"error": f"Unknown command: {request.get('command')}"}
+                else:
+                    response = self.scan(bool(request.get("staged")))
+                connection.sendall(json.dumps(response).encode("utf-8") + b"\n")
+            except (OSError, ValueError, AttributeError) as error:
+                self.logger.error(f"Watch: invalid request: {error}")
+
+    def serve(self):
+        """
+        Scans the repository, then answers requests until interrupted.
+
+        Raises
+        ------
+        RuntimeError
+            If another daemon already watches the repository.
+        """
+        from pygitguard.helpers.cache_helper import cache_directory
+
+        path = socket_path(self.base_path)
+        cache_directory(self.base_path)
+        if os.path.exists(path):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                try:
+                    probe.connect(path)
+                except OSError:
+                    os.unlink(path)  # left by a daemon that did not stop cleanly
+                else:
+                    raise RuntimeError(f"A daemon already watches {self.base_path}")
+
+        self.sync()
+        self.logger.info(
+            f"Watch: {len(self.index)} files indexed, watching"
+            f" {self.base_path} with {'inotify' if self._watcher else 'polling'}"
+        )
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        selector = selectors.DefaultSelector()
+        try:
+            server.bind(path)
+            server.listen()
+            selector.register(server, selectors.EVENT_READ)
+            watched_fd = None
+            while True:
+                if self._watcher is not None and watched_fd != self._watcher.fd:
+                    selector.register(self._watcher.fd, selectors.EVENT_READ)
+                    watched_fd = self._watcher.fd
+                if self._watcher is None:
+                    if watched_fd is not None:
+                        # inotify was given up for polling
+                        selector.unregister(watched_fd)
+                        watched_fd = None
+                    timeout = WATCH_POLL_INTERVAL
+                elif self._changed or self._rescan_all:
+                    timeout = WATCH_DEBOUNCE
+                else:
+                    timeout = None
+                events = selector.select(timeout)
+                if not events:
+                    self.sync()
+                for key, _ in events:
+                    if key.fileobj is server:
+                        self.__answer(server.accept()[0])
+                    else:
+                        self.__read_events()
+        finally:
+            selector.close()
+            server.close()
+            if os.path.exists(path):
+                os.unlink(path)
+            if self._watcher is not None:
+                self._watcher.close()
+
+
+def query_daemon(base_path, staged, timeout=WATCH_QUERY_TIMEOUT):
+    """
+    Asks the daemon watching a repository for the result of a scan.
+
+    Parameters
+    ----------
+    base_path : str
+        The path to the repository root.
+    staged : bool
+        When True the files staged for commit are scanned, otherwise the
+        whole working tree.
+    timeout : float
+        The seconds to wait for the answer.
+
+    Returns
+    -------
+    list or None
+        The `[findings, counters]` result of the scan, see ScanDaemon, or
+        None when no daemon answered, in which case the caller scans itself.
+    """
+    request = json.dumps({"command": "scan", "staged": bool(staged)})
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(socket_path(base_path))
+            client.sendall(request.encode("utf-8") + b"\n")
+            response = json.loads(client.makefile("rb").readline())
+    except (OSError, ValueError, AttributeError):
+        # AttributeError: no AF_UNIX on this platform
+        return None
+    return response.get("result")
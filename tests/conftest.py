@@ -0,0 +1,93 @@
+"""Fixtures shared by the pygitguard tests."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A line matching SENSITIVE_CONTENT, built so that the tests do not match it
+SECRET = "password = %r\n" % "hunter2"
+
+
+def git(repo, *args):
+    """Runs a git command in 'repo' and returns its stdout."""
+    return subprocess.run(
+        ["git", *args], cwd=repo, check=True, capture_output=True, text=True
+    ).stdout
+
+
+def write(repo, rel_path, content):
+    """Writes a file of the repository, creating its directories."""
+    path = os.path.join(repo, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    mode = "wb" if isinstance(content, bytes) else "w"
+    with open(path, mode) as f:
+        f.write(content)
+    return path
+
+
+def commit(repo, message="commit"):
+    """Stages every change of the repository and commits it."""
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "--allow-empty", "-m", message)
+    return git(repo, "rev-parse", "HEAD").strip()
+
+
+def run_pygitguard(repo, *args):
+    """Runs the pygitguard command in 'repo', returns the completed process."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run(
+        [sys.executable, "-m", "pygitguard.cli", *args],
+        cwd=repo,
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    """An empty git repository, isolated from the user's git configuration."""
+    home = tmp_path / "home"
+    home.mkdir()
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(home / ".config"))
+    monkeypatch.setenv("GIT_CONFIG_NOSYSTEM", "1")
+    monkeypatch.setenv("GIT_AUTHOR_NAME", "test")
+    monkeypatch.setenv("GIT_AUTHOR_EMAIL", "test@example.com")
+    monkeypatch.setenv("GIT_COMMITTER_NAME", "test")
+    monkeypatch.setenv("GIT_COMMITTER_EMAIL", "test@example.com")
+    path = tmp_path / "repo"
+    path.mkdir()
+    git(str(path), "init", "-q")
+    return str(path)
+
+
+def scan(repo, *args, use_cache=False):
+    """
+    Scans 'repo' with `--format json`, without daemon nor, unless
+    'use_cache', cache.
+
+    Returns
+    -------
+    tuple
+        The exit code and the list of findings, as dicts.
+    """
+    if not use_cache:
+        args += ("--no-cache",)
+    result = run_pygitguard(repo, *args, "--no-daemon", "--format", "json")
+    assert "Traceback" not in result.stderr, result.stderr
+    return result.returncode, json.loads(result.stdout)["findings"]
+
+
+def content_lines(findings, path=None):
+    """Returns the `(path, line)` of the content findings, sorted."""
+    return sorted(
+        (finding["path"], finding["line"])
+        for finding in findings
+        if finding["kind"] == "content" and path in (None, finding["path"])
+    )
@@ -0,0 +1,212 @@
+"""Tests of the scan of archive members and notebook cells, and of their limits."""
+
+import io
+import json
+import os
+import tarfile
+import zipfile
+
+from tests.conftest import SECRET, commit, git, scan, write
+
+
+def zip_bytes(members):
+    """Returns a zip archive of 'members', a mapping of path to content."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for path, content in members.items():
+            archive.writestr(path, content)
+    return buffer.getvalue()
+
+
+def configure(repo, max_file_size_mb=None, **archive_scan):
+    """Writes a `.pygitguard.yaml` overriding some ARCHIVE_SCAN limits."""
+    config = {"ARCHIVE_SCAN": archive_scan}
+    if max_file_size_mb is not None:
+        config["MAX_FILE_SIZE_MB"] = max_file_size_mb
+    write(repo, ".pygitguard.yaml", json.dumps(config))
+
+
+def located(findings, kind="content"):
+    """Returns the sorted `(path, line)` of the findings of a kind."""
+    return sorted((f["path"], f["line"]) for f in findings if f["kind"] == kind)
+
+
+def limits(findings):
+    """Returns the `(path, rule_id)` of the archive findings."""
+    return sorted((f["path"], f["rule_id"]) for f in findings if f["kind"] == "archive")
+
+
+def test_zip_members_are_scanned_as_files(repo):
+    write(
+        repo,
+        "bundle.zip",
+        zip_bytes({"config/settings.py": "DEBUG = True\n" + SECRET, ".env": "A=1\n"}),
+    )
+    commit(repo)
+    code, findings = scan(repo, "--all")
+    assert code == 1
+    assert located(findings) == [("bundle.zip!config/settings.py", 2)]
+    # the names of the members are not checked
+    assert located(findings, "filename") == []
+    assert limits(findings) == []
+
+
+def test_ordinary_packages_do_not_block(repo):
+    class_file = b"\xca\xfe\xba\xbe\x00\x00\x00\x34" + bytes(range(256))
+    write(
+        repo,
+        "lib.jar",
+        zip_bytes(
+            {
+                "META-INF/MANIFEST.MF": "Manifest-Version: 1.0\n",
+                "com/acme/User.class": class_file,
+                "com/acme/Token.class": class_file,
+            }
+        ),
+    )
+    write(
+        repo,
+        "dist/acme-1.0-py3-none-any.whl",
+        zip_bytes({"acme/users.py": "def users():\n    return []\n"}),
+    )
+    commit(repo)
+    code, findings = scan(repo, "--all")
+    assert code == 0
+    assert [f for f in findings if f["path"].startswith(("lib.jar", "dist/"))] == []
+
+
+def test_tar_members_are_scanned_as_files(repo):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        data = ("x = 1\n" * 4 + SECRET).encode()
+        info = tarfile.TarInfo("src/app.py")
+        info.size = len(data)
+        archive.addfile(info, io.BytesIO(data))
+    write(repo, "bundle.tar.gz", buffer.getvalue())
+    commit(repo)
+    _, findings = scan(repo, "--all")
+    assert located(findings) == [("bundle.tar.gz!src/app.py", 5)]
+
+
+def test_nested_archives_are_scanned_up_to_max_depth(repo):
+    inner = zip_bytes({"app.py": SECRET})
+    write(repo, "outer.zip", zip_bytes({"lib/inner.zip": inner}))
+    commit(repo)
+    _, findings = scan(repo, "--all")
+    assert located(findings) == [("outer.zip!lib/inner.zip!app.py", 1)]
+
+    configure(repo, max_depth=1)
+    code, findings = scan(repo, "--all")
+    assert located(findings) == []
+    assert limits(findings) == [("outer.zip", "archive-max_depth")]
+    # reaching a limit is reported, but does not block the commit
+    assert code == 0
+
+
+def test_extraction_stops_after_max_members(repo):
+    members = {f"m{index}.py": "x = 1\n" for index in range(3)}
+    members["m3.py"] = SECRET
+    write(repo, "bundle.zip", zip_bytes(members))
+    commit(repo)
+    configure(repo, max_members=3)
+    _, findings = scan(repo, "--all")
+    assert located(findings) == []
+    assert limits(findings) == [("bundle.zip", "archive-max_members")]
+
+    configure(repo, max_members=4)
+    _, findings = scan(repo, "--all")
+    assert located(findings) == [("bundle.zip!m3.py", 1)]
+    assert limits(findings) == []
+
+
+def test_members_are_read_up_to_max_member_mb(repo):
+    padding = "x = 1\n" * 1000
+    write(repo, "bundle.zip", zip_bytes({"app.py": SECRET + padding + SECRET}))
+    commit(repo)
+    configure(repo, max_member_mb=0.001)
+    _, findings = scan(repo, "--all")
+    # the member is cut after its last complete line within the limit
+    assert located(findings) == [("bundle.zip!app.py", 1)]
+    assert limits(findings) == [("bundle.zip", "archive-max_member_mb")]
+
+
+def large_archive(repo):
+    """Writes a 64 KB archive, with a secret in a member."""
+    members = {"app.py": SECRET, "data.bin": os.urandom(64 * 1024)}
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for path, content in members.items():
+            archive.writestr(path, content)
+    write(repo, "bundle.zip", buffer.getvalue())
+
+
+def test_archives_larger_than_max_file_size_are_extracted(repo):
+    large_archive(repo)
+    configure(repo, max_file_size_mb=0.01)
+    git(repo, "add", "-A")
+    for scope in ("--staged", "--all"):
+        code, findings = scan(repo, scope)
+        assert code == 1
+        assert located(findings) == [("bundle.zip!app.py", 1)]
+        assert located(findings, "large-file") == [("bundle.zip", None)]
+
+    # the budget still bounds the extraction
+    configure(repo, max_file_size_mb=0.01, max_total_mb=0.01)
+    _, findings = scan(repo, "--all")
+    assert limits(findings) == [("bundle.zip", "archive-max_total_mb")]
+
+
+def test_git_objects_larger_than_max_total_mb_are_not_extracted(repo):
+    large_archive(repo)
+    configure(repo, max_file_size_mb=0.01, max_total_mb=0.02)
+    git(repo, "add", "-A")
+    _, findings = scan(repo, "--staged")
+    assert located(findings) == []
+    assert limits(findings) == [("bundle.zip", "archive-max_total_mb")]
+
+
+def test_notebooks_larger_than_max_file_size_are_not_extracted(repo):
+    cells = [{"cell_type": "code", "source": [SECRET], "outputs": []}]
+    cells += [{"cell_type": "code", "source": ["x = 1\n"] * 200, "outputs": []}]
+    write(repo, "big.ipynb", json.dumps({"nbformat": 4, "cells": cells}, indent=1))
+    configure(repo, max_file_size_mb=0.001)
+    _, findings = scan(repo, "--all")
+    assert located(findings, "large-file") == [("big.ipynb", None)]
+    # sampled as a large file, its lines are those of the JSON document
+    assert [path for path, _ in located(findings)] == ["big.ipynb"]
+
+
+def test_disabled_archive_scan_skips_archives(repo):
+    write(repo, "bundle.zip", zip_bytes({"app.py": SECRET}))
+    commit(repo)
+    configure(repo, enabled=False)
+    _, findings = scan(repo, "--all")
+    assert located(findings) == []
+
+
+def test_notebook_cells_are_scanned_with_cell_line_numbers(repo):
+    notebook = {
+        "nbformat": 4,
+        "nbformat_minor": 5,
+        "metadata": {},
+        "cells": [
+            {"cell_type": "markdown", "metadata": {}, "source": ["# Notes\n"]},
+            {
+                "cell_type": "code",
+                "metadata": {},
+                "execution_count": 1,
+                "source": ["import os\n", "\n", SECRET],
+                "outputs": [
+                    {"output_type": "stream", "name": "stdout", "text": [SECRET]}
+                ],
+            },
+        ],
+    }
+    write(repo, "analysis.ipynb", json.dumps(notebook, indent=1))
+    commit(repo)
+    code, findings = scan(repo, "--all")
+    assert code == 1
+    assert located(findings) == [
+        ("analysis.ipynb!cells/1/outputs/0", 1),
+        ("analysis.ipynb!cells/1/source", 3),
+    ]
@@ -0,0 +1,57 @@
+"""Tests of the baseline of known findings."""
+
+import json
+import os
+
+from pygitguard.config.pygitguard_constants import BASELINE_FILENAME
+from tests.conftest import SECRET, content_lines, run_pygitguard, scan, write
+
+OTHER_SECRET = SECRET.replace("hunter2", "swordfish")
+
+
+def baseline_entries(repo):
+    """Returns the entries of the content findings in the baseline of 'repo'."""
+    with open(os.path.join(repo, BASELINE_FILENAME), encoding="utf-8") as f:
+        entries = json.load(f)["findings"]
+    # the best practice entries have no line
+    return [entry for entry in entries if ":" in entry]
+
+
+def update_baseline(repo, *args):
+    result = run_pygitguard(repo, "baseline", "--all", "--no-daemon", *args)
+    assert result.returncode == 0, result.stderr
+
+
+def test_baseline_survives_moved_and_reindented_lines(repo):
+    write(repo, "app.py", "x = 1\n" + SECRET)
+    update_baseline(repo)
+    entries = baseline_entries(repo)
+    assert len(entries) == 1 and entries[0].endswith(" app.py:2")
+
+    write(repo, "app.py", "x = 1\n\n\nif x:\n    " + SECRET + OTHER_SECRET)
+    code, findings = scan(repo, "--all")
+    assert code == 1
+    assert content_lines(findings) == [("app.py", 6)]
+
+    # regenerating the baseline keeps the fingerprint of the known finding
+    update_baseline(repo)
+    fingerprints = {entry.split()[0] for entry in baseline_entries(repo)}
+    assert entries[0].split()[0] in fingerprints
+    assert scan(repo, "--all")[0] == 0
+
+
+def test_prune_only_removes_stale_entries(repo):
+    write(repo, "app.py", SECRET)
+    write(repo, "lib.py", OTHER_SECRET)
+    update_baseline(repo)
+    assert len(baseline_entries(repo)) == 2
+
+    write(repo, "lib.py", "x = 1\n")
+    write(repo, "new.py", SECRET.replace("hunter2", "letmein"))
+    update_baseline(repo, "--prune")
+    entries = baseline_entries(repo)
+    # the removed finding is dropped, the new one is not added
+    assert [entry.split()[1] for entry in entries] == ["app.py:1"]
+    code, findings = scan(repo, "--all")
+    assert code == 1
+    assert content_lines(findings) == [("new.py", 1)]
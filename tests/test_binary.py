@@ -0,0 +1,65 @@
+"""Tests of the detection of the binary files whose content is not scanned."""
+
+import pytest
+
+from pygitguard.config.pygitguard_constants import (
+    BINARY_EXTENSIONS,
+    BINARY_SNIFF_SIZE,
+    TEXT_EXTENSIONS,
+)
+from pygitguard.helpers.scan_helper import classify_extension, is_binary_content
+from tests.conftest import SECRET, content_lines, git, run_pygitguard, scan, write
+
+# Binary content: a NUL byte before the secret
+BINARY_SECRET = b"\x89\0\x01" + SECRET.encode()
+
+
+@pytest.mark.parametrize(
+    "filename, binary",
+    [
+        ("logo.png", True),
+        ("docs/LOGO.PNG", True),
+        ("app.py", False),
+        ("settings.Yaml", False),
+        ("blob.dat", None),
+        ("Makefile", None),
+        (".env", None),
+    ],
+)
+def test_classify_extension(filename, binary):
+    assert classify_extension(filename, BINARY_EXTENSIONS, TEXT_EXTENSIONS) is binary
+
+
+def test_only_a_nul_byte_in_the_first_bytes_makes_content_binary():
+    assert is_binary_content(b"abc\0def")
+    assert not is_binary_content("héllo wörld\n".encode("latin-1"))
+    assert not is_binary_content(b"")
+    assert not is_binary_content(b"x" * BINARY_SNIFF_SIZE + b"\0")
+    assert is_binary_content(b"x" * (BINARY_SNIFF_SIZE - 1) + b"\0")
+
+
+@pytest.mark.parametrize("mode", ["--all", "--staged"])
+def test_binary_files_are_not_content_scanned(repo, mode):
+    write(repo, "logo.png", SECRET)  # binary extension, not sniffed
+    write(repo, "blob.dat", BINARY_SECRET)  # unknown extension, sniffed
+    write(repo, "app.py", BINARY_SECRET)  # text extension, not sniffed
+    write(repo, "notes", SECRET)  # no extension, sniffed as text
+    # a NUL byte after the sniffed bytes does not make the file binary
+    write(repo, "late.dat", SECRET.encode() + b"x" * BINARY_SNIFF_SIZE + b"\0")
+    git(repo, "add", "-A")
+
+    code, findings = scan(repo, mode)
+    assert code == 1
+    assert content_lines(findings) == [("app.py", 1), ("late.dat", 1), ("notes", 1)]
+
+    result = run_pygitguard(repo, mode, "--no-cache", "--no-daemon")
+    assert "content of 2 binary files skipped" in result.stderr
+
+
+def test_diff_skips_the_binary_extensions(repo):
+    write(repo, "logo.png", SECRET)
+    write(repo, "app.py", SECRET)
+    git(repo, "add", "-A")
+    code, findings = scan(repo, "--diff")
+    assert code == 1
+    assert content_lines(findings) == [("app.py", 1)]
@@ -0,0 +1,106 @@
+"""Tests of the validation of `.pygitguard.yaml` and of its cache."""
+
+import json
+import marshal
+import os
+
+import pytest
+
+from pygitguard.helpers import config_helper
+from pygitguard.helpers.cache_helper import cache_directory
+from pygitguard.helpers.config_helper import (
+    CONFIG_CACHE_FILENAME,
+    ConfigError,
+    ScanConfig,
+    validate_config,
+)
+from pygitguard.helpers.pattern_helper import _compile_filename_patterns
+from tests.conftest import run_pygitguard, write
+
+
+@pytest.mark.parametrize(
+    "config, message",
+    [
+        ([], "expected a mapping of settings"),
+        ({"MAX_FILE_SIZE_MB": "big"}, "MAX_FILE_SIZE_MB must be a number"),
+        ({"MAX_FILE_SIZE_MB": 0}, "MAX_FILE_SIZE_MB must be positive"),
+        ({"SENSITIVE_CONTENT": ["ok", "("]}, r"SENSITIVE_CONTENT\[1\] is not a valid"),
+        ({"SENSITIVE_PATTERNS": "x"}, "SENSITIVE_PATTERNS must be a list"),
+        ({"LARGE_FILE_CONTENT_SCAN": [{"mode": "all"}]}, r"\[0\]\.mode must be"),
+        ({"ENTROPY_DETECTION": {"min_length": -1}}, "min_length must be a positive"),
+        ({"ARCHIVE_SCAN": {"max_depth": 0}}, "max_depth must be a positive"),
+        ({"RULES": [{"id": "a", "pattern": "x", "detector": "y"}]}, "either"),
+        ({"RULES": [{"id": "a", "pattern": "["}]}, r"RULES\[0\]\.pattern is not"),
+    ],
+)
+def test_invalid_settings_are_rejected(config, message):
+    with pytest.raises(ConfigError, match=message):
+        validate_config(config)
+
+
+def test_invalid_configuration_stops_the_scan(repo):
+    write(repo, ".pygitguard.yaml", json.dumps({"MAX_FILE_SIZE_MB": "big"}))
+    result = run_pygitguard(repo, "--all", "--no-daemon")
+    assert result.returncode == 2
+    assert "MAX_FILE_SIZE_MB must be a number" in result.stderr
+
+
+def test_unknown_keys_are_ignored_with_a_warning():
+    warnings = []
+    values = validate_config(
+        {
+            "FUTURE_SETTING": 1,
+            "ARCHIVE_SCAN": {"max_depth": 2, "follow_links": True},
+            "RULES": [{"id": "a", "pattern": "x", "confidence": "high"}],
+            "LARGE_FILE_CONTENT_SCAN": [{"path": "*", "mode": "skip", "lines": 3}],
+        },
+        warnings=warnings,
+    )
+    assert "FUTURE_SETTING" not in values
+    assert values["ARCHIVE_SCAN"]["max_depth"] == 2
+    assert "follow_links" not in values["ARCHIVE_SCAN"]
+    assert values["RULES"] == [{"id": "a", "pattern": "x"}]
+    assert values["LARGE_FILE_CONTENT_SCAN"] == [{"path": "*", "mode": "skip"}]
+    assert len(warnings) == 4
+    assert "unknown keys ignored: FUTURE_SETTING" in warnings[0]
+
+
+def test_unknown_settings_are_reported_on_every_scan(repo):
+    write(repo, ".pygitguard.yaml", json.dumps({"FUTURE_SETTING": 1}))
+    for _ in range(2):  # validated, then read from the cache
+        result = run_pygitguard(repo, "--all", "--no-daemon")
+        assert result.returncode == 0, result.stderr
+        assert "unknown keys ignored: FUTURE_SETTING" in result.stderr
+
+
+def test_validation_compiles_the_matchers_of_the_scan():
+    _compile_filename_patterns.cache_clear()
+    values = validate_config({"SENSITIVE_PATTERNS": [r".*\.vault$"]})
+    assert _compile_filename_patterns.cache_info().currsize == 1
+    ScanConfig(values).filename_matcher.match("prod.vault")
+    info = _compile_filename_patterns.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_config_cache_is_keyed_by_the_yaml_and_the_version(repo, monkeypatch):
+    source = json.dumps({"MAX_FILE_SIZE_MB": 3})
+    write(repo, ".pygitguard.yaml", source)
+    assert ScanConfig.load(repo).max_size_mb == 3
+    cache_path = os.path.join(cache_directory(repo), CONFIG_CACHE_FILENAME)
+    with open(cache_path, "rb") as f:
+        key, values, warnings = marshal.load(f)
+    # the cache keeps a digest of the YAML, not the YAML itself
+    assert source.encode() not in key
+
+    # a cache entry of the same YAML and version is used as is
+    values["MAX_FILE_SIZE_MB"] = 4
+    with open(cache_path, "wb") as f:
+        marshal.dump((key, values, warnings), f)
+    assert ScanConfig.load(repo).max_size_mb == 4
+
+    monkeypatch.setattr(config_helper, "get_version", lambda: "0.0.0-other")
+    assert ScanConfig.load(repo).max_size_mb == 3
+    monkeypatch.undo()
+
+    write(repo, ".pygitguard.yaml", json.dumps({"MAX_FILE_SIZE_MB": 5}))
+    assert ScanConfig.load(repo).max_size_mb == 5
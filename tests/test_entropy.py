@@ -0,0 +1,66 @@
+"""Tests of the detection of high-entropy strings."""
+
+import base64
+import hashlib
+import json
+
+import pytest
+
+from pygitguard.config.pygitguard_constants import BASELINE_FILENAME
+from pygitguard.helpers.entropy_helper import TOKEN_ALPHABET, EntropyDetector
+from tests.conftest import SECRET, run_pygitguard, scan, write
+
+KEY = base64.b64encode(hashlib.sha256(b"key").digest() * 2).decode()
+DIGEST = hashlib.sha256(b"digest").hexdigest()
+
+
+def matched_lines(content):
+    """Returns the lines of 'content' the detector reports."""
+    return [match[1] for match in EntropyDetector().iter_matches(content.encode())]
+
+
+def test_random_tokens_are_reported():
+    assert matched_lines(f'api = "{KEY}"\n') == [f'api = "{KEY}"']
+    assert matched_lines(f"x = '{DIGEST}'\n") == [f"x = '{DIGEST}'"]
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        f'"integrity": "sha512-{KEY}"',
+        f"--hash=sha256:{DIGEST}",
+        f"image@sha256:{DIGEST}",
+        f"golang.org/x/text v0.3.0 h1:{KEY}",
+        f"rev: {DIGEST[:40]}",
+        f'"checksum": "{DIGEST}"',
+        f'content_hash = "{KEY}"',
+        f"ALPHABET = {TOKEN_ALPHABET!r}",
+    ],
+)
+def test_digests_and_alphabets_are_not_reported(line):
+    assert matched_lines(line + "\n") == []
+
+
+def test_entropy_detection_is_opt_in(repo):
+    write(repo, "app.py", f'API = "{KEY}"\n')
+    _, findings = scan(repo, "--all")
+    assert [f for f in findings if f["kind"] == "entropy"] == []
+
+    write(
+        repo, ".pygitguard.yaml", json.dumps({"ENTROPY_DETECTION": {"enabled": True}})
+    )
+    code, findings = scan(repo, "--all")
+    # the findings are info, they do not block the commit
+    assert code == 0
+    assert [(f["kind"], f["severity"], f["line"]) for f in findings[-1:]] == [
+        ("entropy", "info", 1)
+    ]
+
+
+def test_baseline_file_is_not_scanned(repo):
+    write(repo, "app.py", SECRET)
+    write(repo, "lib.py", SECRET.replace("hunter2", "swordfish"))
+    assert run_pygitguard(repo, "baseline", "--all", "--no-daemon").returncode == 0
+    code, findings = scan(repo, "--all")
+    assert code == 0
+    assert [f for f in findings if f["path"] == BASELINE_FILENAME] == []
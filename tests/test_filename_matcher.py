@@ -0,0 +1,125 @@
+"""Tests of the FilenameMatcher, which must agree with searching the rules one by one."""
+
+import random
+import re
+
+import pytest
+
+from pygitguard.config.pygitguard_constants import SENSITIVE_PATTERNS
+from pygitguard.helpers.pattern_helper import FilenameMatcher
+from tests.conftest import scan, write
+
+CUSTOM_PATTERNS = [
+    r".*\.vault$",  # extension rule, without suffixes
+    r".*backup(\..*)?$",  # keyword rule
+    r"^deploy_.*\.ya?ml$",  # residual rule
+    r"(\w)\1{3}",  # residual rule with a backreference
+    r".*\.tar\.gz$",  # literal with several dots
+]
+
+WORDS = [
+    "secret",
+    "secrets",
+    "SECRET",
+    "id_rsa",
+    "ID_RSA",
+    "private",
+    "key",
+    "pem",
+    "env",
+    "user",
+    "users",
+    "token",
+    "credentials",
+    "access_key",
+    "ACCESS_KEYS",
+    "api",
+    "apikey",
+    "password",
+    "deploy_",
+    "backup",
+    "vault",
+    "yml",
+    "tar",
+    "gz",
+    "aaaa",
+    "app",
+    "main",
+    "_",
+    "-",
+    "é",
+    "ß",
+    "\n",
+]
+
+
+def expected(patterns, filename):
+    """The rules matching a name, searched one by one as before the matcher."""
+    return tuple(p for p in patterns if re.search(p, filename, re.IGNORECASE))
+
+
+def random_names(count, seed=16):
+    """Returns random names made of rule keywords, dots and other words."""
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        parts = [rng.choice(WORDS) for _ in range(rng.randint(1, 4))]
+        separators = [rng.choice(["", ".", ".", "_"]) for _ in parts]
+        names.append("".join(p + s for p, s in zip(parts, separators)))
+    return names
+
+
+NAMES = [
+    ".env",
+    ".env.local",
+    "my.env",
+    "environment",
+    "mykey.pem",
+    "server.key.bak",
+    "keys.txt",
+    "data.sqlite3",
+    "secrets.json",
+    "secretsanta.txt",
+    "id_rsa.pub",
+    "backup_id_rsa",
+    "myprivate.key",
+    "aws_credentials",
+    "my_ACCESS_KEYS.json",
+    "users.txt",
+    "superuser",
+    "README.md",
+    "app.py",
+    ".",
+    "..",
+    "secret.",
+    "Secret.TXT",
+    "token\n",
+    "tökens.txt",
+]
+
+
+@pytest.mark.parametrize(
+    "patterns",
+    [SENSITIVE_PATTERNS, CUSTOM_PATTERNS, SENSITIVE_PATTERNS + CUSTOM_PATTERNS],
+)
+def test_matcher_agrees_with_the_rules_searched_one_by_one(patterns):
+    matcher = FilenameMatcher(patterns)
+    for filename in NAMES + random_names(5000):
+        assert matcher.match(filename) == expected(patterns, filename), filename
+
+
+def test_matched_rules_are_in_configuration_order():
+    matcher = FilenameMatcher(SENSITIVE_PATTERNS)
+    rules = matcher.match("aws_credentials.pem")
+    assert len(rules) > 1
+    assert list(rules) == sorted(rules, key=SENSITIVE_PATTERNS.index)
+
+
+def test_a_file_matching_several_rules_is_reported_once(repo):
+    write(repo, "aws_credentials.pem", "")
+    code, findings = scan(repo, "--all")
+    assert code == 1
+    (finding,) = [f for f in findings if f["kind"] == "filename"]
+    assert finding["path"] == "aws_credentials.pem"
+    assert finding["rules"][0] == finding["rule_id"] == "pem-file"
+    assert set(finding["rules"]) >= {"pem-file", "credential-file", "credentials-file"}
@@ -0,0 +1,206 @@
+"""Tests of the findings model and of its JSON Lines and SARIF outputs."""
+
+import io
+import json
+import logging
+
+import pytest
+
+from pygitguard.helpers.findings_helper import (
+    KIND_CONTENT,
+    KIND_FILENAME,
+    SEVERITY_CRITICAL,
+    SEVERITY_INFO,
+    SEVERITY_WARNING,
+    Finding,
+    FindingCollector,
+    JsonLinesWriter,
+    SarifWriter,
+    pattern_rule_id,
+)
+from pygitguard.helpers.scan_helper import PyGitGuardScan
+from tests.conftest import SECRET, commit, run_pygitguard, scan, write
+
+FINDINGS = [
+    Finding(KIND_CONTENT, "rule-a", SEVERITY_CRITICAL, "a.py", 3, 5, (4, 20), "x"),
+    Finding(
+        KIND_FILENAME,
+        "rule-b",
+        SEVERITY_WARNING,
+        "b.env",
+        commit="0123456789abcdef",
+        rules=("rule-b", "rule-c"),
+    ),
+    Finding(KIND_CONTENT, "rule-a", SEVERITY_INFO, "c.py", 1, 1, (0, 2), "y"),
+]
+
+
+def write_all(writer, findings):
+    for finding in findings:
+        writer.write(finding)
+    writer.close()
+
+
+def test_jsonl_writes_one_finding_per_line():
+    stream = io.StringIO()
+    write_all(JsonLinesWriter(stream, {"repository": "repo"}), FINDINGS)
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == len(FINDINGS)
+    for line, finding in zip(lines, FINDINGS):
+        assert json.loads(line) == dict(finding.to_dict(), repository="repo")
+
+
+def test_sarif_log_lists_results_and_rules():
+    stream = io.StringIO()
+    write_all(SarifWriter(stream), FINDINGS)
+    log = json.loads(stream.getvalue())
+    assert log["version"] == "2.1.0"
+    (run,) = log["runs"]
+    driver = run["tool"]["driver"]
+    assert driver["name"] == "PyGitGuard"
+    assert [rule["id"] for rule in driver["rules"]] == ["rule-a", "rule-b"]
+
+    results = run["results"]
+    assert [result["level"] for result in results] == ["error", "warning", "note"]
+    location = results[0]["locations"][0]["physicalLocation"]
+    assert location == {
+        "artifactLocation": {"uri": "a.py"},
+        "region": {"startLine": 3, "startColumn": 5, "endColumn": 21},
+    }
+    assert "region" not in results[1]["locations"][0]["physicalLocation"]
+    assert results[1]["properties"] == {
+        "commit": "0123456789abcdef",
+        "rules": ["rule-b", "rule-c"],
+    }
+    assert "properties" not in results[0]
+
+
+def test_sarif_log_without_findings_is_valid():
+    stream = io.StringIO()
+    SarifWriter(stream).close()
+    (run,) = json.loads(stream.getvalue())["runs"]
+    assert run["results"] == []
+    assert run["tool"]["driver"]["rules"] == []
+
+
+def test_cli_outputs_agree(repo):
+    write(repo, "app/settings.py", "DEBUG = True\n" + SECRET)
+    commit(repo)
+    _, findings = scan(repo, "--all")
+    assert findings
+
+    result = run_pygitguard(repo, "--all", "--no-daemon", "--format", "jsonl")
+    assert result.returncode == 1
+    lines = [json.loads(line) for line in result.stdout.splitlines()]
+    assert lines == findings
+
+    result = run_pygitguard(repo, "--all", "--no-daemon", "--format", "sarif")
+    assert result.returncode == 1
+    (run,) = json.loads(result.stdout)["runs"]
+    assert len(run["results"]) == len(findings)
+    regions = {}
+    for result in run["results"]:
+        location = result["locations"][0]["physicalLocation"]
+        regions[location["artifactLocation"]["uri"]] = location.get("region")
+    assert regions["app/settings.py"]["startLine"] == 2
+    rule_ids = {rule["id"] for rule in run["tool"]["driver"]["rules"]}
+    assert rule_ids == {finding["rule_id"] for finding in findings}
+
+
+def test_scan_many_jsonl_tags_the_repository(repo):
+    write(repo, "settings.py", SECRET)
+    commit(repo)
+    result = run_pygitguard(repo, "scan-many", "--format", "jsonl", repo)
+    assert result.returncode == 1
+    lines = [json.loads(line) for line in result.stdout.splitlines()]
+    content = [line for line in lines if line["kind"] == "content"]
+    assert [(line["path"], line["line"]) for line in content] == [("settings.py", 1)]
+    assert {line["repository"] for line in lines} == {repo}
+
+    result = run_pygitguard(repo, "scan-many", "--format", "sarif", repo)
+    assert result.returncode == 2
+
+
+def test_built_in_patterns_have_stable_short_rule_ids(repo):
+    write(repo, "settings.py", SECRET)
+    write(repo, "prod.env", "")
+    commit(repo)
+    _, findings = scan(repo, "--all")
+    ids = {(f["path"], f["rule_id"]) for f in findings}
+    assert ("settings.py", "password-assignment") in ids
+    assert ("prod.env", "env-file") in ids
+
+    result = run_pygitguard(repo, "--all", "--no-daemon", "--format", "sarif")
+    (run,) = json.loads(result.stdout)["runs"]
+    assert {"password-assignment", "env-file"} <= {
+        rule["id"] for rule in run["tool"]["driver"]["rules"]
+    }
+
+
+def test_configured_patterns_get_a_digest_rule_id():
+    rule_id = pattern_rule_id(r"corp\.internal")
+    assert rule_id.startswith("content-")
+    assert len(rule_id) == len("content-") + 8
+    assert pattern_rule_id(r"corp\.internal") == rule_id
+    assert pattern_rule_id(r"corp\.internal", KIND_FILENAME).startswith("filename-")
+    assert pattern_rule_id(r"corp\.external") != rule_id
+
+
+def test_findings_are_slotted_records():
+    finding = FINDINGS[1]
+    assert not hasattr(finding, "__dict__")
+    with pytest.raises(AttributeError):
+        finding.extra = 1
+    assert Finding(*finding.as_tuple()) == finding
+    assert len({Finding(*f.as_tuple()) for f in FINDINGS + FINDINGS}) == 3
+    data = finding.to_dict()
+    assert data["rules"] == ["rule-b", "rule-c"]
+    assert json.loads(json.dumps(FINDINGS[0].to_dict()))["span"] == [4, 20]
+
+
+def test_findings_block_from_their_severity_unless_overridden():
+    assert [finding.blocking for finding in FINDINGS] == [True, True, False]
+    values = FINDINGS[0].as_tuple()[:-1]
+    assert not Finding(*values, blocks=False).blocking
+    assert Finding(*FINDINGS[2].as_tuple()[:-1], blocks=True).blocking
+
+
+def test_finding_messages():
+    assert (
+        FINDINGS[0].message() == "SENSITIVE content in: a.py line:3: x (rule: rule-a)"
+    )
+    assert FINDINGS[1].message() == (
+        "WARNING: sensitive file name: '0123456789ab:b.env' (rules: rule-b, rule-c)"
+    )
+
+
+def test_collector_keeps_the_findings_in_order():
+    collector = FindingCollector()
+    assert (len(collector), bool(collector)) == (0, False)
+    collector.add(FINDINGS[2])
+    assert (len(collector), bool(collector)) == (1, False)
+    collector.extend(FINDINGS[:2])
+    assert (len(collector), bool(collector)) == (3, True)
+    assert list(collector) == [FINDINGS[2], FINDINGS[0], FINDINGS[1]]
+
+
+def test_collector_with_a_writer_does_not_keep_the_findings():
+    stream = io.StringIO()
+    collector = FindingCollector(JsonLinesWriter(stream))
+    collector.extend(FINDINGS)
+    assert (len(collector), bool(collector), list(collector)) == (3, True, [])
+    assert len(stream.getvalue().splitlines()) == 3
+
+
+def test_scans_collect_findings_without_logging_them(repo, caplog):
+    write(repo, "app.py", SECRET)
+    write(repo, "prod.env", "KEY=1\n")
+    scanner = PyGitGuardScan(logging.getLogger("pygitguard.tests"))
+    with caplog.at_level(logging.DEBUG):
+        findings = scanner.scan_repository(repo)
+    assert caplog.records == []
+    assert isinstance(findings, FindingCollector) and findings
+    assert {(finding.kind, finding.path) for finding in findings} >= {
+        (KIND_CONTENT, "app.py"),
+        (KIND_FILENAME, "prod.env"),
+    }
@@ -0,0 +1,130 @@
+"""Tests of the repository walk, of the gitignore matcher and of the cache location."""
+
+import os
+
+import pytest
+
+from pygitguard.config.pygitguard_constants import STANDALONE_CACHE_DIRNAME
+from pygitguard.helpers.cache_helper import CACHE_FILENAME
+from pygitguard.helpers.git_helper import (
+    GitIgnoreMatcher,
+    cache_location,
+    is_ignored_by_gitignore,
+    walk_repository,
+)
+from tests.conftest import SECRET, commit, git, run_pygitguard, write
+
+PATHS = [
+    "app.log",
+    "keep.log",
+    "src/app.log",
+    "src/keep.log",
+    "src/deep/keep.log",
+    "build/out.txt",
+    "build/keep.txt",
+    "docs/notes.tmp",
+    "docs/readme.md",
+    "local.secret",
+    "global.bak",
+    "src/global.bak",
+]
+
+
+@pytest.fixture
+def ignore_repo(repo):
+    """A repository with every kind of ignore source, nested and negated."""
+    write(repo, ".gitignore", "*.log\n!keep.log\nbuild/\n!build/keep.txt\n")
+    write(repo, "src/.gitignore", "keep.log\n!global.bak\n")
+    write(repo, "src/deep/.gitignore", "!keep.log\n")
+    write(repo, "docs/.gitignore", "*.tmp\n")
+    write(repo, ".git/info/exclude", "*.secret\n*.bak\n")
+    for path in PATHS:
+        write(repo, path, "")
+    return repo
+
+
+def test_gitignore_precedence_matches_git(ignore_repo):
+    matcher = GitIgnoreMatcher(ignore_repo, global_excludes_file=os.devnull)
+    ignored = set(git(ignore_repo, "check-ignore", "--no-index", *PATHS).split())
+    assert {path for path in PATHS if matcher.is_rel_ignored(path)} == ignored
+    # the deeper .gitignore wins, a file in an ignored directory stays ignored
+    assert matcher.is_rel_ignored("src/keep.log")
+    assert not matcher.is_rel_ignored("src/deep/keep.log")
+    assert matcher.is_rel_ignored("build/keep.txt")
+    assert not matcher.is_rel_ignored("src/global.bak")
+
+
+def test_global_excludes_file_has_the_lowest_precedence(ignore_repo, tmp_path):
+    excludes = write(str(tmp_path), "global_ignore", "*.md\n!*.secret\n")
+    matcher = GitIgnoreMatcher(ignore_repo, global_excludes_file=excludes)
+    assert matcher.is_rel_ignored("docs/readme.md")
+    # .git/info/exclude wins over the global excludes file
+    assert matcher.is_rel_ignored("local.secret")
+    assert matcher.is_ignored(os.path.join(ignore_repo, "docs", "readme.md"))
+
+
+def test_is_ignored_by_gitignore_is_deprecated(ignore_repo):
+    with pytest.deprecated_call():
+        assert is_ignored_by_gitignore(
+            os.path.join(ignore_repo, "app.log"), ignore_repo
+        )
+    with pytest.deprecated_call():
+        assert not is_ignored_by_gitignore(
+            os.path.join(ignore_repo, "keep.log"), ignore_repo
+        )
+
+
+def test_walk_yields_regular_files_and_symlinks_to_them(repo):
+    write(repo, "sub/a.py", "x = 1\n")
+    write(repo, "ignored/b.py", "x = 1\n")
+    write(repo, ".gitignore", "ignored/\n")
+    os.symlink("sub", os.path.join(repo, "linkdir"))
+    os.symlink("sub/a.py", os.path.join(repo, "link.py"))
+    os.symlink("missing.py", os.path.join(repo, "broken.py"))
+    os.mkfifo(os.path.join(repo, "fifo"))
+    directories = []
+    walked = {
+        rel_path
+        for _, rel_path, _, _ in walk_repository(
+            repo, GitIgnoreMatcher(repo, os.devnull), directories
+        )
+    }
+    assert walked == {".gitignore", "sub/a.py", "link.py"}
+    assert sorted(directories) == ["", "sub"]
+
+
+def test_scan_of_a_symlink_to_a_directory(repo):
+    write(repo, "sub/a.py", SECRET)
+    os.symlink("sub", os.path.join(repo, "linkdir"))
+    result = run_pygitguard(repo, "--all", "--no-cache", "--no-daemon")
+    assert result.returncode == 1, result.stderr
+    assert "Traceback" not in result.stderr
+    assert "sub/a.py line:1" in result.stdout + result.stderr
+    assert "linkdir" not in result.stdout + result.stderr
+
+
+def test_caches_are_kept_in_the_git_directory(repo):
+    write(repo, "app.py", "x = 1\n")
+    result = run_pygitguard(repo, "--all", "--no-daemon")
+    assert result.returncode == 0, result.stderr
+    assert os.path.exists(os.path.join(repo, ".git", "pygitguard", CACHE_FILENAME))
+    assert not os.path.exists(os.path.join(repo, STANDALONE_CACHE_DIRNAME))
+    assert git(repo, "status", "--porcelain", "--ignored").split() == ["??", "app.py"]
+
+
+def test_cache_location_of_worktrees_and_plain_directories(repo, tmp_path):
+    write(repo, "app.py", "x = 1\n")
+    commit(repo)
+    worktree = str(tmp_path / "worktree")
+    git(repo, "worktree", "add", "-q", worktree)
+    git_dir = git(worktree, "rev-parse", "--absolute-git-dir").strip()
+    location = cache_location(worktree)
+    assert os.path.realpath(location) == os.path.realpath(
+        os.path.join(git_dir, "pygitguard")
+    )
+    assert run_pygitguard(worktree, "--all", "--no-daemon").returncode == 0
+    assert os.path.exists(os.path.join(location, CACHE_FILENAME))
+
+    plain = str(tmp_path / "plain")
+    os.mkdir(plain)
+    assert cache_location(plain) == os.path.join(plain, STANDALONE_CACHE_DIRNAME)
@@ -0,0 +1,50 @@
+"""Tests of the history scans and of their checkpoint."""
+
+from tests.conftest import SECRET, commit, content_lines, run_pygitguard, scan, write
+
+
+def deleted_secret(repo):
+    """Commits a secret, then deletes it, returns the commit adding it."""
+    write(repo, "config.py", SECRET)
+    added = commit(repo, "add config")
+    write(repo, "config.py", "password = None\n")
+    commit(repo, "remove the password")
+    return added
+
+
+def test_history_reports_deleted_secrets_on_every_run(repo):
+    added = deleted_secret(repo)
+    for _ in range(2):
+        code, findings = scan(repo, "--history", use_cache=True)
+        assert code == 1
+        assert content_lines(findings) == [("config.py", 1)]
+        assert {f["commit"] for f in findings if f["kind"] == "content"} == {added}
+
+
+def test_resume_only_scans_the_new_commits(repo):
+    deleted_secret(repo)
+    code, findings = scan(repo, "--history", "--resume")
+    assert code == 1
+    assert content_lines(findings) == [("config.py", 1)]
+
+    code, findings = scan(repo, "--history", "--resume")
+    assert code == 0
+    assert content_lines(findings) == []
+
+    write(repo, "new.py", SECRET.replace("hunter2", "swordfish"))
+    commit(repo, "add new")
+    code, findings = scan(repo, "--history", "--resume")
+    assert code == 1
+    assert content_lines(findings) == [("new.py", 1)]
+
+    # the checkpoint does not change the scans without --resume
+    code, findings = scan(repo, "--history")
+    assert content_lines(findings) == [("config.py", 1), ("new.py", 1)]
+
+
+def test_resume_requires_history(repo):
+    result = run_pygitguard(repo, "--all", "--resume")
+    assert result.returncode == 2
+    assert "--resume requires --history" in result.stderr
+    result = run_pygitguard(repo, "baseline", "--history", "--resume")
+    assert result.returncode == 2
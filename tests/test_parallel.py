@@ -0,0 +1,55 @@
+"""Tests of the parallel scans, which must report exactly what serial scans do."""
+
+import re
+
+from pygitguard.helpers.scan_helper import PARALLEL_BATCH_SIZE
+from tests.conftest import SECRET, git, run_pygitguard, scan, write
+
+SUMMARY = re.compile(r"Scanned \d+ files, .*")
+
+
+def make_files(repo, count):
+    """Writes 'count' files, some of them with findings of every kind."""
+    for number in range(count):
+        directory = f"pkg{number % 7}"
+        if number % 50 == 0:
+            write(repo, f"{directory}/creds{number}.env", "KEY=1\n")
+        elif number % 40 == 0:
+            write(repo, f"{directory}/image{number}.png", SECRET)
+        elif number % 30 == 0:
+            write(repo, f"{directory}/blob{number}.dat", b"\0" + SECRET.encode())
+        elif number % 9 == 0:
+            write(repo, f"{directory}/module{number}.py", "x = 1\n" * 3 + SECRET)
+        else:
+            write(repo, f"{directory}/module{number}.py", "x = 1\n")
+
+
+def summary(repo, *args):
+    """Returns the summary line of a scan."""
+    result = run_pygitguard(repo, *args, "--no-daemon")
+    return SUMMARY.search(result.stderr).group()
+
+
+def test_parallel_scans_report_the_findings_of_serial_scans(repo):
+    make_files(repo, 3 * PARALLEL_BATCH_SIZE + 10)
+    git(repo, "add", "-A")
+
+    serial = scan(repo, "--all", "--jobs", "1")
+    assert serial[0] == 1
+    assert len(serial[1]) > 50
+    # same findings, in the same order
+    assert scan(repo, "--all", "--jobs", "4") == serial
+    assert summary(repo, "--all", "--jobs", "4", "--no-cache") == summary(
+        repo, "--all", "--jobs", "1", "--no-cache"
+    )
+
+
+def test_parallel_scans_with_the_cache_match_serial_scans(repo):
+    make_files(repo, 2 * PARALLEL_BATCH_SIZE + 10)
+    serial = scan(repo, "--all", "--jobs", "1")
+    assert scan(repo, "--all", "--jobs", "3", use_cache=True) == serial
+    # some files change between two cached scans
+    write(repo, "pkg1/module1.py", SECRET)
+    write(repo, "pkg2/module9.py", "x = 1\n")
+    serial = scan(repo, "--all", "--jobs", "1")
+    assert scan(repo, "--all", "--jobs", "3", use_cache=True) == serial
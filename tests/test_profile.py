@@ -0,0 +1,93 @@
+"""Tests of the profile of the scans, `--profile` and PYGITGUARD_PROFILE."""
+
+import logging
+import os
+import pstats
+
+from pygitguard.config.pygitguard_constants import PROFILE_ENVIRONMENT_VARIABLE
+from pygitguard.helpers.profile_helper import ScanProfiler
+from pygitguard.helpers.scan_helper import PyGitGuardScan
+from tests.conftest import SECRET, git, run_pygitguard, scan, write
+
+
+def make_repo(repo):
+    write(repo, "app.py", "x = 1\n" + SECRET)
+    write(repo, "big.py", "x = 1\n" * 20_000)
+    write(repo, "prod.env", "KEY=1\n")
+    git(repo, "add", "-A")
+
+
+def test_profile_records_the_phases_files_and_rules(repo):
+    make_repo(repo)
+    profiler = ScanProfiler()
+    profiler.start()
+    PyGitGuardScan(logging.getLogger("pygitguard.tests"), profiler).scan_repository(
+        repo
+    )
+    profiler.stop()
+
+    for phase in ("walk", "walk.gitignore", "filename", "large-file", "content"):
+        assert phase in profiler.phases, phase
+    assert profiler.phases["content"][1] == 3
+    assert set(profiler.files) == {"app.py", "big.py", "prod.env"}
+    # [seconds, runs, matches]
+    assert profiler.rules["password-assignment"][1:] == [3, 1]
+    assert profiler.rules["token-assignment"][1:] == [3, 0]
+
+
+def test_profile_is_logged_after_the_scan(repo):
+    make_repo(repo)
+    result = run_pygitguard(repo, "--all", "--no-cache", "--no-daemon", "--profile")
+    assert result.returncode == 1
+    for title in ("Profile: scan took", "Phases", "Slowest files", "content rules"):
+        assert title in result.stderr
+    assert "cProfile" not in result.stderr
+    assert "Profile:" not in run_pygitguard(repo, "--all", "--no-daemon").stderr
+
+
+def test_profiled_scans_report_the_findings_of_normal_scans(repo):
+    make_repo(repo)
+    assert scan(repo, "--all", "--profile") == scan(repo, "--all")
+    assert scan(repo, "--staged", "--profile") == scan(repo, "--staged")
+
+
+def test_profile_writes_cprofile_statistics(repo):
+    make_repo(repo)
+    result = run_pygitguard(repo, "--all", "--no-daemon", "--profile", "scan.pstats")
+    assert "cProfile statistics written to scan.pstats" in result.stderr
+    stats = pstats.Stats(os.path.join(repo, "scan.pstats"))
+    assert any(name == "scan_repository" for _, _, name in stats.stats)
+
+
+def test_environment_variable_profiles_the_hook(repo, monkeypatch):
+    make_repo(repo)
+    monkeypatch.setenv(PROFILE_ENVIRONMENT_VARIABLE, "0")
+    assert "Profile:" not in run_pygitguard(repo, "--staged", "--no-daemon").stderr
+    monkeypatch.setenv(PROFILE_ENVIRONMENT_VARIABLE, "1")
+    assert "Profile:" in run_pygitguard(repo, "--staged", "--no-daemon").stderr
+
+
+def test_profiling_work_is_excluded_from_the_phases():
+    profiler = ScanProfiler()
+    start, excluded = profiler.clock()
+    profiler.exclude(0.5)
+    # a call that started 2 seconds ago, half a second of it spent profiling
+    profiler.add("content", (start - 2.0, excluded), "a.py")
+    profiler.add("content", profiler.clock(), "b.py")
+    seconds, calls = profiler.phases["content"]
+    assert calls == 2
+    assert 1.5 <= seconds < 1.6
+    assert 1.5 <= profiler.files["a.py"] < 1.6
+
+
+def test_report_lists_the_top_files_and_rules():
+    profiler = ScanProfiler()
+    profiler.files = {f"file{n}.py": n / 10 for n in range(20)}
+    for n in range(5):
+        profiler.add_rule(f"rule-{n}", n / 100, matches=n)
+    lines = profiler.report(top=3)
+    assert lines[0].startswith("Profile: scan took")
+    files = [line.split()[1] for line in lines if line.endswith(".py")]
+    assert files == ["file19.py", "file18.py", "file17.py"]
+    rules = [line.split()[-1] for line in lines if "rule-" in line]
+    assert rules == ["rule-4", "rule-3", "rule-2"]
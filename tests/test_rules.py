@@ -0,0 +1,198 @@
+"""Tests of the RULES: which files each rule applies to, and their findings."""
+
+import io
+import json
+import zipfile
+
+import pytest
+
+from pygitguard.helpers.pattern_helper import compile_content_patterns
+from pygitguard.helpers.rule_helper import Detector, Rule, RuleSet, register_detector
+from tests.conftest import SECRET, commit, run_pygitguard, scan, write
+
+HOSTNAME = "host = 'corp.internal.example.com'\n"
+
+HOSTNAME_RULE = {"id": "internal-hostname", "pattern": r"corp\.internal\.example\.com"}
+
+
+def configure(repo, *rules):
+    """Writes a `.pygitguard.yaml` with some RULES."""
+    write(repo, ".pygitguard.yaml", json.dumps({"RULES": list(rules)}))
+
+
+def rule_paths(findings, rule_id):
+    """Returns the sorted `(path, line)` of the findings of a rule."""
+    return sorted((f["path"], f["line"]) for f in findings if f["rule_id"] == rule_id)
+
+
+def test_rules_apply_to_their_file_types(repo):
+    for path in ("app.py", "setup.cfg", "LEGACY.CFG", "notes.md", "Makefile"):
+        write(repo, path, HOSTNAME)
+    commit(repo)
+    configure(repo, dict(HOSTNAME_RULE, file_types=["cfg", ".py"]))
+    code, findings = scan(repo, "--all")
+    assert code == 1
+    assert rule_paths(findings, "internal-hostname") == [
+        ("LEGACY.CFG", 1),
+        ("app.py", 1),
+        ("setup.cfg", 1),
+    ]
+
+    # without file_types a rule applies to every file
+    configure(repo, HOSTNAME_RULE)
+    _, findings = scan(repo, "--all")
+    assert len(rule_paths(findings, "internal-hostname")) == 5
+
+
+def test_rules_apply_to_the_paths_of_their_globs(repo):
+    for path in ("src/app.py", "src/tests/test_app.py", "lib/util.py", "src/a.md"):
+        write(repo, path, HOSTNAME)
+    commit(repo)
+    configure(
+        repo,
+        dict(
+            HOSTNAME_RULE,
+            include=["src/*"],
+            exclude=["*tests/*"],
+            file_types=[".py"],
+        ),
+    )
+    _, findings = scan(repo, "--all")
+    assert rule_paths(findings, "internal-hostname") == [("src/app.py", 1)]
+
+
+def test_globs_match_the_paths_of_archive_members(repo):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("src/app.py", HOSTNAME)
+        archive.writestr("docs/conf.py", HOSTNAME)
+    write(repo, "bundle.zip", buffer.getvalue())
+    commit(repo)
+    configure(repo, dict(HOSTNAME_RULE, include=["*!src/*"], file_types=[".py"]))
+    _, findings = scan(repo, "--all")
+    assert rule_paths(findings, "internal-hostname") == [("bundle.zip!src/app.py", 1)]
+
+
+def test_rule_severity_and_blocking(repo):
+    write(repo, "app.py", HOSTNAME)
+    commit(repo)
+    configure(repo, dict(HOSTNAME_RULE, severity="info"))
+    code, findings = scan(repo, "--all")
+    assert code == 0
+    (finding,) = [f for f in findings if f["rule_id"] == "internal-hostname"]
+    assert finding["severity"] == "info"
+    assert finding["kind"] == "content"
+    assert finding["column"] == len("host = '") + 1
+
+    configure(repo, dict(HOSTNAME_RULE, severity="info", blocking=True))
+    code, _ = scan(repo, "--all")
+    assert code == 1
+
+    configure(repo, dict(HOSTNAME_RULE, severity="warning", blocking=False))
+    code, _ = scan(repo, "--all")
+    assert code == 0
+
+
+def test_sensitive_content_is_reported_before_rules(repo):
+    write(repo, "app.py", SECRET)
+    commit(repo)
+    configure(repo, {"id": "hunter", "pattern": "hunter2"})
+    _, findings = scan(repo, "--all")
+    content = [f for f in findings if f["kind"] == "content"]
+    assert len(content) == 1
+    assert content[0]["rule_id"] != "hunter"
+
+
+class MarkerDetector(Detector):
+    """Finds the `marker` option in a line."""
+
+    def search(self, line):
+        start = line.find(self.options["marker"])
+        if start < 0:
+            return None
+        return start, start + len(self.options["marker"])
+
+
+def test_rule_set_dispatch():
+    register_detector("test-marker", MarkerDetector)
+    base = compile_content_patterns([r"password\s*="])
+    rules = (
+        Rule("hostname", pattern=r"corp\.internal", file_types={".py"}),
+        Rule("marker", detector="test-marker", options={"marker": "XYZ"}),
+        Rule("src-only", pattern="TODO", include=("src/*",), exclude=("src/gen/*",)),
+    )
+    rule_set = RuleSet(rules, base)
+
+    # files of the same rules share one matcher
+    assert rule_set.matcher_for("a.py") is rule_set.matcher_for("lib/b.py")
+    assert rule_set.matcher_for("a.py") is not rule_set.matcher_for("src/a.py")
+    assert rule_set.matcher_for("src/gen/a.py") is rule_set.matcher_for("a.py")
+
+    content = b"TODO\nhost = corp.internal\nXYZ here\npassword = 1\n"
+
+    def matches(rel_path):
+        return [
+            (line, getattr(rule, "id", rule))
+            for line, _, rule, _ in rule_set.matcher_for(rel_path).iter_matches(content)
+        ]
+
+    assert sorted(matches("src/a.py")) == [
+        (1, "src-only"),
+        (2, "hostname"),
+        (3, "marker"),
+        (4, r"password\s*="),
+    ]
+    assert sorted(matches("a.txt")) == [(3, "marker"), (4, r"password\s*=")]
+
+    # without rules applying to it, a file gets the SENSITIVE_CONTENT matcher
+    assert RuleSet(rules[:1], base).matcher_for("a.txt") is base
+
+
+def test_detectors_must_implement_search():
+    class Incomplete(Detector):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+    assert MarkerDetector(marker="XYZ").search("a XYZ") == (2, 5)
+
+
+def test_rules_scope_the_built_in_patterns_of_their_id(repo):
+    write(repo, "app.py", SECRET)
+    write(repo, "tests/test_app.py", SECRET)
+    write(repo, "accounts.cfg", "user = 'alice'\n")
+    commit(repo)
+    configure(
+        repo,
+        {"id": "password-assignment", "exclude": ["tests/*"]},
+        {"id": "user-assignment", "severity": "info"},
+    )
+    code, findings = scan(repo, "--all")
+    assert rule_paths(findings, "password-assignment") == [("app.py", 1)]
+    (finding,) = [f for f in findings if f["rule_id"] == "user-assignment"]
+    assert (finding["path"], finding["severity"]) == ("accounts.cfg", "info")
+
+    # without the password, the info finding does not block the commit
+    configure(
+        repo,
+        {"id": "password-assignment", "file_types": [".md"]},
+        {"id": "user-assignment", "severity": "info"},
+    )
+    code, findings = scan(repo, "--all")
+    assert code == 0
+    assert rule_paths(findings, "password-assignment") == []
+
+
+def test_rules_replace_the_pattern_of_their_id(repo):
+    write(repo, "app.py", SECRET + "PASSWORD: hunter3\n")
+    commit(repo)
+    configure(repo, {"id": "password-assignment", "pattern": r"password:\s*\w+"})
+    _, findings = scan(repo, "--all")
+    assert rule_paths(findings, "password-assignment") == [("app.py", 2)]
+
+
+def test_rules_without_pattern_need_a_built_in_id(repo):
+    configure(repo, {"id": "internal-hostname"})
+    result = run_pygitguard(repo, "--all", "--no-cache", "--no-daemon")
+    assert result.returncode == 2
+    assert "RULES[0] must have a pattern or a detector" in result.stderr
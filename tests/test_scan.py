@@ -0,0 +1,65 @@
+"""Tests of the content scans and of the line numbers they report."""
+
+import json
+
+import pytest
+
+from tests.conftest import SECRET, commit, content_lines, git, scan, write
+
+FILLER = "value = 1\n"
+
+
+def large_file(lines, secrets):
+    """Returns a file of 'lines' lines, with SECRET at the given line numbers."""
+    return "".join(
+        SECRET if number in secrets else FILLER for number in range(1, lines + 1)
+    )
+
+
+@pytest.mark.parametrize("mode", ["--all", "--staged"])
+def test_sampled_large_file_line_numbers(repo, mode):
+    # 1.5 MB, above MAX_FILE_SIZE_MB: only the first and last 64 KB are scanned
+    lines = 150_000
+    write(repo, "big.py", large_file(lines, {3, 75_000, lines - 2}))
+    git(repo, "add", "big.py")
+    code, findings = scan(repo, mode)
+    assert code == 1
+    assert content_lines(findings) == [("big.py", 3), ("big.py", lines - 2)]
+
+
+def test_small_file_line_numbers(repo):
+    write(repo, "app.py", large_file(10, {1, 7}))
+    code, findings = scan(repo, "--all")
+    assert code == 1
+    assert content_lines(findings) == [("app.py", 1), ("app.py", 7)]
+
+
+def test_diff_reports_the_added_lines_at_their_new_line_numbers(repo):
+    write(repo, "app.py", large_file(10, {2}))
+    base = commit(repo)
+    lines = (FILLER * 10).splitlines(True)
+    lines[1] = SECRET  # already committed, not reported again
+    lines[4:4] = [FILLER, SECRET]  # new lines 5 and 6
+    lines.append(SECRET)  # new last line, 13
+    write(repo, "app.py", "".join(lines))
+    write(repo, "new.py", SECRET)
+    git(repo, "add", "-A")
+
+    code, findings = scan(repo, "--diff")
+    assert code == 1
+    assert content_lines(findings) == [("app.py", 6), ("app.py", 13), ("new.py", 1)]
+
+    head = commit(repo)
+    code, findings = scan(repo, "--diff", f"{base}..{head}")
+    assert content_lines(findings) == [("app.py", 6), ("app.py", 13), ("new.py", 1)]
+    code, findings = scan(repo, "--diff", f"{head}..{head}")
+    assert (code, content_lines(findings)) == (0, [])
+
+
+@pytest.mark.parametrize("mode", ["--all", "--staged", "--diff"])
+def test_empty_sensitive_content_matches_nothing(repo, mode):
+    write(repo, ".pygitguard.yaml", json.dumps({"SENSITIVE_CONTENT": []}))
+    write(repo, "app.py", large_file(10, {2}))
+    git(repo, "add", "-A")
+    code, findings = scan(repo, mode)
+    assert (code, content_lines(findings)) == (0, [])
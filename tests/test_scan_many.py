@@ -0,0 +1,108 @@
+"""Tests of `pygitguard scan-many`, which must report what a scan of each repository does."""
+
+import io
+import json
+import os
+
+import pytest
+
+from pygitguard.helpers.batch_helper import read_repository_paths
+from tests.conftest import SECRET, content_lines, git, run_pygitguard, scan, write
+
+
+@pytest.fixture
+def repositories(repo, tmp_path):
+    """Repositories with different findings, configurations and baselines."""
+    paths = {}
+    for name in ("clean", "leaky", "custom", "baselined"):
+        path = paths[name] = str(tmp_path / name)
+        os.mkdir(path)
+        git(path, "init", "-q")
+        for number in range(30):
+            write(path, f"src/module{number}.py", "x = 1\n")
+    write(paths["leaky"], "app.py", SECRET)
+    write(paths["leaky"], "prod.env", "KEY=1\n")
+    # a rule set of its own, and a secret its rules do not match
+    write(
+        paths["custom"],
+        ".pygitguard.yaml",
+        json.dumps({"SENSITIVE_CONTENT": ["hunter"]}),
+    )
+    write(paths["custom"], "a.py", "x = 'hunter3'\n")
+    write(paths["custom"], "b.py", "token = 'abc'\n")
+    write(paths["baselined"], "old.py", SECRET)
+    assert run_pygitguard(paths["baselined"], "baseline", "--all").returncode == 0
+    write(paths["baselined"], "new.py", "x = 1\n" + SECRET)
+    return paths
+
+
+def scan_many(*args):
+    """Runs scan-many with `--format json`, returns the exit code and the report."""
+    result = run_pygitguard(os.getcwd(), "scan-many", "--format", "json", *args)
+    assert "Traceback" not in result.stderr, result.stderr
+    return result.returncode, json.loads(result.stdout)
+
+
+@pytest.mark.parametrize("jobs", ["1", "3"])
+def test_scan_many_reports_the_scan_of_each_repository(repositories, jobs):
+    paths = list(repositories.values())
+    code, report = scan_many("--jobs", jobs, "--no-cache", *paths)
+    assert code == 1
+    assert [entry["path"] for entry in report["repositories"]] == paths
+    for path, entry in zip(paths, report["repositories"]):
+        expected_code, expected = scan(path, "--all")
+        assert entry["findings"] == expected, path
+        assert entry["blocked"] == (expected_code == 1)
+        assert entry["error"] is None
+    blocked = [entry["blocked"] for entry in report["repositories"]]
+    assert blocked == [False, True, True, True]
+    summary = report["summary"]
+    assert (summary["repositories"], summary["blocked"], summary["failed"]) == (4, 3, 0)
+    assert summary["files_scanned"] == sum(
+        entry["files_scanned"] for entry in report["repositories"]
+    )
+    baselined = report["repositories"][3]
+    assert baselined["findings_suppressed"] > 0
+    assert content_lines(baselined["findings"]) == [("new.py", 2)]
+
+
+def test_scan_many_uses_the_cache_of_each_repository(repositories):
+    paths = list(repositories.values())
+    _, first = scan_many("--jobs", "2", *paths)
+    _, second = scan_many("--jobs", "2", *paths)
+    for before, after in zip(first["repositories"], second["repositories"]):
+        assert after["findings"] == before["findings"]
+        assert after["cache_hits"] == before["files_scanned"] > 0
+
+
+def test_failed_repositories_do_not_stop_the_batch(repositories, tmp_path):
+    write(
+        repositories["custom"], ".pygitguard.yaml", json.dumps({"MAX_FILE_SIZE_MB": 0})
+    )
+    missing = str(tmp_path / "missing")
+    code, report = scan_many(repositories["clean"], missing, repositories["custom"])
+    assert code == 2
+    errors = [entry["error"] for entry in report["repositories"]]
+    assert errors[0] is None
+    assert "is not a directory" in errors[1]
+    assert "MAX_FILE_SIZE_MB must be positive" in errors[2]
+    assert report["summary"]["failed"] == 2
+
+    code, report = scan_many(repositories["clean"])
+    assert (code, report["summary"]["blocked"]) == (0, 0)
+
+
+def test_repository_paths_are_read_in_order_without_duplicates(tmp_path, monkeypatch):
+    list_file = tmp_path / "repositories.txt"
+    list_file.write_text("# the services\nb\n\n  c  \na\n")
+    assert read_repository_paths(["a", "d"], str(list_file)) == ["a", "d", "b", "c"]
+    monkeypatch.setattr("sys.stdin", io.StringIO("e\n#f\na\n"))
+    assert read_repository_paths(["a"], "-") == ["a", "e"]
+
+
+def test_scan_many_needs_a_repository(tmp_path):
+    empty = tmp_path / "empty.txt"
+    empty.write_text("# nothing yet\n")
+    result = run_pygitguard(str(tmp_path), "scan-many", "--from-file", str(empty))
+    assert result.returncode == 2
+    assert "no repository to scan" in result.stderr
@@ -0,0 +1,97 @@
+"""Tests of the staged scans, reading the files from the git index."""
+
+import os
+
+from pygitguard.helpers.git_helper import get_staged_files
+from tests.conftest import SECRET, commit, content_lines, git, scan, write
+
+
+def staged_sha(repo, rel_path):
+    """Returns the blob sha of a file in the index."""
+    return git(repo, "rev-parse", f":{rel_path}").strip()
+
+
+def test_staged_files_are_the_added_modified_and_renamed_ones(repo):
+    write(repo, "modified.py", "x = 1\n")
+    write(repo, "deleted.py", "x = 1\n")
+    write(repo, "old_name.py", "x = 1\n")
+    write(repo, "unchanged.py", "x = 1\n")
+    write(repo, "link", "x = 1\n")
+    commit(repo)
+
+    write(repo, "added.py", "x = 1\n")
+    write(repo, "modified.py", "x = 2\n")
+    git(repo, "rm", "-q", "deleted.py")
+    git(repo, "mv", "old_name.py", "new_name.py")
+    os.remove(os.path.join(repo, "link"))
+    os.symlink("modified.py", os.path.join(repo, "link"))  # type change
+    write(repo, "untracked.py", "x = 1\n")
+    git(repo, "add", "added.py", "modified.py", "link")
+
+    staged = dict(get_staged_files(repo))
+    assert sorted(staged) == ["added.py", "link", "modified.py", "new_name.py"]
+    for rel_path, sha in staged.items():
+        assert sha == staged_sha(repo, rel_path)
+
+
+def test_staged_files_skip_submodules(repo, tmp_path):
+    submodule = str(tmp_path / "submodule")
+    os.mkdir(submodule)
+    git(submodule, "init", "-q")
+    write(submodule, "app.py", SECRET)
+    commit(submodule)
+    git(repo, "-c", "protocol.file.allow=always", "submodule", "add", "-q", submodule)
+    assert get_staged_files(repo) == [(".gitmodules", staged_sha(repo, ".gitmodules"))]
+
+
+def test_staged_files_are_relative_to_the_scanned_directory(repo):
+    write(repo, "src/app.py", "x = 1\n")
+    write(repo, "root.py", "x = 1\n")
+    git(repo, "add", "-A")
+    assert get_staged_files(os.path.join(repo, "src")) == [
+        ("app.py", staged_sha(repo, "src/app.py"))
+    ]
+
+
+def test_staged_scan_reads_the_index_not_the_working_tree(repo):
+    write(repo, "staged.py", SECRET)
+    git(repo, "add", "staged.py")
+    write(repo, "staged.py", "x = 1\n")  # fixed, but not staged
+    write(repo, "unstaged.py", "x = 1\n")
+    git(repo, "add", "unstaged.py")
+    write(repo, "unstaged.py", SECRET)  # not staged, not committed
+
+    code, findings = scan(repo, "--staged")
+    assert code == 1
+    assert content_lines(findings) == [("staged.py", 1)]
+
+    code, findings = scan(repo, "--all")
+    assert content_lines(findings) == [("unstaged.py", 1)]
+
+
+def test_staged_scan_ignores_the_committed_and_deleted_files(repo):
+    write(repo, "committed.py", SECRET)
+    write(repo, "removed.py", SECRET)
+    commit(repo)
+    git(repo, "rm", "-q", "removed.py")
+
+    code, findings = scan(repo, "--staged")
+    assert code == 0
+    assert [finding for finding in findings if finding["path"].endswith(".py")] == []
+
+
+def test_staged_scan_reports_renamed_files_at_their_new_path(repo):
+    write(repo, "notes.py", SECRET)
+    write(repo, "notes.txt", "x = 1\n")
+    commit(repo)
+    git(repo, "mv", "notes.py", "config.py")
+    git(repo, "mv", "notes.txt", "id_rsa")
+
+    code, findings = scan(repo, "--staged")
+    assert code == 1
+    assert content_lines(findings) == [("config.py", 1)]
+    assert [
+        (finding["path"], finding["rule_id"])
+        for finding in findings
+        if finding["kind"] == "filename"
+    ] == [("id_rsa", "id-rsa-file")]
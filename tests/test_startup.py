@@ -0,0 +1,109 @@
+"""Tests of the startup of the pre-commit scans: arguments and console logs."""
+
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+
+from pygitguard.cli import SCAN_DEFAULTS, parse_args, parse_hook_args
+from pygitguard.config.logger import (
+    COLOR_CODES,
+    ICONS,
+    LOG_FORMAT,
+    RESET_CODE,
+    IconOnlyColorFormatter,
+)
+from pygitguard.helpers.arguments_helper import build_parser
+from tests.conftest import ROOT
+
+
+def argparse_args(argv):
+    """Returns the options of `argv` as parsed by the argparse parser."""
+    args = build_parser().parse_args(argv)
+    options = dict(SCAN_DEFAULTS)
+    options.update(vars(args))
+    return options
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        [],
+        ["--staged"],
+        ["--all"],
+        ["--diff"],
+        ["--staged", "--no-cache"],
+        ["--no-daemon", "--all", "--no-cache"],
+    ],
+)
+def test_hook_args_are_parsed_as_argparse_parses_them(argv):
+    args = parse_hook_args(argv)
+    assert args is not None
+    assert vars(args) == argparse_args(argv)
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [["--path", "."], ["--staged", "--all"], ["--diff", "main..HEAD"], ["init"]],
+)
+def test_other_args_are_left_to_argparse(argv):
+    assert parse_hook_args(argv) is None
+
+
+def test_conflicting_hook_flags_are_rejected():
+    with pytest.raises(SystemExit):
+        parse_args(["--all", "--diff"])
+
+
+def run_python(repo, code, *args):
+    """Runs Python 'code' in 'repo' with pygitguard importable."""
+    return subprocess.run(
+        [sys.executable, "-c", code, *args],
+        cwd=repo,
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, PYTHONPATH=ROOT),
+    )
+
+
+def test_no_op_staged_scan_does_not_import_argparse(repo):
+    code = (
+        "import sys; from pygitguard.cli import main; status = main();"
+        " print('argparse' in sys.modules); sys.exit(status)"
+    )
+    result = run_python(repo, code, "--staged")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "False"
+    assert "Scanned 0 files" in result.stderr
+
+
+def test_importing_pygitguard_does_not_configure_logging(repo):
+    code = (
+        "import logging; import pygitguard.cli;"
+        " print(len(logging.getLogger().handlers))"
+    )
+    result = run_python(repo, code)
+    assert result.stdout.strip() == "0", result.stderr
+
+
+def test_log_lines_are_plain_off_a_terminal(repo):
+    result = run_python(
+        repo, "import sys; from pygitguard.cli import main; main()", "--staged"
+    )
+    line = result.stderr.splitlines()[-1]
+    assert " | INFO  PYGITGUARD -> Scanned 0 files" in line
+    assert "\033[" not in result.stderr
+
+
+def test_color_formatter_replaces_the_level_with_its_icon():
+    formatter = IconOnlyColorFormatter(LOG_FORMAT)
+    record = logging.LogRecord(
+        "PYGITGUARD", logging.WARNING, __file__, 1, "careful %s", ("now",), None
+    )
+    line = formatter.format(record)
+    assert line.startswith(COLOR_CODES["WARNING"])
+    assert line.endswith(f"| {ICONS['WARNING']}  PYGITGUARD -> careful now{RESET_CODE}")
+    # the record itself is left as it was
+    assert record.levelname == "WARNING"
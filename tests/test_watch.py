@@ -0,0 +1,115 @@
+"""Tests of the `pygitguard watch` daemon, which must answer what a scan finds."""
+
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from pygitguard.helpers.findings_helper import Finding
+from pygitguard.helpers.watch_helper import ScanDaemon, query_daemon, socket_path
+from tests.conftest import ROOT, SECRET, git, run_pygitguard, scan, write
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(socket, "AF_UNIX"), reason="the daemon listens on a Unix socket"
+)
+
+
+def daemon_findings(daemon, staged=False):
+    """Returns the findings of a daemon answer as dicts, like `scan`."""
+    findings, _ = daemon.scan(staged)["result"]
+    return [Finding(*values).to_dict() for values in findings]
+
+
+def sort(findings):
+    return sorted(findings, key=lambda finding: json.dumps(finding, sort_keys=True))
+
+
+@pytest.fixture(params=[False, True], ids=["inotify", "poll"])
+def daemon(request, repo):
+    daemon = ScanDaemon(repo, logging.getLogger("pygitguard.tests"), poll=request.param)
+    yield daemon
+    if daemon._watcher is not None:
+        daemon._watcher.close()
+
+
+def test_daemon_follows_the_changes_of_the_working_tree(repo, daemon):
+    write(repo, "app.py", SECRET)
+    write(repo, "src/clean.py", "x = 1\n")
+    write(repo, "src/removed.py", SECRET)
+    assert sort(daemon_findings(daemon)) == sort(scan(repo, "--all")[1])
+
+    steps = [
+        lambda: write(repo, "src/clean.py", "x = 1\n" + SECRET),  # modified
+        lambda: os.remove(os.path.join(repo, "src/removed.py")),  # deleted
+        lambda: write(repo, "new/dir/prod.env", "KEY=1\n"),  # new directory
+        lambda: write(repo, "app.py", "x = 1\n"),  # fixed
+        lambda: write(repo, ".gitignore", "new/\n"),  # rules of the walk
+        lambda: write(repo, ".pygitguard.yaml", json.dumps({"SENSITIVE_CONTENT": []})),
+    ]
+    for step in steps:
+        step()
+        assert sort(daemon_findings(daemon)) == sort(scan(repo, "--all")[1])
+
+
+def test_daemon_scans_the_index_for_staged_scans(repo, daemon):
+    write(repo, "app.py", SECRET)
+    git(repo, "add", "app.py")
+    write(repo, "app.py", "x = 1\n")  # fixed, but not staged
+    assert daemon_findings(daemon, staged=True) == scan(repo, "--staged")[1]
+    assert sort(daemon_findings(daemon)) == sort(scan(repo, "--all")[1])
+
+
+def test_daemon_reports_an_invalid_configuration(repo, daemon):
+    write(repo, "app.py", SECRET)
+    write(repo, ".pygitguard.yaml", json.dumps({"MAX_FILE_SIZE_MB": "big"}))
+    answer = daemon.scan()
+    assert "MAX_FILE_SIZE_MB must be a number" in answer["error"]
+    write(repo, ".pygitguard.yaml", json.dumps({"MAX_FILE_SIZE_MB": 2}))
+    assert sort(daemon_findings(daemon)) == sort(scan(repo, "--all")[1])
+
+
+def start_daemon(repo):
+    """Runs `pygitguard watch` in 'repo', returning once it answers."""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "pygitguard.cli", "watch", "--poll", "--jobs", "1"],
+        cwd=repo,
+        stderr=subprocess.PIPE,
+        text=True,
+        env=dict(os.environ, PYTHONPATH=ROOT),
+    )
+    deadline = time.monotonic() + 30
+    while query_daemon(repo, False, timeout=1) is None:
+        assert process.poll() is None, process.stderr.read()
+        assert time.monotonic() < deadline, "the daemon did not start"
+        time.sleep(0.05)
+    return process
+
+
+def test_scans_are_answered_by_a_running_daemon(repo):
+    write(repo, "app.py", SECRET)
+    git(repo, "add", "app.py")
+    process = start_daemon(repo)
+    try:
+        result = run_pygitguard(repo, "--all", "--format", "json")
+        assert result.returncode == 1
+        assert "answered by the 'pygitguard watch' daemon" in result.stderr
+        assert sort(json.loads(result.stdout)["findings"]) == sort(
+            scan(repo, "--all")[1]
+        )
+        result = run_pygitguard(repo, "--staged", "--no-daemon")
+        assert "daemon" not in result.stderr
+
+        second = run_pygitguard(repo, "watch", "--poll")
+        assert second.returncode == 2
+        assert "A daemon already watches" in second.stderr
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        process.stderr.close()
+    assert not os.path.exists(socket_path(repo))
+    assert "answered by" not in run_pygitguard(repo, "--all").stderr